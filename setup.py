@@ -5,4 +5,7 @@ setup(
     version="0.1.0",
     packages=find_packages('src'),
     package_dir={'': 'src'},
+    entry_points={
+        'console_scripts': ['echofoam=echofoam_falsifiability.cli:main'],
+    },
 )
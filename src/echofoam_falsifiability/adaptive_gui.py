@@ -1,8 +1,8 @@
-import tkinter as tk
-import numpy as np
-import json
+import atexit
 import time
-import threading
+
+from echofoam_falsifiability.events import EventSink
+from echofoam_falsifiability.tension_field import TensionField
 
 # Grid resolution for tension field
 GRID = 20
@@ -10,48 +10,40 @@ GRID = 20
 WIDTH = 400
 HEIGHT = 300
 
-# initialize tau field representing user hesitation/backtracking
-tau = np.zeros((GRID, GRID), dtype=float)
+threshold = 1.0  # tension spike threshold
+
+# tau field representing user hesitation/backtracking
+field = TensionField(GRID, WIDTH, HEIGHT, threshold)
 chi_signal = 0.0
 
-memory = {"events": []}
-last_move_time = None
-threshold = 1.0  # tension spike threshold
+# append-only JSON Lines log of the interface events, see events.EventSink
+EVENT_LOG = "memory.jsonl"
+event_sink = None
+
+# Tk widgets, created by main()
+root = None
+help_label = None
 
 
 def log_event(event_type, x, y):
-    entry = {"t": time.time(), "type": event_type, "x": x, "y": y}
-    memory["events"].append(entry)
-    with open("memory.json", "w") as f:
-        json.dump(memory, f, indent=2)
+    global event_sink
+    if event_sink is None:
+        event_sink = EventSink(EVENT_LOG)
+        atexit.register(event_sink.close)
+    event_sink.log(event_type, x, y)
 
 
 def update_tau_from_motion(x, y, dt):
-    gx = int(x / WIDTH * GRID)
-    gy = int(y / HEIGHT * GRID)
-    gx = max(0, min(GRID - 1, gx))
-    gy = max(0, min(GRID - 1, gy))
-    tau[gy, gx] += dt
+    field.add(x, y, dt)
 
 
 def on_motion(event):
-    global last_move_time
-    now = time.time()
-    if last_move_time is None:
-        dt = 0
-    else:
-        dt = now - last_move_time
-    last_move_time = now
-    update_tau_from_motion(event.x, event.y, dt)
+    field.motion(time.time(), event.x, event.y)
     log_event("move", event.x, event.y)
 
 
 def on_click(event):
-    gx = int(event.x / WIDTH * GRID)
-    gy = int(event.y / HEIGHT * GRID)
-    gx = max(0, min(GRID - 1, gx))
-    gy = max(0, min(GRID - 1, gy))
-    tau[gy, gx] *= 0.5  # clicking relieves tension
+    field.click(event.x, event.y)  # clicking relieves tension
     log_event("click", event.x, event.y)
 
 
@@ -59,11 +51,8 @@ def on_click(event):
 help_visible = False
 
 def manage_interface():
-    global tau, help_visible, chi_signal
-    tau *= 0.95  # natural tension decay
-    grad_y, grad_x = np.gradient(tau)
-    grad_mag = np.sqrt(grad_x ** 2 + grad_y ** 2)
-    spike = grad_mag.max()
+    global help_visible, chi_signal
+    spike = field.tick()  # natural tension decay, then the gradient spike
     if spike > threshold and not help_visible:
         help_label.pack(side="bottom", fill="x")
         help_visible = True
@@ -80,34 +69,54 @@ def manage_interface():
 
 # Simulation of user interactions to demonstrate tau relief
 
-def simulate_user_flow():
+def simulate_user_flow(delay=20):
+    """Replay a pointer sweep and a click on the Tk thread, one move every ``delay`` ms.
+
+    The events go through ``root.after`` like real ones, since the tension
+    field is not safe to update from another thread.
+    """
     path = list(range(50, WIDTH - 50, 10))
-    for x in path:
-        on_motion(type("Event", (), {"x": x, "y": HEIGHT // 2}))
-        time.sleep(0.02)
-    on_click(type("Event", (), {"x": path[-1], "y": HEIGHT // 2}))
 
+    def move(i):
+        if i < len(path):
+            on_motion(type("Event", (), {"x": path[i], "y": HEIGHT // 2}))
+            root.after(delay, move, i + 1)
+        else:
+            on_click(type("Event", (), {"x": path[-1], "y": HEIGHT // 2}))
+    move(0)
 
-# Build Tkinter interface
-root = tk.Tk()
-root.geometry(f"{WIDTH}x{HEIGHT}")
-root.title("Adaptive Echofoam GUI")
 
-main_frame = tk.Frame(root)
-main_frame.pack(expand=True, fill="both")
+def main():
+    global root, help_label
+    import tkinter as tk
 
-for i in range(3):
-    btn = tk.Button(main_frame, text=f"Button {i+1}")
-    btn.pack(pady=5)
+    # Build Tkinter interface
+    root = tk.Tk()
+    root.geometry(f"{WIDTH}x{HEIGHT}")
+    root.title("Adaptive Echofoam GUI")
+
+    main_frame = tk.Frame(root)
+    main_frame.pack(expand=True, fill="both")
+
+    for i in range(3):
+        btn = tk.Button(main_frame, text=f"Button {i+1}")
+        btn.pack(pady=5)
+
+    help_label = tk.Label(root, text="Need help?", bg="yellow")
+
+    root.bind("<Motion>", on_motion)
+    root.bind("<Button-1>", on_click)
+    root.after(100, manage_interface)
 
-help_label = tk.Label(root, text="Need help?", bg="yellow")
+    # simulated interactions, scheduled on the Tk thread
+    root.after(0, simulate_user_flow)
 
-root.bind("<Motion>", on_motion)
-root.bind("<Button-1>", on_click)
-root.after(100, manage_interface)
+    try:
+        root.mainloop()
+    finally:
+        if event_sink is not None:
+            event_sink.close()
 
-# run simulation in background
-sim_thread = threading.Thread(target=simulate_user_flow, daemon=True)
-sim_thread.start()
 
-root.mainloop()
+if __name__ == "__main__":
+    main()
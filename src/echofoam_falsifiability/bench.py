@@ -0,0 +1,299 @@
+"""Throughput and memory benchmarks for the solvers and the memory chain.
+
+Every case runs a fixed amount of work so results are comparable between
+commits. By default each case runs in a fresh process, which makes the
+reported peak RSS that of the case alone. Results are written as JSON and
+can be compared against a stored baseline::
+
+    python -m echofoam_falsifiability.bench --quick --out bench.json
+    python -m echofoam_falsifiability.bench --out new.json --compare bench.json
+
+``--compare`` exits with status 1 when any case got slower by more than
+``--threshold``.
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import platform
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+GRID_SIZES = (64, 256, 1024, 4096)
+SHELL_SIZES = ((10, 32, 64), (32, 128, 256), (64, 256, 512))
+CHAIN_SIZES = (10**3, 10**4, 10**5, 10**6)
+SIEVE_LIMITS = (10**5, 10**6)
+REPLAY_SIZES = (10**5, 10**6)
+
+QUICK = {
+    "grid_sizes": (64, 256),
+    "shell_sizes": ((10, 32, 64),),
+    "chain_sizes": (10**3, 10**4),
+    "sieve_limits": (10**5,),
+    "replay_sizes": (10**5,),
+}
+
+SIEVE_PATH = Path(__file__).resolve().parents[2] / "prime Number Sieve"
+
+
+def _steps_for(cells):
+    """Fixed step count giving roughly equal work per case."""
+    return int(np.clip(2e7 // cells, 2, 200))
+
+
+def _timed(fn, steps):
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    return {"steps": steps, "seconds": seconds, "steps_per_sec": steps / seconds}
+
+
+def bench_simulation(size):
+    from echofoam_falsifiability import simulation
+
+    steps = _steps_for(size * size)
+    simulation._init_fields(seed=0, n=size)
+    simulation.step(0)
+
+    def work():
+        for frame in range(1, steps + 1):
+            simulation.step(frame)
+    return _timed(work, steps)
+
+
+def bench_weather_simulation(size):
+    from echofoam_falsifiability import weather_simulation
+
+    steps = _steps_for(size * size)
+    state = weather_simulation.init_state(size, seed=0)
+    weather_simulation.step(state, 0)
+
+    def work():
+        for i in range(1, steps + 1):
+            weather_simulation.step(state, i)
+    return _timed(work, steps)
+
+
+def bench_laser(size):
+    from echofoam_falsifiability import laser_filamentation
+
+    steps = _steps_for(size * size)
+    return _timed(lambda: laser_filamentation.run_simulation(
+        grid_size=size, timesteps=steps, save_interval=None, seed=0), steps)
+
+
+def bench_teleportation(size):
+    from echofoam_falsifiability import teleportation
+
+    steps = _steps_for(size * size)
+    state = teleportation.init_state(size, teleport_start=0)
+    teleportation.step(state, 0)
+
+    def work():
+        for frame in range(1, steps + 1):
+            teleportation.step(state, frame)
+    return _timed(work, steps)
+
+
+def bench_weather_sphere(shape):
+    from echofoam_falsifiability import weather_sphere
+
+    grid_r, grid_theta, grid_phi = shape
+    steps = _steps_for(grid_r * grid_theta * grid_phi)
+    return _timed(lambda: weather_sphere.run(
+        steps=steps, grid_r=grid_r, grid_theta=grid_theta, grid_phi=grid_phi,
+        save_path=None, seed=0), steps)
+
+
+def bench_chain(blocks, lookups=20, appends=3):
+    from echofoam_falsifiability.blockchain_memory import Block, BlockchainMemory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mem = BlockchainMemory(os.path.join(tmp, "chain.json"))
+        prev_hash = "0" * 64
+        for i in range(blocks):
+            data = zlib.compress(f"memory {i}".encode())
+            block_hash = mem._hash_block(i, data, prev_hash)
+            mem.chain.append(Block(i, data, prev_hash, block_hash))
+            prev_hash = block_hash
+        mem.persist()
+
+        start = time.perf_counter()
+        loaded = BlockchainMemory(mem.path)
+        load_s = time.perf_counter() - start
+
+        rng = np.random.default_rng(0)
+        targets = [loaded.chain[i].hash for i in rng.integers(0, blocks, lookups)]
+        start = time.perf_counter()
+        for h in targets:
+            loaded.get_block(h)
+        lookup_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(appends):
+            loaded.add_memory(f"appended {i}")
+        append_s = time.perf_counter() - start
+
+    return {
+        "load_seconds": load_s,
+        "lookups_per_sec": lookups / lookup_s,
+        "appends_per_sec": appends / append_s,
+        "seconds": load_s + lookup_s + append_s,
+    }
+
+
+def bench_tension_replay(events):
+    """Replay a synthetic session of ``events`` pointer events, 1% of them clicks."""
+    from echofoam_falsifiability.tension_field import TensionField
+
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.exponential(0.01, events))
+    is_click = rng.random(events) < 0.01
+    x = rng.uniform(0, 400, events)
+    y = rng.uniform(0, 300, events)
+    start = time.perf_counter()
+    result = TensionField().replay(t, is_click, x, y)
+    seconds = time.perf_counter() - start
+    return {"ticks": len(result["spikes"]), "seconds": seconds, "events_per_sec": events / seconds}
+
+
+def _load_sieve():
+    loader = importlib.machinery.SourceFileLoader("prime_number_sieve", str(SIEVE_PATH))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def bench_sieve(limit):
+    sieve = _load_sieve()
+    primes = [2]
+    start = time.perf_counter()
+    for candidate in range(3, limit):
+        if sieve.is_prime(candidate, primes):
+            primes.append(candidate)
+    seconds = time.perf_counter() - start
+    return {"primes": len(primes), "seconds": seconds, "candidates_per_sec": (limit - 3) / seconds}
+
+
+def cases(grid_sizes=GRID_SIZES, shell_sizes=SHELL_SIZES, chain_sizes=CHAIN_SIZES,
+          sieve_limits=SIEVE_LIMITS, replay_sizes=REPLAY_SIZES):
+    """Return ``(name, function, argument)`` for every benchmark case."""
+    out = []
+    for size in grid_sizes:
+        out += [
+            (f"simulation[{size}]", bench_simulation, size),
+            (f"weather_simulation[{size}]", bench_weather_simulation, size),
+            (f"laser_filamentation[{size}]", bench_laser, size),
+            (f"teleportation[{size}]", bench_teleportation, size),
+        ]
+    for shape in shell_sizes:
+        out.append((f"weather_sphere[{'x'.join(map(str, shape))}]", bench_weather_sphere, shape))
+    for blocks in chain_sizes:
+        out.append((f"blockchain_memory[{blocks}]", bench_chain, blocks))
+    for events in replay_sizes:
+        out.append((f"tension_replay[{events}]", bench_tension_replay, events))
+    if SIEVE_PATH.exists():
+        for limit in sieve_limits:
+            out.append((f"sieve[{limit}]", bench_sieve, limit))
+    return out
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(fn, arg):
+    result = fn(arg)
+    result["peak_rss_bytes"] = _peak_rss_bytes()
+    return result
+
+
+def _run_isolated(fn, arg):
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_run_case, (fn, arg))
+
+
+def run_benchmarks(selected=None, isolate=True, **sizes):
+    """Run the benchmark cases whose name contains any of ``selected``."""
+    results = []
+    for name, fn, arg in cases(**sizes):
+        if selected and not any(s in name for s in selected):
+            continue
+        result = _run_isolated(fn, arg) if isolate else _run_case(fn, arg)
+        result["name"] = name
+        results.append(result)
+        print(f"{name:32s} {result['seconds']:8.3f} s", flush=True)
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+RATE_KEYS = ("steps_per_sec", "lookups_per_sec", "appends_per_sec", "candidates_per_sec",
+             "events_per_sec")
+
+
+def compare(baseline, current, threshold=0.2):
+    """Return ``(name, key, old, new)`` for every rate that dropped by more than ``threshold``."""
+    old = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        ref = old.get(result["name"])
+        if ref is None:
+            continue
+        for key in RATE_KEYS:
+            if key in result and key in ref and result[key] < ref[key] * (1 - threshold):
+                regressions.append((result["name"], key, ref[key], result[key]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark solver throughput and memory.")
+    parser.add_argument("cases", nargs="*", help="only run cases whose name contains one of these")
+    parser.add_argument("--quick", action="store_true", help="small sizes only")
+    parser.add_argument("--out", default="bench.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed fractional slowdown for --compare")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run cases in this process (peak RSS is then cumulative)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.cases, isolate=not args.in_process,
+                            **(QUICK if args.quick else {}))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for name, key, before, after in regressions:
+            print(f"REGRESSION {name} {key}: {before:.4g} -> {after:.4g}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,6 +4,8 @@ import zlib
 from dataclasses import dataclass
 from typing import List, Optional
 
+from echofoam_falsifiability.profiling import NULL_PROFILER
+
 @dataclass
 class Block:
     index: int
@@ -12,10 +14,15 @@ class Block:
     hash: str
 
 class BlockchainMemory:
-    """Simple compressed memory chain with hashed references."""
+    """Simple compressed memory chain with hashed references.
+
+    ``profiler`` times the serialize/write and read/decode phases of
+    :meth:`persist` and :meth:`load`, see ``profiling.Profiler``.
+    """
 
-    def __init__(self, path: str = "memory_chain.json"):
+    def __init__(self, path: str = "memory_chain.json", profiler=None):
         self.path = path
+        self.profiler = profiler or NULL_PROFILER
         self.chain: List[Block] = []
         self.load()
 
@@ -44,22 +51,31 @@ class BlockchainMemory:
         return None
 
     def persist(self) -> None:
-        serial = [
-            {
-                "index": b.index,
-                "data": b.data.hex(),
-                "prev_hash": b.prev_hash,
-                "hash": b.hash,
-            }
-            for b in self.chain
-        ]
-        with open(self.path, "w") as f:
-            json.dump(serial, f, indent=2)
+        with self.profiler.phase("serialize"):
+            serial = [
+                {
+                    "index": b.index,
+                    "data": b.data.hex(),
+                    "prev_hash": b.prev_hash,
+                    "hash": b.hash,
+                }
+                for b in self.chain
+            ]
+            text = json.dumps(serial, indent=2)
+        with self.profiler.phase("write"):
+            with open(self.path, "w") as f:
+                f.write(text)
 
     def load(self) -> None:
         try:
-            with open(self.path) as f:
-                serial = json.load(f)
+            with self.profiler.phase("read"):
+                with open(self.path) as f:
+                    text = f.read()
+        except FileNotFoundError:
+            self.chain = []
+            return
+        with self.profiler.phase("decode"):
+            serial = json.loads(text)
             self.chain = [
                 Block(
                     index=entry["index"],
@@ -69,5 +85,3 @@ class BlockchainMemory:
                 )
                 for entry in serial
             ]
-        except FileNotFoundError:
-            self.chain = []
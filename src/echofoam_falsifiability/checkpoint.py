@@ -0,0 +1,132 @@
+"""Periodic, atomic checkpoints of solver state.
+
+A solver given a :class:`Checkpointer` saves its fields, step counter, RNG
+state and history every ``every`` steps. Arrays are copied on the solver
+thread and written by a background thread, so the solver only waits for
+the disk if the previous checkpoint is still being written. Each write
+goes to a temporary file that is renamed over the checkpoint, so a killed
+job always leaves the last complete checkpoint behind::
+
+    ckpt = Checkpointer("laser.ckpt.npz", every=500)
+    laser_filamentation.run(grid_size=1000, timesteps=5000, checkpoint=ckpt)
+    # after a preemption, the same call with resume=True continues bit for bit
+    laser_filamentation.run(grid_size=1000, timesteps=5000, checkpoint=ckpt, resume=True)
+
+Resume with the same arguments as the interrupted run.
+"""
+
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+_META = "__meta__"
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"cannot store {type(value).__name__} in a checkpoint")
+
+
+def _decode(obj):
+    if "__ndarray__" in obj:
+        return np.array(obj["__ndarray__"], dtype=obj["dtype"])
+    return obj
+
+
+def write_checkpoint(path, arrays, meta):
+    """Atomically write ``arrays`` and the JSON-able ``meta`` to ``path``."""
+    tmp = f"{path}.tmp"
+    payload = dict(arrays)
+    payload[_META] = np.array(json.dumps(meta, default=_encode))
+    with open(tmp, "wb") as f:
+        np.savez(f, **payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    """Return ``(arrays, meta)`` from ``path``, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data[_META]), object_hook=_decode)
+        arrays = {name: data[name] for name in data.files if name != _META}
+    return arrays, meta
+
+
+class Checkpointer:
+    """Save solver state every ``every`` steps on a background thread.
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint file, rewritten in place.
+    every : int, optional
+        Steps between checkpoints.
+    """
+
+    def __init__(self, path, every=100):
+        self.path = path
+        self.every = every
+        self.saved_step = None
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = None
+        self._error = None
+
+    def due(self, step):
+        """True when the state after step ``step`` should be saved."""
+        return bool(self.every) and (step + 1) % self.every == 0
+
+    def load(self):
+        return load_checkpoint(self.path)
+
+    def save(self, step, arrays, meta=None):
+        """Queue the state reached after ``step`` steps for writing.
+
+        ``arrays`` are copied before returning, so the solver may keep
+        updating them in place.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, daemon=True)
+            self._thread.start()
+        arrays = {name: np.array(a, copy=True) for name, a in arrays.items()}
+        self._queue.put((arrays, {**(meta or {}), "step": step}))
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            arrays, meta = item
+            try:
+                write_checkpoint(self.path, arrays, meta)
+                self.saved_step = meta["step"]
+            except Exception as exc:  # surfaced by the next save() or close()
+                self._error = exc
+
+    def close(self):
+        """Wait for pending writes; raises if any of them failed."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
@@ -0,0 +1,415 @@
+"""Command line entry point, installed as ``echofoam``::
+
+    echofoam run simulation --steps 500 --seed 1 --out-dir runs/a --render
+    echofoam sweep laser_filamentation --param alpha=0.01,0.02 --param seed=0,1 --workers 4
+    echofoam render runs/a
+    echofoam bench --quick
+    echofoam chain add "first memory" --path memory_chain.json
+
+``run`` exposes every keyword of the model's ``run`` function as an option
+(``--grid-size``, ``--collapse-threshold``, ...); unspecified options keep
+the model defaults. Each run writes ``results.json`` and ``fields.npz`` to
+its output directory; runs with ``--tile-rows`` leave their fields in the
+``.npy`` tiles instead, listed as ``field_files`` in ``results.json``.
+Nothing is drawn unless ``render`` or ``run --render`` is used, and images
+are drawn with the Agg backend, so no display is needed.
+"""
+
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MODELS = ("simulation", "weather_simulation", "laser_filamentation", "teleportation", "weather_sphere")
+
+# keywords set from the output directory, or not meaningful on the command line
+_OUTPUT_PARAMS = ("profiler", "show", "save_path", "snapshot_dir", "frames_dir", "render_every",
+                  "checkpoint", "resume", "events", "cached", "tile_dir", "chi_history")
+
+# types of keywords whose default is None
+_NONE_TYPES = {
+    "seed": int,
+    "threads": int,
+    "workers": int,
+    "snapshot_every": int,
+    "save_interval": int,
+    "n": int,
+    "noise_dtype": str,
+    "stationary_tol": float,
+    "cfl": float,
+    "tile_rows": int,
+    "refine_threshold": float,
+}
+
+
+def _module(model):
+    if model not in MODELS:
+        raise ValueError(f"unknown model {model!r}, expected one of {', '.join(MODELS)}")
+    return importlib.import_module(f"echofoam_falsifiability.{model}")
+
+
+def model_params(model):
+    """Return ``{name: default}`` for the keywords ``run`` accepts from the CLI."""
+    module = _module(model)
+    params = {}
+    for fn in (module.run, getattr(module, "init_state", None)):
+        if fn is None:
+            continue
+        sig = inspect.signature(fn)
+        for name, p in sig.parameters.items():
+            if p.default is not p.empty and name not in _OUTPUT_PARAMS:
+                params.setdefault(name, p.default)
+        if not any(p.kind == p.VAR_KEYWORD for p in sig.parameters.values()):
+            break
+    return params
+
+
+def _scalar_type(name, default):
+    if default is None:
+        return _NONE_TYPES.get(name, str)
+    if isinstance(default, type) or isinstance(default, np.dtype):
+        return str
+    if isinstance(default, bool):
+        return lambda text: text.lower() in ("1", "true", "yes", "on")
+    return type(default)
+
+
+def parse_value(name, default, text):
+    """Convert command line ``text`` to the type of ``default``."""
+    if isinstance(default, tuple):
+        item_type = _scalar_type(name, default[0] if default else None)
+        return tuple(item_type(t) for t in text.split(","))
+    return _scalar_type(name, default)(text)
+
+
+def _jsonable(value):
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (type, np.dtype)):
+        return np.dtype(value).name
+    return value
+
+
+def run_model(model, params=None, out_dir=None, render=False, profile=False,
+              checkpoint_every=None, resume=False, cached=False):
+    """Run ``model`` with ``params`` and write its results into ``out_dir``.
+
+    Returns the summary written to ``results.json``. The final fields go to
+    ``fields.npz``, except memory-mapped ones, which stay in their ``.npy``
+    files and are listed by path as ``field_files``; ``render`` also draws
+    them to ``fields.png`` in the same process, and ``profile`` writes a
+    per-phase ``profile.json`` and a Chrome ``trace.json``.
+    ``checkpoint_every`` saves ``checkpoint.npz`` every so many steps and
+    ``resume`` continues from it. Models that detect collapse events stream
+    them to ``collapse_events.bin``. ``cached`` loads the results from the
+    ``result_cache`` when the same run was made before.
+    """
+    params = dict(params or {})
+    out_dir = out_dir or os.path.join("runs", model)
+    os.makedirs(out_dir, exist_ok=True)
+    run = _module(model).run
+    accepted = inspect.signature(run).parameters
+
+    extra = {}
+    if "save_path" in accepted:
+        extra["save_path"] = os.path.join(out_dir, f"{model}.png") if render else None
+    if "snapshot_dir" in accepted:
+        extra["snapshot_dir"] = os.path.join(out_dir, "snapshots")
+    if "frames_dir" in accepted:
+        extra["frames_dir"] = os.path.join(out_dir, "frames")
+    if "tile_dir" in accepted:
+        extra["tile_dir"] = os.path.join(out_dir, "tiles")
+    profiler = None
+    if profile:
+        if "profiler" not in accepted:
+            raise ValueError(f"{model} does not support profiling")
+        from echofoam_falsifiability.profiling import Profiler
+
+        profiler = extra["profiler"] = Profiler()
+    if checkpoint_every or resume:
+        from echofoam_falsifiability.checkpoint import Checkpointer
+
+        extra["checkpoint"] = Checkpointer(os.path.join(out_dir, "checkpoint.npz"), checkpoint_every)
+        extra["resume"] = resume
+    if cached:
+        if "cached" not in accepted:
+            raise ValueError(f"{model} does not support caching")
+        extra["cached"] = True
+    elif "events" in accepted:
+        from echofoam_falsifiability.collapse_events import EventRecorder
+
+        path = os.path.join(out_dir, "collapse_events.bin")
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        extra["events"] = EventRecorder(path)
+
+    start = time.perf_counter()
+    try:
+        result = run(**params, **extra)
+    finally:
+        if "events" in extra:
+            extra["events"].close()
+    seconds = time.perf_counter() - start
+    if isinstance(result, tuple):  # weather_sphere returns the final fields
+        result = {"fields": dict(zip(("tau", "psi", "chi"), result))}
+
+    fields = result.pop("fields", None) or {}
+    field_files = {}
+    if any(isinstance(field, np.memmap) for field in fields.values()):
+        # tiled fields may not fit in memory; point to the tiles rather than copy them
+        for name, field in fields.items():
+            field.flush()
+            field_files[name] = os.path.relpath(field.filename, out_dir)
+    elif fields:
+        np.savez(os.path.join(out_dir, "fields.npz"), **fields)
+    summary = {"model": model, "params": _jsonable(params), "seconds": seconds,
+               **_jsonable(result)}
+    if field_files:
+        summary["field_files"] = field_files
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    if "verdict" in result:
+        with open(os.path.join(out_dir, "epcd_results.txt"), "w") as f:
+            f.write(result["verdict"] + "\n")
+    if profiler is not None:
+        profiler.write_report(os.path.join(out_dir, "profile.json"))
+        profiler.write_chrome_trace(os.path.join(out_dir, "trace.json"))
+    if render and fields:
+        render_fields(fields, out_dir, title=model)
+    return summary
+
+
+def render_fields(fields, out_dir, title=None, max_pixels=512):
+    """Draw every field side by side into ``out_dir/fields.png``.
+
+    Complex fields are drawn as magnitudes and 3D shells by their middle
+    radial layer. Fields larger than ``max_pixels`` on a side are drawn
+    from every n-th cell, so memory-mapped fields are never read whole.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, len(fields), figsize=(4 * len(fields), 4), squeeze=False)
+    for ax, (name, field) in zip(axes[0], fields.items()):
+        field = np.asanyarray(field)  # keeps memory maps unread
+        if field.ndim == 3:
+            field = field[field.shape[0] // 2]
+        stride = -(-max(field.shape) // max_pixels)
+        field = np.asarray(field[(slice(None, None, stride),) * field.ndim])
+        if np.iscomplexobj(field):
+            field = np.abs(field)
+        im = ax.imshow(field, origin="lower", cmap="viridis")
+        fig.colorbar(im, ax=ax, fraction=0.046)
+        ax.set_title(name)
+        ax.set_xticks([])
+        ax.set_yticks([])
+    if title:
+        fig.suptitle(title)
+    fig.tight_layout()
+    path = os.path.join(out_dir, "fields.png")
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def render_run(run_dir):
+    """Render the ``fields.npz`` or the field tiles of a finished run directory."""
+    summary = {}
+    results = os.path.join(run_dir, "results.json")
+    if os.path.exists(results):
+        with open(results) as f:
+            summary = json.load(f)
+    title = summary.get("model")
+    if "field_files" in summary:
+        fields = {name: np.load(os.path.join(run_dir, path), mmap_mode="r")
+                  for name, path in summary["field_files"].items()}
+        return render_fields(fields, run_dir, title)
+    with np.load(os.path.join(run_dir, "fields.npz")) as data:
+        fields = {name: data[name] for name in data.files}
+    return render_fields(fields, run_dir, title)
+
+
+def _sweep_job(args):
+    model, params, out_dir, render, cached = args
+    return run_model(model, params, out_dir, render=render, cached=cached)
+
+
+def sweep_model(model, grid, base=None, out_dir=None, workers=1, render=False, cached=False):
+    """Run ``model`` for every combination of the values in ``grid``.
+
+    ``grid`` maps keyword names to lists of values and ``base`` holds
+    keywords shared by every run. Run ``i`` writes to ``out_dir/iiii`` and
+    its summary is appended to ``out_dir/sweep.jsonl`` and collected in a
+    columnar ``sweep.parquet`` (``sweep.npz`` without pyarrow), see
+    ``results_table``; with ``cached`` runs made before are loaded from the
+    result cache. Returns the summaries in combination order.
+    """
+    out_dir = out_dir or os.path.join("sweeps", model)
+    os.makedirs(out_dir, exist_ok=True)
+    names = list(grid)
+    jobs = [
+        (model, {**(base or {}), **dict(zip(names, values))}, os.path.join(out_dir, f"{i:04d}"),
+         render, cached)
+        for i, values in enumerate(itertools.product(*(grid[n] for n in names)))
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(_sweep_job, jobs))
+    else:
+        summaries = [_sweep_job(job) for job in jobs]
+    rows = [{"run_dir": job[2], **summary} for job, summary in zip(jobs, summaries)]
+    with open(os.path.join(out_dir, "sweep.jsonl"), "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    from echofoam_falsifiability.results_table import EXTENSIONS, default_format, write_results
+
+    table_format = default_format()
+    write_results(rows, os.path.join(out_dir, "sweep" + EXTENSIONS[table_format]), table_format)
+    return summaries
+
+
+def _add_model_options(parser, model):
+    for name, default in model_params(model).items():
+        option = "--" + name.replace("_", "-")
+        if isinstance(default, tuple):
+            parser.add_argument(option, dest=name, nargs="+", default=argparse.SUPPRESS,
+                                type=_scalar_type(name, default[0] if default else None),
+                                help=f"default: {' '.join(map(str, default))}")
+        else:
+            shown = np.dtype(default).name if isinstance(default, type) else default
+            parser.add_argument(option, dest=name, default=argparse.SUPPRESS,
+                                type=_scalar_type(name, default), help=f"default: {shown}")
+
+
+def _chain(args):
+    import zlib
+
+    from echofoam_falsifiability.blockchain_memory import BlockchainMemory
+
+    mem = BlockchainMemory(args.path)
+    if args.chain_command == "add":
+        block = mem.add_memory(" ".join(args.text))
+        print(block.index, block.hash)
+    elif args.chain_command == "list":
+        for block in mem.chain:
+            print(block.index, block.hash, zlib.decompress(block.data).decode())
+    elif args.chain_command == "get":
+        block = mem.get_block(args.hash)
+        if block is None:
+            print(f"no block {args.hash}", file=sys.stderr)
+            return 1
+        print(zlib.decompress(block.data).decode())
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="echofoam", description="Echofoam falsifiability suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run one model headless")
+    models = run.add_subparsers(dest="model", required=True)
+    for model in MODELS:
+        sub = models.add_parser(model, help=f"run {model}")
+        _add_model_options(sub, model)
+        sub.add_argument("--out-dir", help=f"output directory (default: runs/{model})")
+        sub.add_argument("--render", action="store_true", help="draw the final fields to fields.png")
+        sub.add_argument("--profile", action="store_true",
+                         help="write profile.json and a Chrome trace.json")
+        sub.add_argument("--checkpoint-every", type=int, metavar="N",
+                         help="save checkpoint.npz in the output directory every N steps")
+        sub.add_argument("--resume", action="store_true",
+                         help="continue from the checkpoint in the output directory")
+        sub.add_argument("--cached", action="store_true",
+                         help="reuse the results of an identical seeded run")
+
+    sweep = commands.add_parser("sweep", help="run a model over a parameter grid")
+    sweep.add_argument("model", help=f"one of {', '.join(MODELS)}")
+    sweep.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2",
+                       help="values to sweep; repeat for a cartesian product")
+    sweep.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                       help="keyword shared by every run")
+    sweep.add_argument("--out-dir", help="output directory (default: sweeps/<model>)")
+    sweep.add_argument("--workers", type=int, default=1, help="concurrent runs")
+    sweep.add_argument("--render", action="store_true", help="draw the fields of every run")
+    sweep.add_argument("--cached", action="store_true",
+                       help="reuse the results of identical seeded runs")
+
+    render = commands.add_parser("render", help="draw fields.png for finished runs")
+    render.add_argument("run_dirs", nargs="+", metavar="run_dir")
+
+    commands.add_parser("bench", add_help=False,
+                        help="benchmarks; options are passed to echofoam_falsifiability.bench")
+
+    chain = commands.add_parser("chain", help="inspect or extend a memory chain")
+    chain.add_argument("--path", default="memory_chain.json", help="chain JSON file")
+    chain_commands = chain.add_subparsers(dest="chain_command", required=True)
+    chain_commands.add_parser("add", help="append a memory").add_argument("text", nargs="+")
+    chain_commands.add_parser("list", help="print every block")
+    chain_commands.add_parser("get", help="print the memory of a block").add_argument("hash")
+    return parser
+
+
+def _parse_assignments(parser, model, items, many):
+    defaults = model_params(model)
+    out = {}
+    for item in items:
+        name, sep, text = item.partition("=")
+        name = name.replace("-", "_")
+        if not sep or name not in defaults:
+            parser.error(f"bad parameter {item!r} for {model}")
+        default = defaults[name]
+        if many and not isinstance(default, tuple):
+            out[name] = [parse_value(name, default, t) for t in text.split(",")]
+        else:
+            out[name] = parse_value(name, default, text)
+    return out
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        from echofoam_falsifiability import bench
+
+        return bench.main(extra)
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    if args.command == "run":
+        params = {k: v for k, v in vars(args).items()
+                  if k not in ("command", "model", "out_dir", "render", "profile",
+                               "checkpoint_every", "resume", "cached")}
+        params = {k: tuple(v) if isinstance(v, list) else v for k, v in params.items()}
+        summary = run_model(args.model, params, args.out_dir, args.render, args.profile,
+                            args.checkpoint_every, args.resume, args.cached)
+        print(json.dumps({k: v for k, v in summary.items() if k != "chi_history"}))
+    elif args.command == "sweep":
+        if args.model not in MODELS:
+            parser.error(f"unknown model {args.model!r}")
+        grid = _parse_assignments(parser, args.model, args.param, many=True)
+        base = _parse_assignments(parser, args.model, args.set, many=False)
+        summaries = sweep_model(args.model, grid, base, args.out_dir, args.workers, args.render,
+                                args.cached)
+        print(f"{len(summaries)} runs written")
+    elif args.command == "render":
+        for run_dir in args.run_dirs:
+            print(render_run(run_dir))
+    elif args.command == "chain":
+        return _chain(args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
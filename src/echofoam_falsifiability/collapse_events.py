@@ -0,0 +1,255 @@
+"""Detection and on-disk recording of collapse events.
+
+A collapse event is a region where a field exceeds its collapse threshold.
+:func:`detect` finds either the single hottest cell (``"argmax"``) or every
+4-connected region above the threshold (``"components"``), and describes
+each as one record of :data:`EVENT_DTYPE`: the step, the intensity-weighted
+center ``(x, y)`` in grid cells (x along columns), the peak value and the
+number of cells. :class:`EventRecorder` streams the records to a flat
+binary file that :func:`load_events` maps back without parsing::
+
+    with EventRecorder("collapse_events.bin") as events:
+        laser_filamentation.run(grid_size=512, timesteps=5000, events=events)
+    ev = load_events("collapse_events.bin")
+    print(len(ev), ev["magnitude"].max())
+
+Connected components are labelled with ``scipy.ndimage`` when SciPy is
+installed and with a NumPy union-find otherwise. :func:`detect_tiled` finds
+the same events in a memory-mapped field one band of rows at a time.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+EVENT_DTYPE = np.dtype([
+    ("step", "<i8"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("magnitude", "<f4"),
+    ("area", "<i4"),
+])
+
+MODES = ("argmax", "components")
+
+
+def _union(n, a, b):
+    """Root of each of ``n`` nodes after joining the pairs ``a[i]``, ``b[i]``; roots are the smallest members."""
+    parent = np.arange(n)
+    while True:
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            return parent
+        # hook the larger root under the smaller one, then flatten the trees
+        np.minimum.at(parent, np.maximum(ra, rb)[differ], np.minimum(ra, rb)[differ])
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def _label_numpy(mask):
+    """4-connected labels of ``mask``, numbered from 1 in raster order of their first cell."""
+    n_cols = mask.shape[1]
+    rows, cols = np.nonzero(mask[:, :-1] & mask[:, 1:])
+    right = rows * n_cols + cols
+    rows, cols = np.nonzero(mask[:-1] & mask[1:])
+    down = rows * n_cols + cols
+    parent = _union(mask.size, np.concatenate([right, down]),
+                    np.concatenate([right + 1, down + n_cols]))
+    cells = np.flatnonzero(mask)
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    roots, inverse = np.unique(parent[cells], return_inverse=True)
+    labels.reshape(-1)[cells] = inverse + 1
+    return labels, len(roots)
+
+
+def label(mask):
+    """Return ``(labels, count)`` of the 4-connected regions of ``mask``."""
+    if SCIPY_AVAILABLE:
+        from scipy import ndimage
+
+        return ndimage.label(mask)
+    return _label_numpy(mask)
+
+
+def _component_stats(field, labels, count, row0=0):
+    """Per-label weight, weighted column and row sums, peak, area and first flat index.
+
+    Rows are numbered from ``row0``, for fields split into row bands.
+    """
+    rows, cols = np.nonzero(labels)
+    ids = labels[rows, cols] - 1
+    values = field[rows, cols].astype(np.float64)
+    rows = rows + row0
+    peak = np.full(count, -np.inf)
+    np.maximum.at(peak, ids, values)
+    first = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(first, ids, rows.astype(np.int64) * field.shape[1] + cols)
+    return (np.bincount(ids, weights=values, minlength=count),
+            np.bincount(ids, weights=values * cols, minlength=count),
+            np.bincount(ids, weights=values * rows, minlength=count),
+            peak, np.bincount(ids, minlength=count), first)
+
+
+def _events(step, weight, sum_x, sum_y, peak, area):
+    events = np.zeros(len(weight), dtype=EVENT_DTYPE)
+    events["step"] = step
+    events["x"] = sum_x / weight
+    events["y"] = sum_y / weight
+    events["magnitude"] = peak
+    events["area"] = area
+    return events
+
+
+def detect(field, threshold, step, mode="components"):
+    """Collapse events of ``field`` above ``threshold`` at ``step``.
+
+    Returns a structured array of :data:`EVENT_DTYPE`, empty when nothing
+    exceeds the threshold.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown event mode {mode!r}, expected one of {', '.join(MODES)}")
+    mask = field > threshold
+    if mode == "argmax":
+        if not mask.any():
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        row, col = np.unravel_index(np.argmax(field), field.shape)
+        return np.array([(step, col, row, field[row, col], np.count_nonzero(mask))],
+                        dtype=EVENT_DTYPE)
+
+    labels, count = label(mask)
+    if not count:
+        return np.zeros(0, dtype=EVENT_DTYPE)
+    return _events(step, *_component_stats(field, labels, count)[:5])
+
+
+def detect_tiled(field, threshold, step, mode="components", tile_rows=1024):
+    """:func:`detect` reading ``field`` in bands of ``tile_rows`` rows.
+
+    Only one band is in memory at a time, so ``field`` may be a memory map
+    larger than RAM. Regions that cross band edges are joined.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown event mode {mode!r}, expected one of {', '.join(MODES)}")
+    n_rows = field.shape[0]
+    if mode == "argmax":
+        best, where, area = -np.inf, None, 0
+        for r0 in range(0, n_rows, tile_rows):
+            band = np.asarray(field[r0:r0 + tile_rows])
+            area += int(np.count_nonzero(band > threshold))
+            i = int(np.argmax(band))
+            if band.flat[i] > best:
+                best = band.flat[i]
+                where = np.unravel_index(i, band.shape)
+                where = (where[0] + r0, where[1])
+        if not area:
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        return np.array([(step, where[1], where[0], best, area)], dtype=EVENT_DTYPE)
+
+    stats, pairs = [], []
+    offset, previous = 0, None
+    for r0 in range(0, n_rows, tile_rows):
+        band = np.asarray(field[r0:r0 + tile_rows])
+        labels, count = label(band > threshold)
+        if count:
+            stats.append(_component_stats(band, labels, count, r0))
+        edge = labels[[0, -1]].astype(np.int64)
+        edge[edge > 0] += offset
+        if previous is not None:
+            # regions touching across the band edge are one region
+            joined = (previous > 0) & (edge[0] > 0)
+            pairs.append((previous[joined] - 1, edge[0][joined] - 1))
+        previous = edge[1]
+        offset += count
+    if not offset:
+        return np.zeros(0, dtype=EVENT_DTYPE)
+    a = np.concatenate([p[0] for p in pairs]) if pairs else np.zeros(0, dtype=np.int64)
+    b = np.concatenate([p[1] for p in pairs]) if pairs else np.zeros(0, dtype=np.int64)
+    weight, sum_x, sum_y, peak, area, first = (np.concatenate(parts) for parts in zip(*stats))
+    roots, ids = np.unique(_union(offset, a, b), return_inverse=True)
+    count = len(roots)
+    merged_first = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(merged_first, ids, first)
+    merged_peak = np.full(count, -np.inf)
+    np.maximum.at(merged_peak, ids, peak)
+    events = _events(step, np.bincount(ids, weights=weight, minlength=count),
+                     np.bincount(ids, weights=sum_x, minlength=count),
+                     np.bincount(ids, weights=sum_y, minlength=count),
+                     merged_peak, np.bincount(ids, weights=area, minlength=count))
+    # number the regions in raster order of their first cell, as label() does
+    return events[np.argsort(merged_first, kind="stable")]
+
+
+class EventRecorder:
+    """Append event records to ``path``, buffered in memory.
+
+    Parameters
+    ----------
+    path : str
+        Binary file of :data:`EVENT_DTYPE` records; existing records are
+        kept and new ones appended.
+    buffer_size : int, optional
+        Records held in memory between writes.
+    """
+
+    def __init__(self, path, buffer_size=65536):
+        self.path = path
+        self._buffer = np.zeros(buffer_size, dtype=EVENT_DTYPE)
+        self._used = 0
+        self._file = open(path, "ab")
+        self.count = self._file.tell() // EVENT_DTYPE.itemsize
+
+    def record(self, events):
+        """Append a structured array of events."""
+        events = np.asarray(events, dtype=EVENT_DTYPE)
+        if self._used + len(events) > len(self._buffer):
+            self.flush()
+        if len(events) > len(self._buffer):
+            events.tofile(self._file)
+        else:
+            self._buffer[self._used:self._used + len(events)] = events
+            self._used += len(events)
+        self.count += len(events)
+
+    def flush(self):
+        if self._used:
+            self._buffer[:self._used].tofile(self._file)
+            self._used = 0
+        self._file.flush()
+
+    def discard_from(self, step):
+        """Drop the recorded events of ``step`` and later, e.g. when resuming a run."""
+        self.flush()
+        steps = np.memmap(self.path, dtype=EVENT_DTYPE, mode="r")["step"] if self.count else []
+        keep = int(np.searchsorted(steps, step, side="left"))
+        del steps
+        self._file.truncate(keep * EVENT_DTYPE.itemsize)
+        self._file.seek(0, os.SEEK_END)
+        self.count = keep
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def load_events(path, mmap=True):
+    """Return the events recorded in ``path``; memory-mapped unless ``mmap`` is False."""
+    if not os.path.getsize(path):
+        return np.zeros(0, dtype=EVENT_DTYPE)
+    if mmap:
+        return np.memmap(path, dtype=EVENT_DTYPE, mode="r")
+    return np.fromfile(path, dtype=EVENT_DTYPE)
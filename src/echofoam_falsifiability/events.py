@@ -0,0 +1,104 @@
+"""Buffered, append-only logging of interface events.
+
+:class:`EventSink` keeps events in a bounded in-memory ring buffer and
+appends them to a JSON Lines file from a background thread, every
+``flush_every`` events or ``flush_interval`` seconds, whichever comes
+first. Logging an event only appends a tuple to the buffer, so it never
+waits for the disk::
+
+    sink = EventSink("memory.jsonl")
+    sink.log("move", 120, 40)
+    sink.close()  # writes whatever is still buffered
+
+Each line of the log is ``{"t": ..., "type": ..., "x": ..., "y": ...}``;
+:func:`read_events` loads them back.
+"""
+
+import collections
+import json
+import threading
+import time
+
+
+class EventSink:
+    """Append events to ``path`` from a background thread.
+
+    Parameters
+    ----------
+    path : str
+        JSON Lines log, appended to.
+    flush_every : int, optional
+        Buffered events that wake the writer.
+    flush_interval : float, optional
+        Seconds after which the writer flushes a partial buffer.
+    capacity : int, optional
+        Size of the ring buffer. When the writer falls this far behind the
+        oldest events are overwritten and counted in ``dropped``.
+    """
+
+    def __init__(self, path, flush_every=256, flush_interval=0.5, capacity=65536):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.dropped = 0
+        self.written = 0
+        self._buffer = collections.deque(maxlen=capacity)
+        self._pending = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = open(path, "a")
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def log(self, event_type, x, y):
+        """Buffer one event; returns immediately."""
+        if len(self._buffer) == self.capacity:
+            self.dropped += 1
+        self._buffer.append((time.time(), event_type, x, y))
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._pending = 0
+            self._wake.set()
+
+    def _drain(self):
+        lines = []
+        while True:
+            try:
+                t, event_type, x, y = self._buffer.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps({"t": t, "type": event_type, "x": x, "y": y}) + "\n")
+        if lines:
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.written += len(lines)
+
+    def _writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def close(self):
+        """Stop the writer and append everything still buffered."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def read_events(path):
+    """Return the events logged to ``path`` as a list of dicts."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,35 +1,174 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 
+from echofoam_falsifiability.collapse_events import detect, detect_tiled
+from echofoam_falsifiability.profiling import NULL_PROFILER
+from echofoam_falsifiability.rng import fill_uniform, make_rng
 
-def create_animation(grid_size=128, timesteps=400, alpha=0.01, beta=0.05,
-                      collapse_threshold=2.0, intensity_threshold=0.1):
+
+def _collapse(psi, rng, buf):
+    """Replace psi in place by weak random noise, as after a collapse."""
+    np.multiply(fill_uniform(rng, buf), 0.1, out=psi.real)
+    np.multiply(fill_uniform(rng, buf), 0.1, out=psi.imag)
+
+
+def _coherence(psi):
+    """chi = |<psi>| / <|psi|>, accumulated in double precision."""
+    return float(np.abs(np.mean(psi, dtype=np.complex128))
+                 / (np.mean(np.abs(psi), dtype=np.float64) + 1e-8))
+
+
+def _init_fields(grid_size, dtype, noise_dtype):
     x = np.linspace(-1, 1, grid_size)
     y = np.linspace(-1, 1, grid_size)
     X, Y = np.meshgrid(x, y)
 
-    psi = np.exp(-(X**2 + Y**2) * 20).astype(np.complex128)
-    tau = np.ones((grid_size, grid_size))
+    # Initial coherent Gaussian beam
+    psi = np.exp(-(X**2 + Y**2) * 20).astype(dtype)
+    tau = np.ones((grid_size, grid_size), dtype=psi.real.dtype)
+    buf = np.empty((grid_size, grid_size), dtype=noise_dtype or tau.dtype)
+    return psi, tau, buf
+
+
+# psi is stored divided by its decoherence factor; fold the factor back in
+# before it underflows
+_MIN_SCALE = 1e-100
+
+
+def _open_tiled_fields(grid_size, dtype, tile_rows, tile_dir):
+    """``.npy`` memory maps of psi and tau in ``tile_dir``, initialized band by band."""
+    from numpy.lib.format import open_memmap
+
+    os.makedirs(tile_dir, exist_ok=True)
+    dtype = np.dtype(dtype)
+    shape = (grid_size, grid_size)
+    psi = open_memmap(os.path.join(tile_dir, "psi.npy"), mode="w+", dtype=dtype, shape=shape)
+    tau = open_memmap(os.path.join(tile_dir, "tau.npy"), mode="w+", dtype=psi.real.dtype, shape=shape)
+    x = np.linspace(-1, 1, grid_size)
+    for r0 in range(0, grid_size, tile_rows):
+        y = x[r0:r0 + tile_rows, None]
+        psi[r0:r0 + tile_rows] = np.exp(-(x**2 + y**2) * 20)
+        tau[r0:r0 + tile_rows] = 1.0
+    return psi, tau
+
+
+def _tile_step(psi, tau, r0, r1, shift, scale, alpha, beta, intensity_threshold):
+    """Deposit the intensity of rows ``r0:r1`` into tau.
+
+    The stored psi is rolled by ``-shift`` columns and scaled by
+    ``1 / scale`` against the true field. Returns the largest tau and the
+    sums of psi and ``|psi|`` (of the stored field) over the band.
+    """
+    band = np.asarray(psi[r0:r1])
+    magnitude = np.abs(band)
+    sums = (band.sum(dtype=np.complex128), magnitude.sum(dtype=np.float64))
+    intensity = np.roll(magnitude, shift, axis=1)
+    intensity *= scale
+    intensity *= intensity
+    t = tau[r0:r1]
+    t += alpha * intensity
+    t += beta * (intensity > intensity_threshold) * intensity**2
+    return (t.max(),) + sums
+
+
+def _run_tiled(grid_size, timesteps, alpha, beta, collapse_threshold, intensity_threshold, rng,
+               dtype, noise_dtype, prof, events, event_mode, tile_rows, threads, tile_dir):
+    """Step the laser on memory-mapped fields in bands of ``tile_rows`` rows.
+
+    Instead of moving psi every step, the propagation is kept as a column
+    ``shift`` and the decoherence as a ``scale`` factor, so psi is only
+    read, and written only at a collapse and at the end. tau is updated
+    band by band on a pool of ``threads``, and the collapse check and the
+    chi sums are reduced over the bands.
+    """
+    psi, tau = _open_tiled_fields(grid_size, dtype, tile_rows, tile_dir)
+    bands = [(r0, min(r0 + tile_rows, grid_size)) for r0 in range(0, grid_size, tile_rows)]
+    buf = np.empty((tile_rows, grid_size), dtype=noise_dtype or tau.dtype)
+    size = grid_size * grid_size
+    shift, scale = 0, 1.0
     chi_history = []
+    collapses = 0
+
+    def rescale(r0, r1):
+        psi[r0:r1] = np.roll(psi[r0:r1], shift, axis=1) * scale
+
+    def reset_tau(r0, r1):
+        tau[r0:r1] = 1.0
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for t in range(timesteps):
+            # propagation by one column to the right
+            shift = (shift + 1) % grid_size
+            with prof.phase("tiles"):
+                results = list(pool.map(
+                    lambda band: _tile_step(psi, tau, *band, shift, scale, alpha, beta,
+                                            intensity_threshold), bands))
+            tau_max = max(r[0] for r in results)
+
+            if tau_max > collapse_threshold:
+                collapses += 1
+                if events is not None:
+                    with prof.phase("collapse_events"):
+                        events.record(detect_tiled(tau, collapse_threshold, t, event_mode, tile_rows))
+                with prof.phase("collapse_noise"):
+                    # same draws, in the same order, as the in-memory solver
+                    for part in ("real", "imag"):
+                        for r0, r1 in bands:
+                            noise = fill_uniform(rng, buf[:r1 - r0])
+                            np.multiply(noise, 0.1, out=getattr(psi[r0:r1], part))
+                    list(pool.map(lambda band: reset_tau(*band), bands))
+                shift, scale = 0, 1.0
+                chi = 0.0
+            else:
+                with prof.phase("chi"):
+                    total = sum(r[1] for r in results)
+                    total_abs = sum(r[2] for r in results)
+                    chi = float(abs(scale * total / size) / (scale * total_abs / size + 1e-8))
+            chi_history.append(chi)
+
+            scale *= 0.999  # gradual decoherence
+            if scale < _MIN_SCALE:
+                list(pool.map(lambda band: rescale(*band), bands))
+                shift, scale = 0, 1.0
+
+        with prof.phase("finalize"):
+            list(pool.map(lambda band: rescale(*band), bands))
+    psi.flush()
+    tau.flush()
+    return {"chi_history": chi_history, "collapses": collapses, "fields": {"psi": psi, "tau": tau}}
+
+
+def create_animation(grid_size=128, timesteps=400, alpha=0.01, beta=0.05,
+                      collapse_threshold=2.0, intensity_threshold=0.1, seed=None,
+                      dtype=np.complex128, drop_frames=False, max_pixels=512):
+    """Build the live figure; ``drop_frames`` and ``max_pixels`` configure ``viewer.Viewer``."""
+    import matplotlib.pyplot as plt
+
+    from echofoam_falsifiability.viewer import Viewer
+
+    psi, tau, buf = _init_fields(grid_size, dtype, None)
+    rng = make_rng(seed)
 
     fig, axes = plt.subplots(1, 3, figsize=(12, 4))
-    im0 = axes[0].imshow(np.abs(psi), origin="lower", cmap="viridis",
-                         vmin=0, vmax=1, animated=True)
+    viewer = Viewer(fig, max_pixels=max_pixels, drop_frames=drop_frames)
+    psi_panel = viewer.image(axes[0], np.abs(psi), origin="lower", cmap="viridis",
+                             vmin=0, vmax=1)
     axes[0].set_title(r"$|\psi|")
-    fig.colorbar(im0, ax=axes[0])
+    fig.colorbar(psi_panel.image, ax=axes[0])
 
-    im1 = axes[1].imshow(tau, origin="lower", cmap="plasma",
-                         vmin=1, vmax=collapse_threshold, animated=True)
+    tau_panel = viewer.image(axes[1], tau, origin="lower", cmap="plasma",
+                             vmin=1, vmax=collapse_threshold)
     axes[1].set_title(r"$\tau$")
-    fig.colorbar(im1, ax=axes[1])
+    fig.colorbar(tau_panel.image, ax=axes[1])
 
-    line, = axes[2].plot([], [], animated=True)
+    chi_trace = viewer.trace(axes[2], timesteps)
     axes[2].set_xlim(0, timesteps)
     axes[2].set_ylim(0, 1)
     axes[2].set_title(r"$\chi$")
 
-    def update(t):
+    def advance(t):
         nonlocal psi, tau
         psi = np.roll(psi, 1, axis=1)
         intensity = np.abs(psi) ** 2
@@ -37,28 +176,184 @@ def create_animation(grid_size=128, timesteps=400, alpha=0.01, beta=0.05,
         tau += beta * (intensity > intensity_threshold) * intensity**2
 
         if np.any(tau > collapse_threshold):
-            psi = (np.random.rand(grid_size, grid_size) +
-                   1j * np.random.rand(grid_size, grid_size)) * 0.1
+            _collapse(psi, rng, buf)
             tau[:] = 1.0
             chi = 0.0
         else:
-            chi = np.abs(np.mean(psi)) / (np.mean(np.abs(psi)) + 1e-8)
-        chi_history.append(chi)
+            chi = _coherence(psi)
+        chi_trace.append(chi)
 
         psi *= 0.999
 
-        im0.set_data(np.abs(psi))
-        im1.set_data(tau)
-        line.set_data(np.arange(len(chi_history)), chi_history)
-        return im0, im1, line
+    def draw(t):
+        psi_panel.set_data(np.abs(psi))
+        tau_panel.set_data(tau)
+        chi_trace.draw()
+        return viewer.artists
 
-    anim = FuncAnimation(fig, update, frames=timesteps, interval=50, blit=True)
+    anim = viewer.animate(advance, draw, timesteps)
     fig.tight_layout()
     return fig, anim
 
 
+def run_simulation(grid_size=1000, timesteps=5000, save_interval=25,
+                   alpha=0.01, beta=0.05, collapse_threshold=2.0,
+                   intensity_threshold=0.1, seed=None, dtype=np.complex128,
+                   noise_dtype=None, profiler=None, checkpoint=None, resume=False, cached=False):
+    """Run a simple 2D laser filamentation simulation.
+
+    Frames are written to ``frames/`` every ``save_interval`` steps; pass
+    ``None`` or 0 to run headless. ``dtype`` is the complex type of psi (tau
+    uses the matching real type) and ``noise_dtype`` the type of the
+    collapse noise draws. ``profiler`` times the phases of each step, see
+    ``profiling.Profiler``, and ``checkpoint``/``resume`` save and restore
+    the state as in :func:`run`, and ``cached`` reuses an earlier run with
+    the same arguments as in :func:`run`. Returns the chi history.
+    """
+    return run(grid_size, timesteps, save_interval, alpha, beta, collapse_threshold,
+               intensity_threshold, seed, dtype, noise_dtype, profiler,
+               checkpoint=checkpoint, resume=resume, cached=cached)["chi_history"]
+
+
+def run(grid_size=1000, timesteps=5000, save_interval=None, alpha=0.01, beta=0.05,
+        collapse_threshold=2.0, intensity_threshold=0.1, seed=None, dtype=np.complex128,
+        noise_dtype=None, profiler=None, frames_dir="frames", checkpoint=None, resume=False,
+        events=None, event_mode="components", cached=False, tile_rows=None, threads=None,
+        tile_dir="laser_tiles"):
+    """Like :func:`run_simulation`, headless by default.
+
+    Frames go to ``frames_dir``. ``checkpoint`` is a
+    ``checkpoint.Checkpointer``; with ``resume`` the run continues from its
+    last checkpoint, if there is one. ``events`` is a
+    ``collapse_events.EventRecorder`` that receives the regions of tau above
+    ``collapse_threshold`` at every collapse, found by ``event_mode`` (see
+    ``collapse_events.detect``). With ``cached`` (True or a
+    ``result_cache.ResultCache``) a seeded run is loaded from the result
+    cache when it has been run before; frames are then not redrawn.
+
+    With ``tile_rows`` the fields live in ``.npy`` memory maps in
+    ``tile_dir`` and are stepped in bands of that many rows on ``threads``
+    worker threads, so the grid is bounded by disk rather than RAM. The
+    result agrees with the in-memory run to rounding; frames and
+    checkpoints are not supported in this mode.
+
+    Returns a dict with the ``chi_history``, the number of ``collapses``
+    and the final ``fields`` psi and tau.
+    """
+    if cached:
+        from echofoam_falsifiability.result_cache import cached_call
+
+        return cached_call("laser_filamentation", run, locals(), cached)
+    prof = profiler or NULL_PROFILER
+    rng = make_rng(seed)
+    if tile_rows:
+        if save_interval or checkpoint is not None:
+            raise ValueError("frames and checkpoints are not supported with tile_rows")
+        try:
+            return _run_tiled(grid_size, timesteps, alpha, beta, collapse_threshold,
+                              intensity_threshold, rng, dtype, noise_dtype, prof, events, event_mode,
+                              tile_rows, threads, tile_dir)
+        finally:
+            if events is not None:
+                events.flush()
+    psi, tau, buf = _init_fields(grid_size, dtype, noise_dtype)
+    chi_history = []
+    collapses = 0
+
+    if save_interval:
+        import matplotlib.pyplot as plt
+
+        os.makedirs(frames_dir, exist_ok=True)
+
+    start = 0
+    if checkpoint is not None and resume:
+        saved = checkpoint.load()
+        if saved is not None:
+            arrays, meta = saved
+            psi, tau = arrays["psi"], arrays["tau"]
+            chi_history = arrays["chi_history"].tolist()
+            rng.bit_generator.state = meta["rng"]
+            collapses = meta.get("collapses", 0)
+            start = meta["step"]
+    if events is not None and resume:
+        # events past the checkpoint (all of them without one) are recorded again
+        events.discard_from(start)
+
+    try:
+        for t in range(start, timesteps):
+            with prof.phase("propagate"):
+                # Propagate beam by shifting right
+                psi = np.roll(psi, 1, axis=1)
+
+            with prof.phase("intensity"):
+                intensity = np.abs(psi) ** 2
+                tau += alpha * intensity
+                tau += beta * (intensity > intensity_threshold) * intensity**2
+
+            # Collapse if refractive index becomes too high
+            with prof.phase("collapse_check"):
+                collapsed = np.any(tau > collapse_threshold)
+            if collapsed:
+                collapses += 1
+                if events is not None:
+                    with prof.phase("collapse_events"):
+                        events.record(detect(tau, collapse_threshold, t, event_mode))
+                with prof.phase("collapse_noise"):
+                    _collapse(psi, rng, buf)
+                    tau[:] = 1.0
+                chi = 0.0
+            else:
+                with prof.phase("chi"):
+                    chi = _coherence(psi)
+            chi_history.append(chi)
+
+            with prof.phase("decoherence"):
+                psi *= 0.999  # gradual decoherence
+
+            if save_interval and t % save_interval == 0:
+                with prof.phase("plotting"):
+                    fig = _plot_frame(psi, tau, chi_history, timesteps, collapse_threshold)
+                with prof.phase("io"):
+                    fig.savefig(os.path.join(frames_dir, f"frame_{t:04d}.png"))
+                    plt.close(fig)
+
+            if checkpoint is not None and checkpoint.due(t):
+                checkpoint.save(t + 1, {"psi": psi, "tau": tau,
+                                        "chi_history": np.asarray(chi_history, dtype=np.float64)},
+                                {"rng": rng.bit_generator.state, "collapses": collapses})
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if events is not None:
+            events.flush()
+    return {"chi_history": chi_history, "collapses": collapses, "fields": {"psi": psi, "tau": tau}}
+
+
+def _plot_frame(psi, tau, chi_history, timesteps, collapse_threshold):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 3, figsize=(12, 4))
+    im0 = axes[0].imshow(np.abs(psi), origin="lower", cmap="viridis", vmin=0, vmax=1)
+    axes[0].set_title(r"$|\psi|$")
+    fig.colorbar(im0, ax=axes[0])
+
+    im1 = axes[1].imshow(tau, origin="lower", cmap="plasma", vmin=1, vmax=collapse_threshold)
+    axes[1].set_title(r"$\tau$")
+    fig.colorbar(im1, ax=axes[1])
+
+    axes[2].plot(chi_history)
+    axes[2].set_xlim(0, timesteps)
+    axes[2].set_ylim(0, 1)
+    axes[2].set_title(r"$\chi$")
+
+    fig.tight_layout()
+    return fig
+
+
 def main():
-    fig, _ = create_animation()
+    import matplotlib.pyplot as plt
+
+    fig, _ = create_animation(drop_frames=True)
     plt.show()
 
 
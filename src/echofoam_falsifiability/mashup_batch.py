@@ -0,0 +1,108 @@
+"""Build mashups for every run of a parameter sweep in one process.
+
+The manifest lists one job per line as three whitespace separated paths::
+
+    runs/a/simulation.mp4  runs/a/epcd_results.txt  runs/a/collapse_events.txt
+
+Blank lines and lines starting with ``#`` are ignored. The prompt and primes
+are loaded once and the resonance audio and intro clip are shared between
+jobs. Each job writes into its own directory under ``--out-dir`` and appends
+one JSON record to ``mashup_log.jsonl`` there; the records of the whole
+batch are also written as a table, ``mashup_log.parquet`` (``.npz`` without
+pyarrow), see ``results_table``.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from echofoam_falsifiability.mashup_maker import SharedResources, make_mashup
+from echofoam_falsifiability.results_table import EXTENSIONS, default_format, write_results
+
+
+def read_manifest(path):
+    jobs = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            if len(parts) != 3:
+                raise ValueError(f'{path}:{lineno}: expected 3 paths, got {len(parts)}')
+            jobs.append(tuple(parts))
+    return jobs
+
+
+def _job_dir(out_dir, index, simulation):
+    stem = os.path.splitext(os.path.basename(os.path.normpath(simulation)))[0]
+    return os.path.join(out_dir, f'{index:04d}_{stem}')
+
+
+def _run_job(index, job, resources, out_dir):
+    simulation, epcd_results, collapse_events = job
+    record = {
+        'job': index,
+        'simulation': simulation,
+        'epcd_results': epcd_results,
+        'collapse_events': collapse_events,
+    }
+    try:
+        record.update(make_mashup(simulation, epcd_results, collapse_events,
+                                  resources, _job_dir(out_dir, index, simulation)))
+        record['status'] = 'ok'
+    except Exception as exc:
+        record['status'] = 'error'
+        record['error'] = f'{type(exc).__name__}: {exc}'
+    return record
+
+
+def run_batch(jobs, donna_prompt, primes, out_dir='mashups', workers=2,
+              log_name='mashup_log.jsonl'):
+    """Run every job on a pool of ``workers`` threads.
+
+    Returns the log records in manifest order. Records are also written to
+    ``out_dir/log_name`` as jobs finish, so a crashed batch keeps the log of
+    the jobs that completed; the log is started afresh by every batch, like
+    the table. The sorted records are then written as a
+    columnar table next to the log.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    resources = SharedResources(donna_prompt, primes)
+    log_path = os.path.join(out_dir, log_name)
+    records = []
+    with open(log_path, 'w') as log, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_job, i, job, resources, out_dir)
+            for i, job in enumerate(jobs)
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            log.write(json.dumps(record) + '\n')
+            log.flush()
+            records.append(record)
+    records.sort(key=lambda r: r['job'])
+    table_format = default_format()
+    write_results(records, os.path.splitext(log_path)[0] + EXTENSIONS[table_format], table_format)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create mashups for many simulation runs.')
+    parser.add_argument('manifest', help='file with "simulation epcd_results collapse_events" per line')
+    parser.add_argument('donna_prompt', help='text file with Donna-style prompt')
+    parser.add_argument('primes', help='file with prime resonance values')
+    parser.add_argument('--out-dir', default='mashups', help='directory for job outputs and the log')
+    parser.add_argument('--workers', type=int, default=2, help='maximum concurrent jobs')
+    args = parser.parse_args(argv)
+
+    records = run_batch(read_manifest(args.manifest), args.donna_prompt, args.primes,
+                        out_dir=args.out_dir, workers=args.workers)
+    failed = sum(r['status'] != 'ok' for r in records)
+    print(f'{len(records) - failed}/{len(records)} mashups written to {args.out_dir}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
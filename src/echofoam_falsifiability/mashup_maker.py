@@ -1,23 +1,39 @@
 import argparse
 import hashlib
 import os
+import threading
 from datetime import datetime
+from types import SimpleNamespace
 
 import numpy as np
-from PIL import Image, ImageDraw
-
-try:
-    from moviepy.editor import (
-        VideoFileClip,
-        TextClip,
-        concatenate_videoclips,
-        ImageClip,
-        CompositeAudioClip,
-    )
-    from moviepy.audio.AudioClip import AudioArrayClip
-    MOVIEPY_AVAILABLE = True
-except Exception:
-    MOVIEPY_AVAILABLE = False
+
+_moviepy = None
+
+
+def load_moviepy():
+    """Import the moviepy pieces on first use; None if moviepy is unavailable."""
+    global _moviepy
+    if _moviepy is None:
+        try:
+            from moviepy.editor import (
+                VideoFileClip,
+                TextClip,
+                concatenate_videoclips,
+                ImageClip,
+                CompositeAudioClip,
+            )
+            from moviepy.audio.AudioClip import AudioArrayClip
+            _moviepy = SimpleNamespace(
+                VideoFileClip=VideoFileClip,
+                TextClip=TextClip,
+                concatenate_videoclips=concatenate_videoclips,
+                ImageClip=ImageClip,
+                CompositeAudioClip=CompositeAudioClip,
+                AudioArrayClip=AudioArrayClip,
+            )
+        except Exception:
+            _moviepy = False
+    return _moviepy or None
 
 
 def hash_file(path):
@@ -59,6 +75,8 @@ def generate_resonance_audio(primes, duration, fps=44100):
 
 
 def annotate_image(image_array, events, output_path):
+    from PIL import Image, ImageDraw
+
     im = Image.fromarray(image_array)
     draw = ImageDraw.Draw(im)
     r = 10
@@ -68,31 +86,16 @@ def annotate_image(image_array, events, output_path):
     return np.array(im)
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Create annotated mashup from simulation outputs.')
-    parser.add_argument('simulation', help='simulation.mp4 file or folder of frames')
-    parser.add_argument('epcd_results', help='epcd_results.txt file')
-    parser.add_argument('collapse_events', help='collapse_events.txt file with x y per line')
-    parser.add_argument('donna_prompt', help='text file with Donna-style prompt')
-    parser.add_argument('primes', help='file with prime resonance values')
-    args = parser.parse_args()
-
-    primes = read_primes(args.primes)
-
-    # metadata hashes
-    hashes = {
-        'simulation': hash_file(args.simulation) if os.path.isfile(args.simulation) else 'dir',
-        'epcd_results': hash_file(args.epcd_results),
-        'collapse_events': hash_file(args.collapse_events),
-        'donna_prompt': hash_file(args.donna_prompt),
-        'primes': hash_file(args.primes)
-    }
-
-    with open(args.donna_prompt) as f:
-        prompt_text = f.read().strip()
+def read_events(path):
+    """Event ``(x, y)`` positions from a text file of ``... x y`` lines or a
+    ``collapse_events.bin`` written by ``collapse_events.EventRecorder``."""
+    if path.endswith('.bin'):
+        from echofoam_falsifiability.collapse_events import load_events
 
+        events = load_events(path)
+        return np.column_stack([events['x'], events['y']])
     events = []
-    with open(args.collapse_events) as f:
+    with open(path) as f:
         for line in f:
             parts = line.strip().split()
             if len(parts) >= 2:
@@ -101,48 +104,133 @@ def main():
                     events.append((x, y))
                 except ValueError:
                     continue
+    return events
+
+
+class SharedResources:
+    """Inputs shared by every mashup built from the same prompt and primes.
+
+    The primes are parsed and hashed once, and the resonance audio and intro
+    clip are built on first use and reused for every job with the same clip
+    duration and frame size. Safe to share between worker threads.
+    """
+
+    def __init__(self, donna_prompt, primes):
+        self.primes = read_primes(primes)
+        with open(donna_prompt) as f:
+            self.prompt_text = f.read().strip()
+        self.hashes = {
+            'donna_prompt': hash_file(donna_prompt),
+            'primes': hash_file(primes),
+        }
+        self.resonance_score = sum(self.primes)
+        self._audio = {}
+        self._intro = {}
+        self._lock = threading.Lock()
+
+    def resonance_audio(self, duration):
+        with self._lock:
+            if duration not in self._audio:
+                self._audio[duration] = generate_resonance_audio(self.primes, duration)
+            return self._audio[duration]
+
+    def intro_clip(self, size):
+        key = tuple(size)
+        with self._lock:
+            if key not in self._intro:
+                self._intro[key] = load_moviepy().TextClip(
+                    self.prompt_text, fontsize=24, color='white', bg_color='black', size=size
+                ).set_duration(3)
+            return self._intro[key]
+
+
+def make_mashup(simulation, epcd_results, collapse_events, resources, out_dir='.'):
+    """Build one mashup into ``out_dir`` and return its log record."""
+    os.makedirs(out_dir, exist_ok=True)
+    video_path = os.path.join(out_dir, 'mashup.mp4')
+    annotated_path = os.path.join(out_dir, 'final_frame_annotated.png')
+
+    # metadata hashes
+    hashes = {
+        'simulation': hash_file(simulation) if os.path.isfile(simulation) else 'dir',
+        'epcd_results': hash_file(epcd_results),
+        'collapse_events': hash_file(collapse_events),
+        'donna_prompt': resources.hashes['donna_prompt'],
+        'primes': resources.hashes['primes'],
+    }
 
-    if os.path.isfile(args.simulation) and MOVIEPY_AVAILABLE:
-        clip = VideoFileClip(args.simulation)
+    events = read_events(collapse_events)
+    mp = load_moviepy()
+
+    if os.path.isfile(simulation) and mp is not None:
+        clip = mp.VideoFileClip(simulation)
         # intro frame
-        intro = TextClip(prompt_text, fontsize=24, color='white', bg_color='black', size=clip.size).set_duration(3)
+        intro = resources.intro_clip(clip.size)
         # annotate final frame
         final_frame = clip.get_frame(clip.duration)
-        annotated = annotate_image(final_frame, events, 'final_frame_annotated.png')
-        end_clip = ImageClip(annotated).set_duration(3)
+        annotated = annotate_image(final_frame, events, annotated_path)
+        end_clip = mp.ImageClip(annotated).set_duration(3)
         # resonance audio
-        resonance = generate_resonance_audio(primes, clip.duration)
+        resonance = resources.resonance_audio(clip.duration)
         if resonance is not None:
-            res_audio = AudioArrayClip(resonance, fps=44100)
+            res_audio = mp.AudioArrayClip(resonance, fps=44100)
             new_audio = clip.audio.set_duration(clip.duration).audio_fadein(0)
-            clip = clip.set_audio(CompositeAudioClip([new_audio, res_audio]))
-        final = concatenate_videoclips([intro, clip, end_clip])
-        final.write_videofile('mashup.mp4', codec='libx264', audio_codec='aac')
+            clip = clip.set_audio(mp.CompositeAudioClip([new_audio, res_audio]))
+        final = mp.concatenate_videoclips([intro, clip, end_clip])
+        final.write_videofile(video_path, codec='libx264', audio_codec='aac')
     else:
         # handle frame directory only for annotation
-        if os.path.isdir(args.simulation):
-            frames = sorted(os.listdir(args.simulation))
-            last_frame_path = os.path.join(args.simulation, frames[-1])
+        if os.path.isdir(simulation):
+            frames = sorted(os.listdir(simulation))
+            last_frame_path = os.path.join(simulation, frames[-1])
+            from PIL import Image
+
             image_array = np.array(Image.open(last_frame_path))
-            annotate_image(image_array, events, 'final_frame_annotated.png')
+            annotate_image(image_array, events, annotated_path)
         else:
             raise RuntimeError('Moviepy not available and simulation is not a directory of frames')
         print('No video processing performed (moviepy not available).')
 
-    # metadata log
-    resonance_score = sum(primes)
-    with open('mashup_log.txt', 'w') as log:
-        log.write(f'Time: {datetime.utcnow().isoformat()}\n')
-        for k, v in hashes.items():
+    if not os.path.exists(video_path):
+        # create placeholder using final_frame if no video
+        if os.path.exists(annotated_path) and mp is not None:
+            img = mp.ImageClip(annotated_path).set_duration(5)
+            img.write_videofile(video_path, codec='libx264')
+
+    return {
+        'time': datetime.utcnow().isoformat(),
+        'hashes': hashes,
+        'resonance_score': resources.resonance_score,
+        'prompt': resources.prompt_text,
+        'output': video_path if os.path.exists(video_path) else annotated_path,
+    }
+
+
+def write_log(record, path='mashup_log.txt'):
+    with open(path, 'w') as log:
+        log.write(f"Time: {record['time']}\n")
+        for k, v in record['hashes'].items():
             log.write(f'{k}_hash: {v}\n')
-        log.write(f'Resonance_score: {resonance_score}\n')
-        log.write(f'Prompt: {prompt_text}\n')
+        log.write(f"Resonance_score: {record['resonance_score']}\n")
+        log.write(f"Prompt: {record['prompt']}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create annotated mashup from simulation outputs.')
+    parser.add_argument('simulation', help='simulation.mp4 file or folder of frames')
+    parser.add_argument('epcd_results', help='epcd_results.txt file')
+    parser.add_argument('collapse_events',
+                        help='collapse_events.txt file with x y per line, or collapse_events.bin')
+    parser.add_argument('donna_prompt', help='text file with Donna-style prompt')
+    parser.add_argument('primes', help='file with prime resonance values')
+    args = parser.parse_args()
+
+    resources = SharedResources(args.donna_prompt, args.primes)
+    record = make_mashup(args.simulation, args.epcd_results, args.collapse_events, resources)
+
+    # metadata log
+    write_log(record)
 
-    if not os.path.exists('mashup.mp4'):
-        # create placeholder using final_frame if no video
-        if os.path.exists('final_frame_annotated.png') and MOVIEPY_AVAILABLE:
-            img = ImageClip('final_frame_annotated.png').set_duration(5)
-            img.write_videofile('mashup.mp4', codec='libx264')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,114 @@
+"""Validate reduced-precision runs against float64.
+
+Each model is run twice with the same seed: once with float64 fields and
+once at reduced precision (float32, or complex64 for the laser). Both runs
+draw their noise at the reduced precision, so any difference comes from the
+field arithmetic alone. The report compares the verdicts (the completion
+frame for teleportation) and the per-step chi means::
+
+    python -m echofoam_falsifiability.precision simulation laser_filamentation
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from echofoam_falsifiability import (laser_filamentation, simulation, teleportation,
+                                     weather_simulation, weather_sphere)
+
+
+def _run_simulation(dtype, noise_dtype, seed, **params):
+    return simulation.run(seed=seed, dtype=dtype, noise_dtype=noise_dtype, **params)
+
+
+def _run_weather_simulation(dtype, noise_dtype, seed, **params):
+    return weather_simulation.run(seed=seed, dtype=dtype, noise_dtype=noise_dtype, **params)
+
+
+def _run_laser(dtype, noise_dtype, seed, **params):
+    chi_history = laser_filamentation.run_simulation(
+        save_interval=None, seed=seed, dtype=dtype, noise_dtype=noise_dtype, **params
+    )
+    return {"chi_history": chi_history}
+
+
+def _run_weather_sphere(dtype, noise_dtype, seed, **params):
+    chi_history = []
+    weather_sphere.run(save_path=None, seed=seed, dtype=dtype, noise_dtype=noise_dtype,
+                       chi_history=chi_history, **params)
+    return {"chi_history": chi_history}
+
+
+def _run_teleportation(dtype, noise_dtype, seed, **params):
+    # deterministic, so the seed and noise precision do not apply
+    result = teleportation.run(dtype=dtype, **params)
+    return {"chi_history": result["chi_history"], "verdict_step": result["teleport_complete"]}
+
+
+# model -> (runner, reference dtype, reduced dtype, default parameters)
+MODELS = {
+    "simulation": (_run_simulation, np.float64, np.float32, {"steps": 200}),
+    "weather_simulation": (_run_weather_simulation, np.float64, np.float32, {"steps": 200}),
+    "laser_filamentation": (_run_laser, np.complex128, np.complex64,
+                            {"grid_size": 128, "timesteps": 400}),
+    "weather_sphere": (_run_weather_sphere, np.float64, np.float32, {"steps": 100}),
+    "teleportation": (_run_teleportation, np.float64, np.float32, {"steps": 150}),
+}
+
+
+def compare_precision(model, seed=0, atol=1e-3, **params):
+    """Run ``model`` at both precisions and return a report dict.
+
+    ``passed`` is True when the verdicts agree and every chi value is within
+    ``atol`` of the float64 run. Extra keyword arguments override the
+    model's default parameters.
+    """
+    runner, ref_dtype, low_dtype, defaults = MODELS[model]
+    params = {**defaults, **params}
+    noise_dtype = np.empty(0, dtype=low_dtype).real.dtype
+    ref = runner(ref_dtype, noise_dtype, seed, **params)
+    low = runner(low_dtype, noise_dtype, seed, **params)
+
+    chi_ref = np.asarray(ref["chi_history"], dtype=np.float64)
+    chi_low = np.asarray(low["chi_history"], dtype=np.float64)
+    chi_diff = float(np.max(np.abs(chi_ref - chi_low))) if chi_ref.size else 0.0
+    verdict_match = (ref.get("verdict"), ref.get("verdict_step")) == (
+        low.get("verdict"), low.get("verdict_step"))
+    return {
+        "model": model,
+        "dtype": np.dtype(low_dtype).name,
+        "seed": seed,
+        "params": params,
+        "verdict": ref.get("verdict"),
+        "verdict_low": low.get("verdict"),
+        "verdict_step": ref.get("verdict_step"),
+        "verdict_step_low": low.get("verdict_step"),
+        "verdict_match": verdict_match,
+        "chi_steps": int(chi_ref.size),
+        "chi_max_abs_diff": chi_diff,
+        "passed": verdict_match and chi_diff <= atol,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare reduced-precision runs against float64.")
+    parser.add_argument("models", nargs="*", metavar="model",
+                        help=f"models to check, any of {', '.join(MODELS)} (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="seed shared by both runs")
+    parser.add_argument("--atol", type=float, default=1e-3, help="allowed chi difference")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    ok = True
+    for model in args.models or MODELS:
+        report = compare_precision(model, seed=args.seed, atol=args.atol)
+        ok = ok and report["passed"]
+        print(json.dumps(report))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+"""Opt-in per-phase timing for the solver loops.
+
+Solvers accept a ``profiler`` and wrap each phase of a step in
+``profiler.phase(name)``. Without one they use :data:`NULL_PROFILER`, whose
+phases do nothing, so instrumentation costs one method call per phase::
+
+    prof = Profiler()
+    simulation.run(steps=100, profiler=prof)
+    print(prof.format_report())
+    prof.write_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+
+With ``memory=True`` the profiler also records the peak memory of each
+phase through ``tracemalloc``: the most traced memory above the memory at
+phase start, i.e. the largest working set of temporaries, not the total
+allocated. The report keeps the highest peak over the calls; phases must
+not nest in that mode.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler:
+    """Profiler that records nothing."""
+
+    enabled = False
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start", "mem_start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.memory:
+            tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        peak = 0
+        if self.profiler.memory:
+            peak = max(tracemalloc.get_traced_memory()[1] - self.mem_start, 0)
+        self.profiler._record(self.name, self.start, end, peak)
+        return False
+
+
+class Profiler:
+    """Collect wall time, call counts and peak memory per named phase.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Record the peak memory of each phase with ``tracemalloc``. Slows
+        pure-Python code noticeably.
+    timeline : bool, optional
+        Keep one event per phase call for :meth:`chrome_trace`.
+    max_events : int, optional
+        Cap on the kept timeline events; later calls still count in the
+        report.
+    """
+
+    enabled = True
+
+    def __init__(self, memory=False, timeline=True, max_events=1_000_000):
+        self.memory = memory
+        self.timeline = timeline
+        self.max_events = max_events
+        self.stats = {}
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _record(self, name, start, end, peak):
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = {"calls": 0, "seconds": 0.0, "peak_bytes": 0}
+            stat["calls"] += 1
+            stat["seconds"] += end - start
+            stat["peak_bytes"] = max(stat["peak_bytes"], peak)
+            if self.timeline and len(self.events) < self.max_events:
+                self.events.append((name, start, end, threading.get_ident(), peak))
+
+    def close(self):
+        """Stop ``tracemalloc`` if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self):
+        """Return ``{phase: {"calls", "seconds", "peak_bytes", "fraction"}}``."""
+        total = sum(stat["seconds"] for stat in self.stats.values()) or 1.0
+        return {
+            name: {**stat, "fraction": stat["seconds"] / total}
+            for name, stat in sorted(self.stats.items(), key=lambda kv: -kv[1]["seconds"])
+        }
+
+    def format_report(self):
+        lines = [f"{'phase':24s} {'calls':>8s} {'seconds':>10s} {'share':>6s} {'peak MB':>9s}"]
+        for name, stat in self.report().items():
+            lines.append(
+                f"{name:24s} {stat['calls']:8d} {stat['seconds']:10.4f} "
+                f"{stat['fraction']:6.1%} {stat['peak_bytes'] / 2**20:9.1f}"
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Return the timeline in Chrome trace event format."""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"peak_bytes": peak},
+                }
+                for name, start, end, tid, peak in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,260 @@
+"""Content-addressed cache of finished runs.
+
+A run is identified by the sha256 of its model, keyword arguments (seed
+included) and code version, the hash of the model's source and of every
+module of this package it imports, plus the NumPy version. Results are
+stored as one ``.npz`` file per key under a directory on local disk, and
+the least recently used entries are deleted once the directory grows past
+``max_bytes``. The runners take ``cached=True`` (or a :class:`ResultCache`)
+and return a stored result without stepping at all::
+
+    simulation.run(steps=400, seed=1, cached=True)   # computes and stores
+    simulation.run(steps=400, seed=1, cached=True)   # loads from disk
+
+Runs without a fixed seed are never cached. The final fields of tiled runs
+(``tile_rows``) and of entries that alone would exceed ``max_bytes`` are
+not stored, and such hits return no ``fields``. Output-only keywords such as
+``profiler``, ``save_interval`` or ``snapshot_dir`` are not part of the
+key, so a cache hit writes no frames, snapshots or profiles.
+"""
+
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from echofoam_falsifiability.checkpoint import load_checkpoint, write_checkpoint
+
+DEFAULT_DIR = os.environ.get("ECHOFOAM_CACHE_DIR",
+                             os.path.join(os.path.expanduser("~"), ".cache", "echofoam"))
+DEFAULT_MAX_BYTES = 2 << 30
+
+# keywords that only say where or how to report a run, not what it computes
+OUTPUT_PARAMS = ("profiler", "show", "save_interval", "save_path", "frames_dir", "render_every",
+                 "snapshot_every", "snapshot_dir", "snapshot_fields", "tile_dir")
+# keywords whose side effects a cache hit cannot reproduce
+_UNCACHEABLE = ("checkpoint", "events", "chi_history")
+
+_PACKAGE = __name__.rpartition(".")[0]
+_IMPORT = re.compile(rf"^\s*(?:from|import)\s+{re.escape(_PACKAGE)}\.(\w+)", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(model):
+    """Hash of the source of ``model`` and of the package modules it imports."""
+    digest = hashlib.sha256(np.__version__.encode())
+    pending, seen = [model], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        spec = importlib.util.find_spec(f"{_PACKAGE}.{name}")
+        if spec is None or spec.origin is None:
+            continue
+        with open(spec.origin, "rb") as f:
+            source = f.read()
+        digest.update(name.encode() + b"\0" + source)
+        pending.extend(_IMPORT.findall(source.decode("utf-8", "replace")))
+    return digest.hexdigest()
+
+
+def _canonical(name, value):
+    if value is not None and (name == "dtype" or name.endswith("_dtype")):
+        return np.dtype(value).name
+    if isinstance(value, np.random.SeedSequence):
+        return {"entropy": value.entropy, "spawn_key": list(value.spawn_key)}
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_canonical("", v) for v in value]
+    return value
+
+
+def cacheable(params):
+    """False for runs whose result cannot be reproduced from their keywords."""
+    seed = params.get("seed")
+    return seed is not None and not isinstance(seed, np.random.Generator)
+
+
+def cache_key(model, params):
+    """sha256 key of ``model`` run with the keywords ``params``."""
+    params = {name: _canonical(name, value) for name, value in params.items()
+              if name not in OUTPUT_PARAMS}
+    text = json.dumps({"model": model, "params": params, "code": code_version(model)},
+                      sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _pack(value, arrays):
+    """Move the arrays of ``value`` into ``arrays``; returns the JSON-able rest."""
+    if isinstance(value, np.ndarray):
+        name = f"a{len(arrays)}"
+        arrays[name] = value
+        return {"__array__": name}
+    if isinstance(value, dict):
+        return {"__dict__": [[k, _pack(v, arrays)] for k, v in value.items()]}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_pack(v, arrays) for v in value]}
+    if isinstance(value, list) and value and all(isinstance(v, (int, float)) for v in value):
+        # histories are stored as arrays and come back as lists of Python numbers
+        packed = _pack(np.asarray(value), arrays)
+        packed["list"] = True
+        return packed
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _nbytes(value):
+    """Bytes of the arrays in ``value``, without reading memory-mapped ones."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def _unpack(value, arrays):
+    if not isinstance(value, dict):
+        return value
+    if "__array__" in value:
+        array = arrays[value["__array__"]]
+        return array.tolist() if value.get("list") else array
+    if "__dict__" in value:
+        return {k: _unpack(v, arrays) for k, v in value["__dict__"]}
+    if "__tuple__" in value:
+        return tuple(_unpack(v, arrays) for v in value["__tuple__"])
+    return value
+
+
+class ResultCache:
+    """Results on local disk, evicted least recently used first.
+
+    Parameters
+    ----------
+    path : str, optional
+        Cache directory, by default ``$ECHOFOAM_CACHE_DIR`` or
+        ``~/.cache/echofoam``.
+    max_bytes : int, optional
+        Total size of the stored entries above which the least recently
+        read ones are deleted.
+    store_fields : bool, optional
+        Keep the final ``fields`` of dict results; without them only the
+        verdicts, histories and counts are stored and returned. Fields are
+        dropped anyway when they would not fit in ``max_bytes``.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, store_fields=True):
+        self.path = path or DEFAULT_DIR
+        self.max_bytes = max_bytes
+        self.store_fields = store_fields
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.npz")
+
+    def get(self, key):
+        """Stored result of ``key``, or None."""
+        path = self._file(key)
+        try:
+            saved = load_checkpoint(path)
+            if saved is not None:
+                # reading an entry makes it the most recently used
+                now = time.time_ns()
+                os.utime(path, ns=(now, now))
+        except OSError:
+            saved = None  # deleted by a concurrent eviction
+        if saved is None:
+            self.misses += 1
+            return None
+        arrays, meta = saved
+        self.hits += 1
+        return _unpack(meta["result"], arrays)
+
+    def put(self, key, result, fields=True):
+        """Store ``result`` under ``key`` and evict down to ``max_bytes``.
+
+        The ``fields`` of a dict result are left out unless ``fields`` and
+        ``store_fields`` are true and the entry fits in ``max_bytes``;
+        results that do not fit even without them are not stored.
+        """
+        if isinstance(result, dict) and "fields" in result:
+            if not (fields and self.store_fields) or _nbytes(result) > self.max_bytes:
+                result = {k: v for k, v in result.items() if k != "fields"}
+        if _nbytes(result) > self.max_bytes:
+            return
+        arrays = {}
+        meta = {"result": _pack(result, arrays)}
+        write_checkpoint(self._file(key), arrays, meta)
+        self.evict()
+
+    def entries(self):
+        """``(mtime_ns, size, path)`` of every entry, least recently used first."""
+        out = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    out.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return sorted(out)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def cached_call(model, fn, params, cache=True):
+    """Return ``fn(**params)`` for ``model``, from ``cache`` when stored.
+
+    ``cache`` is a :class:`ResultCache` or True for the default one. ``fn``
+    is the runner itself and is called with ``cached=False`` on a miss;
+    ``params`` may hold other names, e.g. the runner's ``locals()``, which
+    are dropped.
+    """
+    accepted = inspect.signature(fn).parameters
+    params = {name: value for name, value in params.items()
+              if name in accepted and name != "cached"}
+    for name in _UNCACHEABLE:
+        if params.get(name) is not None:
+            raise ValueError(f"cached runs do not support {name}")
+    if not cacheable(params):
+        return fn(**params, cached=False)
+    if not isinstance(cache, ResultCache):
+        cache = ResultCache()
+    key = cache_key(model, params)
+    result = cache.get(key)
+    if result is None:
+        result = fn(**params, cached=False)
+        # tiled fields live on disk because they may not fit in memory
+        cache.put(key, result, fields=not params.get("tile_rows"))
+    return result
@@ -0,0 +1,222 @@
+"""Columnar tables of run results, one row per run.
+
+:func:`write_results` turns run summaries (as written to ``results.json``
+by ``cli.run_model``) into columns: the model parameters, the verdict,
+counts and timings as scalar columns, and histories such as
+``chi_history`` as list columns stored flat, as ``values`` plus row
+``offsets``. Tables are written as Parquet when pyarrow is installed and
+as an uncompressed ``.npz`` of column arrays otherwise. :func:`read_results`
+loads only the requested columns and rows::
+
+    write_results(summaries, "sweep.parquet")
+    table = read_results("sweep.parquet", columns=["seed", "chi_history"],
+                         filters=[("verdict", "==", "Hypothesis supported")])
+    table["chi_history"][0]   # chi history of the first matching run
+
+With Parquet the filters are pushed down to the row groups; with NPZ the
+filter columns are loaded first and the other columns only for the
+matching rows. Missing numbers are NaN and missing strings empty.
+"""
+
+import importlib.util
+import json
+import operator
+
+import numpy as np
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+FORMATS = ("parquet", "npz")
+EXTENSIONS = {"parquet": ".parquet", "npz": ".npz"}
+ROW_GROUP_SIZE = 8192
+
+_COLUMNS = "__columns__"
+_OPS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": np.isin,
+    "not in": lambda a, b: ~np.isin(a, b),
+}
+
+
+def default_format():
+    return "parquet" if PYARROW_AVAILABLE else "npz"
+
+
+class ListColumn:
+    """Variable-length rows; row ``i`` is ``values[offsets[i]:offsets[i + 1]]``."""
+
+    def __init__(self, values, offsets):
+        self.values = np.asarray(values)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def take(self, rows):
+        """The column restricted to ``rows``."""
+        rows = np.asarray(rows, dtype=np.intp)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        index = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], lengths)
+        return ListColumn(self.values[index], offsets)
+
+
+def _flatten(summary):
+    """One row: parameters first, then the scalar and history results."""
+    row = dict(summary.get("params", {}))
+    for name, value in summary.items():
+        if name not in ("params", "fields"):
+            row[name] = value
+    return row
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _column(values):
+    """``(kind, data)`` of one column; lists become a :class:`ListColumn`."""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, (bool, np.bool_)) for v in present):
+        if len(present) == len(values):
+            return "bool", np.array(values, dtype=bool)
+        return "float", np.array([np.nan if v is None else float(v) for v in values])
+    if present and all(_is_number(v) for v in present):
+        if len(present) == len(values) and all(isinstance(v, (int, np.integer)) for v in present):
+            return "int", np.array(values, dtype=np.int64)
+        return "float", np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if present and all(isinstance(v, (list, tuple, np.ndarray)) for v in present):
+        rows = [np.asarray(v if v is not None else [], dtype=np.float64).ravel() for v in values]
+        offsets = np.concatenate([[0], np.cumsum([len(r) for r in rows])])
+        values = np.concatenate(rows) if rows else np.zeros(0)
+        return "list", ListColumn(values, offsets)
+    text = ["" if v is None else v if isinstance(v, str) else json.dumps(v) for v in values]
+    return "str", np.array(text, dtype=str)
+
+
+def to_columns(summaries):
+    """``{name: (kind, data)}`` of run summaries, in first-seen column order."""
+    rows = [_flatten(s) for s in summaries]
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    return {name: _column([row.get(name) for row in rows]) for name in names}
+
+
+def _write_npz(columns, path):
+    arrays = {_COLUMNS: np.array(json.dumps([[name, kind] for name, (kind, _) in columns.items()]))}
+    for name, (kind, data) in columns.items():
+        if kind == "list":
+            arrays[f"{name}.values"] = data.values
+            arrays[f"{name}.offsets"] = data.offsets
+        else:
+            arrays[name] = data
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _write_parquet(columns, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrays = {}
+    for name, (kind, data) in columns.items():
+        if kind == "list":
+            arrays[name] = pa.LargeListArray.from_arrays(pa.array(data.offsets), pa.array(data.values))
+        else:
+            arrays[name] = pa.array(data)
+    pq.write_table(pa.table(arrays), path, row_group_size=ROW_GROUP_SIZE)
+
+
+def write_results(summaries, path, format=None):
+    """Write one row per run summary to ``path``; returns the format used.
+
+    ``format`` is ``"parquet"`` or ``"npz"``; by default it follows the
+    extension of ``path``, then :func:`default_format`.
+    """
+    if format is None:
+        format = next((f for f, ext in EXTENSIONS.items() if str(path).endswith(ext)),
+                      default_format())
+    if format not in FORMATS:
+        raise ValueError(f"unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    columns = to_columns(summaries)
+    if format == "parquet":
+        _write_parquet(columns, path)
+    else:
+        _write_npz(columns, path)
+    return format
+
+
+def _mask(columns, filters, n):
+    mask = np.ones(n, dtype=bool)
+    for name, op, value in filters:
+        if op not in _OPS:
+            raise ValueError(f"unknown filter operator {op!r}")
+        mask &= _OPS[op](columns[name], value)
+    return mask
+
+
+def _read_npz(path, columns, filters):
+    with np.load(path) as data:
+        kinds = dict(json.loads(str(data[_COLUMNS])))
+        names = list(kinds) if columns is None else list(columns)
+
+        def load(name):
+            if kinds[name] == "list":
+                return ListColumn(data[f"{name}.values"], data[f"{name}.offsets"])
+            return data[name]
+
+        loaded = {}
+        rows = None
+        if filters:
+            for name, _, _ in filters:
+                if kinds[name] == "list":
+                    raise ValueError(f"cannot filter on list column {name!r}")
+                loaded.setdefault(name, load(name))
+            n = len(next(iter(loaded.values())))
+            rows = np.flatnonzero(_mask(loaded, filters, n))
+        out = {}
+        for name in names:
+            column = loaded[name] if name in loaded else load(name)
+            if rows is not None:
+                column = column.take(rows) if isinstance(column, ListColumn) else column[rows]
+            out[name] = column
+    return out
+
+
+def _read_parquet(path, columns, filters):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path, columns=columns, filters=filters or None)
+    out = {}
+    for name in table.column_names:
+        column = table.column(name).combine_chunks()
+        if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+            offsets = column.offsets.to_numpy()
+            out[name] = ListColumn(column.flatten().to_numpy(), offsets - offsets[0])
+        else:
+            out[name] = column.to_numpy(zero_copy_only=False)
+    return out
+
+
+def read_results(path, columns=None, filters=None):
+    """Load a results table as ``{name: column}``.
+
+    ``columns`` limits the columns loaded. ``filters`` is a list of
+    ``(column, op, value)`` conditions that must all hold, with ``op`` one
+    of ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in`` and ``not in``.
+    Scalar columns are arrays and list columns :class:`ListColumn`.
+    """
+    if str(path).endswith(EXTENSIONS["parquet"]):
+        return _read_parquet(path, columns, filters)
+    return _read_npz(path, columns, filters)
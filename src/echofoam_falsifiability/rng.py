@@ -0,0 +1,55 @@
+"""Random number streams shared by the solvers.
+
+Every solver takes a ``seed`` that may be ``None`` (fresh entropy), an int,
+a ``numpy.random.SeedSequence`` or a ready ``numpy.random.Generator``.
+Parallel runs derive one independent stream per worker with
+:func:`spawn_rngs` instead of sharing the global ``np.random`` state.
+"""
+
+import numpy as np
+
+BIT_GENERATORS = {
+    "pcg64": np.random.PCG64,
+    "philox": np.random.Philox,
+}
+
+
+def make_rng(seed=None, bit_generator="pcg64"):
+    """Return a ``Generator`` for ``seed``; generators are passed through."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.Generator(BIT_GENERATORS[bit_generator](seed))
+
+
+def spawn_rngs(seed, n, bit_generator="pcg64"):
+    """Return ``n`` independent generators derived from ``seed``.
+
+    A ``SeedSequence`` is spawned from a copy, so the caller's object is
+    left as it was and the same seed always gives the same generators.
+    """
+    if isinstance(seed, np.random.Generator):
+        seed = seed.bit_generator.seed_seq
+    if isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key,
+                                      pool_size=seed.pool_size)
+    else:
+        seed = np.random.SeedSequence(seed)
+    return [np.random.Generator(BIT_GENERATORS[bit_generator](child)) for child in seed.spawn(n)]
+
+
+def fill_normal(rng, out, scale=1.0):
+    """Overwrite the contiguous float32/float64 array ``out`` with N(0, scale**2)."""
+    rng.standard_normal(out=out, dtype=out.dtype)
+    if scale != 1.0:
+        out *= scale
+    return out
+
+
+def fill_uniform(rng, out, scale=1.0):
+    """Overwrite the contiguous float32/float64 array ``out`` with U[0, scale)."""
+    rng.random(out=out, dtype=out.dtype)
+    if scale != 1.0:
+        out *= scale
+    return out
@@ -1,10 +1,19 @@
+import math
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation, FFMpegWriter
+
+from echofoam_falsifiability.profiling import NULL_PROFILER
+from echofoam_falsifiability.rng import fill_normal, make_rng
 
 # Simulation parameters
 size = 100
 steps = 200
+# chi obeys a wave equation with squared speed WAVE_COEF * psi (dx = 1); the
+# explicit leapfrog update is stable while that times dt**2 stays below
+# CFL_LIMIT, the 2D five-point limit
+WAVE_COEF = 0.2
+CFL_LIMIT = 0.5
 
 # Global state used during the animation
 _tau = None
@@ -15,41 +24,378 @@ _grad_mag = None
 _consecutive_coherent = 0
 _verdict = None
 _verdict_step = None
+_rng = None
+_noise = None
+_chi_history = []
+_profiler = NULL_PROFILER
+_cfl = None
+_dt_prev = 1.0
+
 
+def _init_fields(seed=None, dtype=np.float64, noise_dtype=None, n=None, profiler=None, cfl=None):
+    """Initialize the simulation fields and globals.
 
-def _init_fields():
-    """Initialize the simulation fields and globals."""
+    ``dtype`` is the field precision. Noise is drawn at ``noise_dtype``
+    (default ``dtype``) straight into a preallocated buffer. ``profiler``
+    times the phases of :func:`step`, see ``profiling.Profiler``. ``cfl``
+    enables the stability-checked chi update of :func:`_advance_chi`.
+    """
     global _tau, _psi, _chi, _chi_prev, _grad_mag
     global _consecutive_coherent, _verdict, _verdict_step
+    global _rng, _noise, _chi_history, _profiler, _cfl, _dt_prev
 
-    _tau = np.random.randn(size, size) * 0.1
-    _psi = np.zeros((size, size))
-    _chi = np.zeros((size, size))
+    n = n or size
+    _rng = make_rng(seed)
+    _noise = np.empty((n, n), dtype=noise_dtype or dtype)
+    _tau = fill_normal(_rng, _noise, 0.1).astype(dtype)
+    _psi = np.zeros((n, n), dtype=dtype)
+    _chi = np.zeros((n, n), dtype=dtype)
     _chi_prev = np.zeros_like(_chi)
     _grad_mag = np.zeros_like(_tau)
     _consecutive_coherent = 0
     _verdict = None
     _verdict_step = None
+    _chi_history = []
+    _profiler = profiler or NULL_PROFILER
+    _cfl = cfl
+    _dt_prev = 1.0
 
 
-def create_animation():
-    """Construct the figure and animation for the simulation."""
-    _init_fields()
+def step(frame):
+    """Advance the global fields by one frame and update the verdict."""
+    global _tau, _psi, _chi, _chi_prev, _grad_mag
+    global _consecutive_coherent, _verdict, _verdict_step
 
-    fig, axes = plt.subplots(2, 2, figsize=(8, 8))
-    im_tau = axes[0, 0].imshow(_tau, cmap="plasma", animated=True)
-    axes[0, 0].set_title("tau")
+    prof = _profiler
+    with prof.phase("noise"):
+        _tau += fill_normal(_rng, _noise, 0.1)
+        _tau *= 0.995
+
+    with prof.phase("gradient"):
+        grad_x, grad_y = np.gradient(_tau)
+        _grad_mag = np.sqrt(grad_x**2 + grad_y**2)
+
+    with prof.phase("psi"):
+        _psi += 0.1 * (1.0 / (1.0 + _grad_mag) - _psi)
+
+    with prof.phase("laplacian"):
+        if _cfl is None:
+            laplacian = _laplacian(_chi)
+            chi_new = 2 * _chi - _chi_prev + WAVE_COEF * _psi * laplacian
+            _chi_prev = _chi
+            _chi = chi_new
+        else:
+            _advance_chi()
+
+    with prof.phase("reduction"):
+        # reductions stay in float64 whatever the field precision
+        _chi_history.append(float(np.mean(_chi, dtype=np.float64)))
+        frac = np.mean(_psi > 0.8) if _verdict is None else None
+    _update_verdict(frame, frac)
+
+
+def _update_verdict(frame, frac):
+    """Count coherent frames, where ``frac`` of psi is above 0.8, and decide the verdict."""
+    global _consecutive_coherent, _verdict, _verdict_step
+
+    if _verdict is None:
+        if frac >= 0.6:
+            _consecutive_coherent += 1
+            if _consecutive_coherent >= 100:
+                _verdict = "Hypothesis sustained"
+                _verdict_step = frame
+                print(f"Coherence stabilized at step {frame}")
+        else:
+            if _consecutive_coherent > 0:
+                _verdict = "Hypothesis failed"
+                _verdict_step = frame
+                print(f"Coherence lost at step {frame}")
+            _consecutive_coherent = 0
+
+
+def _laplacian(f):
+    return (
+        np.roll(f, 1, axis=0) + np.roll(f, -1, axis=0)
+        + np.roll(f, 1, axis=1) + np.roll(f, -1, axis=1)
+        - 4 * f
+    )
+
+
+def _advance_chi():
+    """Advance chi by one frame in leapfrog substeps that respect the CFL limit.
+
+    The frame is split into the fewest equal substeps ``dt`` with
+    ``WAVE_COEF * max(psi) * dt**2 <= cfl**2 * CFL_LIMIT``. Consecutive
+    steps of different length use the variable-step leapfrog
+
+        chi+ = chi + (dt / dt_prev) (chi - chi-) + dt (dt + dt_prev) / 2 * c**2 lap(chi)
+
+    which reduces to the fixed-step update when ``dt == dt_prev == 1``.
+    """
+    global _chi, _chi_prev, _dt_prev
+
+    speed2 = WAVE_COEF * float(np.max(_psi))
+    substeps = max(1, math.ceil(math.sqrt(speed2 / CFL_LIMIT) / _cfl))
+    dt = 1.0 / substeps
+    for _ in range(substeps):
+        chi_new = _chi + (dt / _dt_prev) * (_chi - _chi_prev)
+        chi_new += (0.5 * dt * (dt + _dt_prev) * WAVE_COEF) * _psi * _laplacian(_chi)
+        _chi_prev = _chi
+        _chi = chi_new
+        _dt_prev = dt
+
+
+class _Refined:
+    """Two-level stepping of the global fields, see ``amr.Hierarchy``.
+
+    The coarse level spans the grid at ``ratio`` times the spacing; blocks
+    where the tau gradient exceeds ``threshold`` carry fine patches, which
+    are regridded every ``regrid_every`` frames. Noise on the coarse level
+    has the spread of a mean of ``ratio**2`` fine draws.
+    """
+
+    _FIELDS = ("tau", "psi", "chi", "chi_prev", "grad_mag")
+
+    def __init__(self, threshold, ratio, block, regrid_every):
+        from echofoam_falsifiability.amr import Hierarchy
+
+        fine = {"tau": _tau, "psi": _psi, "chi": _chi, "chi_prev": _chi_prev, "grad_mag": _grad_mag}
+        self.grid = Hierarchy(fine, ratio, block)
+        self.threshold = threshold
+        self.regrid_every = regrid_every
+        self.noise = np.empty(self.grid.coarse_shape, dtype=_noise.dtype)
+        self.fine_noise = None
+        self.refined = []
+        grad_x, grad_y = np.gradient(_tau)
+        indicator = np.sqrt(grad_x**2 + grad_y**2)
+        n = self.grid.n // ratio
+        self._regrid(indicator.reshape(n, ratio, n, ratio).max(axis=(1, 3)), fine)
+
+    def _regrid(self, indicator, fine=None, fine_indicator=None):
+        grid = self.grid
+        if grid.regrid(grid.flag(indicator, self.threshold, fine_indicator), fine):
+            self.fine_noise = np.empty((grid.count, grid.size, grid.size), dtype=_noise.dtype)
+
+    def step(self, frame):
+        from echofoam_falsifiability.amr import gradient_magnitude, laplacian
+
+        grid, prof, r = self.grid, _profiler, self.grid.ratio
+        coarse = grid.coarse
+        if frame % self.regrid_every == 0 and frame:
+            with prof.phase("regrid"):
+                self._regrid(coarse["grad_mag"], fine_indicator=grid.interior("grad_mag"))
+        self.refined.append(grid.refined_fraction)
+
+        with prof.phase("noise"):
+            coarse["tau"] += fill_normal(_rng, self.noise, 0.1 / r)
+            coarse["tau"] *= 0.995
+            tau = grid.interior("tau")
+            tau += fill_normal(_rng, self.fine_noise, 0.1)
+            tau *= 0.995
+
+        with prof.phase("gradient"):
+            grad_x, grad_y = np.gradient(coarse["tau"], float(r))
+            coarse["grad_mag"] = np.sqrt(grad_x**2 + grad_y**2)
+            grid.fill_halo("tau", "extrapolate")
+            grad_mag = grid.interior("grad_mag")
+            grad_mag[...] = gradient_magnitude(grid.patches["tau"])
+
+        with prof.phase("psi"):
+            coarse["psi"] += 0.1 * (1.0 / (1.0 + coarse["grad_mag"]) - coarse["psi"])
+            psi = grid.interior("psi")
+            psi += 0.1 * (1.0 / (1.0 + grad_mag) - psi)
+
+        with prof.phase("laplacian"):
+            # the patch halos read the coarse chi of the previous frame
+            grid.fill_halo("chi", "periodic")
+            chi, chi_prev = grid.interior("chi"), grid.interior("chi_prev")
+            chi_new = 2 * chi - chi_prev + WAVE_COEF * psi * laplacian(grid.patches["chi"])
+            chi_prev[...] = chi
+            chi[...] = chi_new
+            chi_new = (2 * coarse["chi"] - coarse["chi_prev"]
+                       + WAVE_COEF * coarse["psi"] * _laplacian(coarse["chi"]) / r**2)
+            coarse["chi_prev"] = coarse["chi"]
+            coarse["chi"] = chi_new
+
+        with prof.phase("restrict"):
+            # chi_prev is the chi restricted last frame, and grad_mag is only
+            # read on the patches until finish()
+            grid.restrict("tau", "psi", "chi")
+
+        with prof.phase("reduction"):
+            _chi_history.append(grid.mean("chi"))
+            frac = grid.fraction_above("psi", 0.8) if _verdict is None else None
+        _update_verdict(frame, frac)
+
+    def psi_mean(self):
+        return self.grid.mean("psi")
+
+    def finish(self):
+        """Store the composite fine fields in the globals."""
+        global _tau, _psi, _chi, _chi_prev, _grad_mag
+        self.grid.restrict("grad_mag")
+        _tau, _psi, _chi, _chi_prev, _grad_mag = (self.grid.composite(name) for name in self._FIELDS)
+
+
+def _final_verdict(last_frame):
+    global _verdict, _verdict_step
+    if _verdict is None:
+        _verdict = "Hypothesis failed"
+        _verdict_step = last_frame
+    return _verdict
+
+
+def _save_checkpoint(checkpoint, frame, psi_means):
+    checkpoint.save(
+        frame + 1,
+        {"tau": _tau, "psi": _psi, "chi": _chi, "chi_prev": _chi_prev, "grad_mag": _grad_mag,
+         "chi_history": np.asarray(_chi_history, dtype=np.float64),
+         "psi_means": np.asarray(psi_means, dtype=np.float64)},
+        {"rng": _rng.bit_generator.state, "consecutive_coherent": _consecutive_coherent,
+         "verdict": _verdict, "verdict_step": _verdict_step, "dt_prev": _dt_prev},
+    )
+
+
+def _restore_checkpoint(saved):
+    """Load a checkpoint into the globals; returns the next frame and the psi means."""
+    global _tau, _psi, _chi, _chi_prev, _grad_mag
+    global _consecutive_coherent, _verdict, _verdict_step, _chi_history, _dt_prev
+
+    arrays, meta = saved
+    _tau, _psi, _chi = arrays["tau"], arrays["psi"], arrays["chi"]
+    _chi_prev, _grad_mag = arrays["chi_prev"], arrays["grad_mag"]
+    _chi_history = arrays["chi_history"].tolist()
+    _rng.bit_generator.state = meta["rng"]
+    _consecutive_coherent = meta["consecutive_coherent"]
+    _verdict, _verdict_step = meta["verdict"], meta["verdict_step"]
+    _dt_prev = meta.get("dt_prev", 1.0)
+    psi_means = arrays["psi_means"].tolist() if "psi_means" in arrays else []
+    return meta["step"], psi_means
+
+
+def _stationary(chi_means, psi_means, window, tol):
+    """True when both means moved less than ``tol`` over the last ``window`` steps."""
+    if len(chi_means) < window or len(psi_means) < window:
+        return False
+    return (np.ptp(chi_means[-window:]) <= tol) and (np.ptp(psi_means[-window:]) <= tol)
+
+
+def run(steps=steps, seed=None, dtype=np.float64, noise_dtype=None, n=None, profiler=None,
+        checkpoint=None, resume=False, stop_on_verdict=False, stationary_tol=None,
+        stationary_window=50, cfl=None, cached=False, refine_threshold=None, refine_ratio=2,
+        refine_block=5, regrid_every=5):
+    """Step the simulation without plotting.
+
+    ``checkpoint`` is a ``checkpoint.Checkpointer``; with ``resume`` the run
+    continues from its last checkpoint, if there is one.
+
+    The run stops early with ``stop_on_verdict`` once a verdict is reached,
+    and with ``stationary_tol`` once the means of chi and psi have each
+    varied by at most that much over the last ``stationary_window`` steps;
+    the verdict is then decided as at the end of a full run. ``cfl`` (a
+    safety factor up to 1) substeps the chi update whenever a single step
+    would break the CFL limit, see :func:`_advance_chi`. With ``cached``
+    (True or a ``result_cache.ResultCache``) a seeded run is loaded from the
+    result cache when it has been run before.
+
+    ``refine_threshold`` switches to two-level mesh refinement: the grid is
+    stepped at ``refine_ratio`` times the spacing, and fine patches of
+    ``refine_block`` coarse cells per side follow the regions where the
+    tau gradient exceeds the threshold, regridded every ``regrid_every``
+    steps (see ``amr.Hierarchy``). ``n`` must then be a multiple of
+    ``refine_ratio * refine_block``; checkpoints and ``cfl`` are not
+    supported. The result also holds the mean ``refined_fraction`` of the
+    grid.
+
+    Returns a dict with the ``verdict``, the ``verdict_step``, the
+    per-step mean of chi as ``chi_history``, the number of ``steps_run``,
+    the ``stop_reason`` (``"verdict"``, ``"stationary"`` or None) and the
+    final ``fields``.
+    """
+    if cached:
+        from echofoam_falsifiability.result_cache import cached_call
+
+        return cached_call("simulation", run, locals(), cached)
+    _init_fields(seed, dtype, noise_dtype, n, profiler, cfl)
+    advance, psi_mean = step, lambda: float(np.mean(_psi, dtype=np.float64))
+    refined = None
+    if refine_threshold is not None:
+        if checkpoint is not None or cfl is not None:
+            raise ValueError("checkpoint and cfl are not supported with refine_threshold")
+        refined = _Refined(refine_threshold, refine_ratio, refine_block, regrid_every)
+        advance, psi_mean = refined.step, refined.psi_mean
+    start = 0
+    psi_means = []
+    if checkpoint is not None and resume:
+        saved = checkpoint.load()
+        if saved is not None:
+            start, psi_means = _restore_checkpoint(saved)
+    stop_reason = None
+    last = start - 1
+    try:
+        for frame in range(start, steps):
+            advance(frame)
+            last = frame
+            if stationary_tol is not None:
+                psi_means.append(psi_mean())
+            if checkpoint is not None and checkpoint.due(frame):
+                _save_checkpoint(checkpoint, frame, psi_means)
+            if stop_on_verdict and _verdict is not None:
+                stop_reason = "verdict"
+                break
+            if (stationary_tol is not None
+                    and _stationary(_chi_history, psi_means, stationary_window, stationary_tol)):
+                stop_reason = "stationary"
+                break
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    _final_verdict(last if stop_reason else steps - 1)
+    extra = {}
+    if refined is not None:
+        refined.finish()
+        extra["refined_fraction"] = float(np.mean(refined.refined)) if refined.refined else 0.0
+    return {
+        "verdict": _verdict,
+        "verdict_step": _verdict_step,
+        "steps_run": last + 1,
+        "stop_reason": stop_reason,
+        "chi_history": list(_chi_history),
+        "fields": {"tau": _tau, "grad_mag": _grad_mag, "psi": _psi, "chi": _chi},
+        **extra,
+    }
+
+
+def create_animation(seed=None, dtype=np.float64, profiler=None, out_dir=".",
+                     stop_on_verdict=False, cfl=None, drop_frames=False, max_pixels=512):
+    """Construct the figure and animation for the simulation.
+
+    ``seed`` selects the noise stream, see ``rng.make_rng``, ``dtype`` the
+    precision of the fields and ``profiler`` times the step, plotting and
+    I/O phases. The last frame is saved to ``out_dir``. With
+    ``stop_on_verdict`` the animation ends at the frame that decides the
+    verdict instead of rendering the remaining frames. ``drop_frames`` and
+    ``max_pixels`` configure the display, see ``viewer.Viewer``.
+    """
+    import matplotlib.pyplot as plt
+
+    from echofoam_falsifiability.viewer import Viewer
+
+    _init_fields(seed, dtype, profiler=profiler, cfl=cfl)
 
     grad_x, grad_y = np.gradient(_tau)
     global _grad_mag
     _grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-    im_grad = axes[0, 1].imshow(_grad_mag, cmap="cividis", animated=True)
-    axes[0, 1].set_title("∇tau")
 
-    im_psi = axes[1, 0].imshow(_psi, cmap="viridis", animated=True)
+    fig, axes = plt.subplots(2, 2, figsize=(8, 8))
+    viewer = Viewer(fig, max_pixels=max_pixels, drop_frames=drop_frames)
+    tau_panel = viewer.image(axes[0, 0], _tau, cmap="plasma")
+    axes[0, 0].set_title("tau")
+    grad_panel = viewer.image(axes[0, 1], _grad_mag, cmap="cividis")
+    axes[0, 1].set_title("∇tau")
+    psi_panel = viewer.image(axes[1, 0], _psi, cmap="viridis")
     axes[1, 0].set_title("psi")
-
-    im_chi = axes[1, 1].imshow(_chi, cmap="inferno", animated=True)
+    chi_panel = viewer.image(axes[1, 1], _chi, cmap="inferno")
     axes[1, 1].set_title("chi")
 
     for row in axes:
@@ -57,70 +403,41 @@ def create_animation():
             ax.set_xticks([])
             ax.set_yticks([])
 
-    def update(frame):
-        global _tau, _psi, _chi, _chi_prev, _grad_mag
-        global _consecutive_coherent, _verdict, _verdict_step
+    def stop():
+        return stop_on_verdict and _verdict is not None
 
-        _tau += 0.1 * np.random.randn(size, size)
-        _tau *= 0.995
+    def draw(frame):
+        with _profiler.phase("plotting"):
+            tau_panel.set_data(_tau)
+            grad_panel.set_data(_grad_mag)
+            psi_panel.set_data(_psi)
+            chi_panel.set_data(_chi)
 
-        grad_x, grad_y = np.gradient(_tau)
-        _grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-
-        _psi += 0.1 * (1.0 / (1.0 + _grad_mag) - _psi)
+        if frame is not None and (frame == steps - 1 or stop()):
+            with _profiler.phase("io"):
+                plt.savefig(os.path.join(out_dir, "final_frame.png"))
+        return viewer.artists
 
-        laplacian = (
-            np.roll(_chi, 1, axis=0) + np.roll(_chi, -1, axis=0)
-            + np.roll(_chi, 1, axis=1) + np.roll(_chi, -1, axis=1)
-            - 4 * _chi
-        )
-        chi_new = 2 * _chi - _chi_prev + 0.2 * _psi * laplacian
-        _chi_prev = _chi
-        _chi = chi_new
-
-        if _verdict is None:
-            frac = np.mean(_psi > 0.8)
-            if frac >= 0.6:
-                _consecutive_coherent += 1
-                if _consecutive_coherent >= 100:
-                    _verdict = "Hypothesis sustained"
-                    _verdict_step = frame
-                    print(f"Coherence stabilized at step {frame}")
-            else:
-                if _consecutive_coherent > 0:
-                    _verdict = "Hypothesis failed"
-                    _verdict_step = frame
-                    print(f"Coherence lost at step {frame}")
-                _consecutive_coherent = 0
-
-        im_tau.set_data(_tau)
-        im_grad.set_data(_grad_mag)
-        im_psi.set_data(_psi)
-        im_chi.set_data(_chi)
-
-        if frame == steps - 1:
-            plt.savefig("final_frame.png")
-        return im_tau, im_grad, im_psi, im_chi
-
-    anim = FuncAnimation(fig, update, frames=steps, interval=50, blit=True, repeat=False)
+    anim = viewer.animate(step, draw, steps, stop)
     plt.tight_layout()
     return fig, anim
 
 
-def main():
-    fig, anim = create_animation()
+def main(seed=None, out_dir=".", stop_on_verdict=False):
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FFMpegWriter
+
+    os.makedirs(out_dir, exist_ok=True)
+    fig, anim = create_animation(seed, out_dir=out_dir, stop_on_verdict=stop_on_verdict)
     writer = FFMpegWriter(fps=20)
-    anim.save("simulation.mp4", writer=writer)
+    anim.save(os.path.join(out_dir, "simulation.mp4"), writer=writer)
 
-    global _verdict, _verdict_step
-    if _verdict is None:
-        _verdict = "Hypothesis failed"
-        _verdict_step = steps - 1
+    verdict = _final_verdict(steps - 1)
 
-    with open("epcd_results.txt", "w") as f:
-        f.write(_verdict + "\n")
+    with open(os.path.join(out_dir, "epcd_results.txt"), "w") as f:
+        f.write(verdict + "\n")
 
-    print(_verdict)
+    print(verdict)
     plt.close(fig)
 
 
@@ -0,0 +1,116 @@
+"""Uniform-grid spatial hash for proximity queries.
+
+Points are bucketed into square cells of side ``cell_size``; with the cell
+size equal to the query radius, every neighbor within the radius lies in
+the 3 x 3 block of cells around the query point. The points are kept
+sorted by cell. After a move only the points that changed cell are out of
+place, so :meth:`SpatialHash.update` re-sorts the previous order with a
+stable (run-aware) sort in close to linear time::
+
+    grid = SpatialHash(TENSION_RADIUS, width, height)
+    grid.update(enemies)                    # (N, 2), after every move
+    d2 = grid.nearest2(players)             # squared distance, inf if none in range
+"""
+
+import numpy as np
+
+_OFFSETS = np.array([(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+
+
+class SpatialHash:
+    """Points of a ``width`` x ``height`` area bucketed by cell.
+
+    Parameters
+    ----------
+    cell_size : float
+        Side of a cell; queries find every point within this distance.
+    width, height : float
+        Extent of the area. Points outside are counted in the border cells.
+    """
+
+    def __init__(self, cell_size, width, height):
+        self.cell_size = float(cell_size)
+        self.cols = max(1, int(np.ceil(width / self.cell_size)))
+        self.rows = max(1, int(np.ceil(height / self.cell_size)))
+        self.cell = None
+        self.order = None
+        self.starts = None
+        self.sorted_x = self.sorted_y = None
+        self.resorts = 0
+
+    def cells(self, points):
+        """``(col, row)`` of each point."""
+        points = np.asarray(points, dtype=float)
+        # truncation equals floor once negative coordinates are clipped to cell 0
+        col = (points[..., 0] * (1.0 / self.cell_size)).astype(np.intp)
+        row = (points[..., 1] * (1.0 / self.cell_size)).astype(np.intp)
+        return np.clip(col, 0, self.cols - 1), np.clip(row, 0, self.rows - 1)
+
+    def update(self, points):
+        """Rebucket ``(N, 2)`` points after they moved."""
+        points = np.asarray(points, dtype=float)
+        col, row = self.cells(points)
+        cell = row * self.cols + col
+        if self.cell is None or len(cell) != len(self.cell):
+            self.order = np.argsort(cell, kind="stable")
+            self._bucket(cell)
+        elif not np.array_equal(cell, self.cell):
+            self.order = self.order[np.argsort(cell[self.order], kind="stable")]
+            self._bucket(cell)
+        # coordinates in bucket order, so each cell is a contiguous run
+        self.sorted_x = points[self.order, 0]
+        self.sorted_y = points[self.order, 1]
+
+    def _bucket(self, cell):
+        self.cell = cell
+        counts = np.bincount(cell, minlength=self.rows * self.cols)
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+        self.resorts += 1
+
+    def _candidates(self, queries):
+        """``(owner, slot)`` of every point in the 3 x 3 cells around each query.
+
+        ``owner`` is the row of the query, grouped by query, and ``slot``
+        the position of the point in bucket order.
+        """
+        col, row = self.cells(np.asarray(queries, dtype=float).reshape(-1, 2))
+        ncol = col[:, None] + _OFFSETS[:, 0]
+        nrow = row[:, None] + _OFFSETS[:, 1]
+        valid = (ncol >= 0) & (ncol < self.cols) & (nrow >= 0) & (nrow < self.rows)
+        cell = np.where(valid, nrow * self.cols + ncol, 0).ravel()
+        lo = self.starts[cell]
+        lengths = np.where(valid.ravel(), self.starts[cell + 1] - lo, 0)
+        total = int(lengths.sum())
+        first = np.cumsum(lengths) - lengths
+        owner = np.repeat(np.repeat(np.arange(len(col)), len(_OFFSETS)), lengths)
+        slot = np.arange(total) - np.repeat(first - lo, lengths)
+        return owner, slot
+
+    def candidates(self, queries):
+        """Points in the 3 x 3 cells around each query.
+
+        Returns ``(owner, index)``: for every candidate the row of its
+        query in ``queries`` and its row in the hashed points, grouped by
+        query.
+        """
+        owner, slot = self._candidates(queries)
+        return owner, self.order[slot]
+
+    def nearest2(self, queries):
+        """Squared distance from each query to the nearest point within ``cell_size``.
+
+        Points farther away may be reported as well; queries with no
+        candidate get ``inf``.
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 2)
+        owner, slot = self._candidates(queries)
+        result = np.full(len(queries), np.inf)
+        if not len(slot):
+            return result
+        dx = self.sorted_x[slot] - queries[owner, 0]
+        dy = self.sorted_y[slot] - queries[owner, 1]
+        d2 = dx * dx + dy * dy
+        counts = np.bincount(owner, minlength=len(queries))
+        hit = counts > 0
+        result[hit] = np.minimum.reduceat(d2, (np.cumsum(counts) - counts)[hit])
+        return result
@@ -0,0 +1,207 @@
+"""Finite-difference stencils on the atmospheric shell of ``weather_sphere``.
+
+Fields live on an ``(r, theta, phi)`` grid. Derivatives use the physical
+metric of spherical coordinates, so the gradient magnitude is::
+
+    |grad tau|^2 = (d tau/dr)^2 + (1/r d tau/dtheta)^2 + (1/(r sin theta) d tau/dphi)^2
+
+with ``r`` the absolute radius above the terrain. Fields handed to the
+stencil carry one halo cell on each side of the phi axis, see
+:meth:`ShellStencil.new_field`. For a full circle in phi the halos wrap
+around, otherwise they are linearly extrapolated so the edge derivative is
+one-sided. The r and theta edges are one-sided as in ``np.gradient``.
+"""
+
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# numba is imported when the kernel is first compiled, not at import time
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+numba = None
+
+BACKENDS = ("numpy", "threads", "numba")
+
+
+class ShellGrid:
+    """Coordinates and terrain of a spherical atmospheric shell."""
+
+    def __init__(
+        self,
+        radius=1.0,
+        theta_extent=np.pi / 2,
+        phi_extent=2 * np.pi,
+        bump=0.05,
+        grid_r=10,
+        grid_theta=32,
+        grid_phi=64,
+    ):
+        if grid_r < 2 or grid_theta < 2 or grid_phi < 2:
+            raise ValueError("grid_r, grid_theta and grid_phi must be at least 2")
+        self.radius = radius
+        self.bump = bump
+        self.periodic = bool(np.isclose(phi_extent, 2 * np.pi))
+        self.r = np.linspace(0.05, 0.2, grid_r)
+        self.theta = np.linspace(0.0, theta_extent, grid_theta)
+        # a periodic axis must not repeat phi=0 at phi=2*pi
+        self.phi = np.linspace(0.0, phi_extent, grid_phi, endpoint=not self.periodic)
+        self.dr = self.r[1] - self.r[0]
+        self.dtheta = self.theta[1] - self.theta[0]
+        self.dphi = self.phi[1] - self.phi[0]
+        self.shape = (grid_r, grid_theta, grid_phi)
+
+    def radius_field(self, phi_slice=slice(None)):
+        """Absolute radius ``terrain + r`` for the given phi columns."""
+        theta = self.theta[None, :, None]
+        phi = self.phi[None, None, phi_slice]
+        terrain = self.radius + self.bump * np.sin(4 * theta) * np.sin(4 * phi)
+        return terrain + self.r[:, None, None]
+
+
+class ShellStencil:
+    """Gradient magnitude on a :class:`ShellGrid` with precomputed metric.
+
+    Parameters
+    ----------
+    grid : ShellGrid
+        Grid the fields are defined on.
+    phi_slice : slice, optional
+        Columns of the grid this stencil covers. A stencil over a slab of
+        columns expects its halos to be filled by the caller.
+    backend : {"numpy", "threads", "numba"}
+        ``"threads"`` splits the radial axis across a thread pool, ``"numba"``
+        uses a compiled parallel kernel and requires numba.
+    threads : int, optional
+        Worker count for the ``"threads"`` backend, defaults to the CPU count.
+    dtype : numpy dtype, optional
+        Floating point type of the metric coefficients and buffers.
+    """
+
+    def __init__(self, grid, phi_slice=slice(None), backend="numpy", threads=None,
+                 dtype=np.float64):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+        if backend == "numba" and not NUMBA_AVAILABLE:
+            raise RuntimeError("numba backend requested but numba is not installed")
+        self.grid = grid
+        self.backend = backend
+        self.dtype = np.dtype(dtype)
+        lo, hi, _ = phi_slice.indices(grid.shape[2])
+        self.phi_slice = slice(lo, hi)
+
+        inv_r = 1.0 / grid.radius_field(self.phi_slice)
+        # clamp sin(theta) at the pole so the phi term stays finite there
+        sin_t = np.maximum(np.sin(grid.theta), np.sin(grid.dtheta / 2))
+        self.shape = inv_r.shape
+        self.inv_dr = 1.0 / grid.dr
+        # central-difference weights with the metric folded in
+        self._ct = (inv_r / (2 * grid.dtheta)).astype(self.dtype)
+        self._cp = (inv_r / sin_t[None, :, None] / (2 * grid.dphi)).astype(self.dtype)
+        self._scratch = np.empty(self.shape, dtype=self.dtype)
+
+        self._pool = None
+        self._chunks = [(0, self.shape[0])]
+        if backend == "threads":
+            workers = min(threads or os.cpu_count() or 1, self.shape[0])
+            bounds = np.linspace(0, self.shape[0], workers + 1).astype(int)
+            self._chunks = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+            self._pool = ThreadPoolExecutor(max_workers=len(self._chunks))
+
+    def new_field(self):
+        """Zeroed field with phi halos; the interior is ``field[..., 1:-1]``."""
+        nr, nt, nphi = self.shape
+        return np.zeros((nr, nt, nphi + 2), dtype=self.dtype)
+
+    def fill_halo(self, ext):
+        """Fill the phi halos of a field covering the whole grid."""
+        if self.grid.periodic:
+            ext[..., 0] = ext[..., -2]
+            ext[..., -1] = ext[..., 1]
+        else:
+            np.subtract(2 * ext[..., 1], ext[..., 2], out=ext[..., 0])
+            np.subtract(2 * ext[..., -2], ext[..., -3], out=ext[..., -1])
+
+    def gradient_magnitude(self, ext, out):
+        """Write ``|grad tau|`` of the halo field ``ext`` into ``out``."""
+        if self.backend == "numba":
+            _numba_kernel()(ext, self.inv_dr, self._ct, self._cp, out)
+        elif self._pool is None:
+            self._grad_mag_rows(ext, out, 0, self.shape[0])
+        else:
+            jobs = [self._pool.submit(self._grad_mag_rows, ext, out, a, b) for a, b in self._chunks]
+            for job in jobs:
+                job.result()
+        return out
+
+    def _grad_mag_rows(self, ext, out, a, b):
+        nr, nt = self.shape[:2]
+        c = ext[..., 1:-1]
+        s = self._scratch[a:b]
+        o = out[a:b]
+
+        # radial: central inside, one-sided at the bottom and top of the shell
+        lo, hi = max(a, 1), min(b, nr - 1)
+        if hi > lo:
+            np.subtract(c[lo + 1:hi + 1], c[lo - 1:hi - 1], out=self._scratch[lo:hi])
+            self._scratch[lo:hi] *= 0.5 * self.inv_dr
+        if a == 0:
+            np.subtract(c[1], c[0], out=self._scratch[0])
+            self._scratch[0] *= self.inv_dr
+        if b == nr:
+            np.subtract(c[-1], c[-2], out=self._scratch[-1])
+            self._scratch[-1] *= self.inv_dr
+        np.multiply(s, s, out=o)
+
+        # polar: the edge rows are one-sided, hence twice the central weight
+        rows = c[a:b]
+        np.subtract(rows[:, 2:], rows[:, :-2], out=s[:, 1:-1])
+        np.subtract(rows[:, 1], rows[:, 0], out=s[:, 0])
+        np.subtract(rows[:, nt - 1], rows[:, nt - 2], out=s[:, -1])
+        s[:, 0] *= 2
+        s[:, -1] *= 2
+        s *= self._ct[a:b]
+        s *= s
+        o += s
+
+        # azimuthal: halos make every column a central difference
+        np.subtract(ext[a:b, :, 2:], ext[a:b, :, :-2], out=s)
+        s *= self._cp[a:b]
+        s *= s
+        o += s
+        np.sqrt(o, out=o)
+
+
+_NUMBA_KERNEL = None
+
+
+def _numba_kernel():
+    """Compile the numba gradient kernel on first use."""
+    global _NUMBA_KERNEL, numba
+    if _NUMBA_KERNEL is None:
+        import numba
+        _NUMBA_KERNEL = numba.njit(parallel=True, cache=True)(_grad_mag_loops)
+    return _NUMBA_KERNEL
+
+
+def _grad_mag_loops(ext, inv_dr, ct, cp, out):
+    nr, nt, nphi = out.shape
+    for i in numba.prange(nr):
+        for j in range(nt):
+            for k in range(nphi):
+                kk = k + 1
+                if i == 0:
+                    gr = (ext[1, j, kk] - ext[0, j, kk]) * inv_dr
+                elif i == nr - 1:
+                    gr = (ext[i, j, kk] - ext[i - 1, j, kk]) * inv_dr
+                else:
+                    gr = (ext[i + 1, j, kk] - ext[i - 1, j, kk]) * 0.5 * inv_dr
+                if j == 0:
+                    gt = 2 * (ext[i, 1, kk] - ext[i, 0, kk]) * ct[i, j, k]
+                elif j == nt - 1:
+                    gt = 2 * (ext[i, j, kk] - ext[i, j - 1, kk]) * ct[i, j, k]
+                else:
+                    gt = (ext[i, j + 1, kk] - ext[i, j - 1, kk]) * ct[i, j, k]
+                gp = (ext[i, j, kk + 1] - ext[i, j, kk - 1]) * cp[i, j, k]
+                out[i, j, k] = np.sqrt(gr * gr + gt * gt + gp * gp)
@@ -1,42 +1,376 @@
+"""Ring packet transport down a tau well.
+
+Every quantity of a step is local to the packet: the ring is drawn from a
+cached offset kernel into its bounding box only, the tau gradient is kept
+up to date only where tau changes, and it is read at the packet center by
+bilinear interpolation. A step therefore costs O(ring area), whatever the
+grid size.
+
+:func:`run_batch` moves many packets at once through the superposition of
+their target wells, see :class:`PacketBatch`.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 
+# the ring is cut off this many thicknesses outside its radius, where it is
+# below exp(-CUTOFF**2)
+CUTOFF = 4.0
 
-def ring_field(center, radius=10, thickness=2, size=100):
+
+def ring_field(center, radius=10, thickness=2, size=100, dtype=np.float64):
+    dtype = np.dtype(dtype).type
     y, x = np.ogrid[:size, :size]
-    dist = np.sqrt((x - center[0]) ** 2 + (y - center[1]) ** 2)
-    return np.exp(-((dist - radius) / thickness) ** 2)
+    cx, cy = np.asarray(center, dtype=dtype)
+    dist = np.sqrt((x.astype(dtype) - cx) ** 2 + (y.astype(dtype) - cy) ** 2)
+    return np.exp(-((dist - dtype(radius)) / dtype(thickness)) ** 2)
 
 
-def create_animation():
-    size = 100
-    steps = 150
+@lru_cache(maxsize=None)
+def _ring_offsets(radius, thickness, dtype):
+    """Integer offsets covering a ring whose center lies in the [0, 1) cell."""
+    half = int(np.ceil(radius + CUTOFF * thickness))
+    return half, np.arange(-half, half + 2, dtype=dtype)
+
+
+def ring_patch(center, shape, radius=10, thickness=2, dtype=np.float64):
+    """Return ``(rows, cols, values)`` of the ring around ``center``.
+
+    Only the bounding box of the ring, clipped to a grid of ``shape``, is
+    evaluated; ``field[rows, cols] = values`` matches :func:`ring_field`
+    there and the ring is below ``exp(-CUTOFF**2)`` outside it.
+    """
+    dtype = np.dtype(dtype).type
+    half, offsets = _ring_offsets(float(radius), float(thickness), dtype)
+    cx, cy = center
+    col, row = int(np.floor(cx)), int(np.floor(cy))
+    r0, r1 = max(row - half, 0), min(row + half + 2, shape[0])
+    c0, c1 = max(col - half, 0), min(col + half + 2, shape[1])
+    rows, cols = slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+    if r1 <= r0 or c1 <= c0:
+        return rows, cols, np.zeros((rows.stop - r0, cols.stop - c0), dtype=dtype)
+    dy = offsets[r0 - row + half:r1 - row + half] - dtype(cy - row)
+    dx = offsets[c0 - col + half:c1 - col + half] - dtype(cx - col)
+    dist = np.sqrt(dy[:, None] ** 2 + dx[None, :] ** 2)
+    return rows, cols, np.exp(-((dist - dtype(radius)) / dtype(thickness)) ** 2)
+
+
+def splat_rings(field, centers, weights=1.0, radius=10, thickness=2, chunk=1024):
+    """Add ``weights[k]`` times the ring around ``centers[k]`` to ``field`` in place.
+
+    All rings are evaluated on the cached offset kernel at once, ``chunk``
+    packets at a time, and scattered with ``np.add.at``, so overlapping
+    rings superpose. ``field`` must be C-contiguous.
+    """
+    dtype = field.dtype.type
+    half, offsets = _ring_offsets(float(radius), float(thickness), dtype)
+    steps = np.arange(-half, half + 2)
+    n_rows, n_cols = field.shape
+    flat = field.reshape(-1)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    weights = np.broadcast_to(np.asarray(weights, dtype=dtype), (len(centers),))
+    for lo in range(0, len(centers), chunk):
+        cx, cy = centers[lo:lo + chunk, 0], centers[lo:lo + chunk, 1]
+        col, row = np.floor(cx).astype(np.intp), np.floor(cy).astype(np.intp)
+        dy = offsets[None, :] - (cy - row).astype(dtype)[:, None]
+        dx = offsets[None, :] - (cx - col).astype(dtype)[:, None]
+        dist = np.sqrt(dy[:, :, None] ** 2 + dx[:, None, :] ** 2)
+        values = np.exp(-((dist - dtype(radius)) / dtype(thickness)) ** 2)
+        values *= weights[lo:lo + chunk, None, None]
+        rr = row[:, None] + steps
+        cc = col[:, None] + steps
+        inside = ((rr >= 0) & (rr < n_rows))[:, :, None] & ((cc >= 0) & (cc < n_cols))[:, None, :]
+        index = rr[:, :, None] * n_cols + cc[:, None, :]
+        np.add.at(flat, index[inside], values[inside])
+    return field
+
+
+def bilinear_many(field, xs, ys):
+    """Vectorized :func:`bilinear` for arrays of positions."""
+    n_rows, n_cols = field.shape
+    x = np.clip(xs, 0.0, n_cols - 1.0)
+    y = np.clip(ys, 0.0, n_rows - 1.0)
+    col = np.minimum(x.astype(np.intp), n_cols - 2)
+    row = np.minimum(y.astype(np.intp), n_rows - 2)
+    fx, fy = x - col, y - row
+    top = (1 - fx) * field[row, col] + fx * field[row, col + 1]
+    bottom = (1 - fx) * field[row + 1, col] + fx * field[row + 1, col + 1]
+    return (1 - fy) * top + fy * bottom
+
+
+def bilinear(field, x, y):
+    """Sample ``field[y, x]`` at a fractional position, clamped to the grid."""
+    n_rows, n_cols = field.shape
+    x = min(max(float(x), 0.0), n_cols - 1.0)
+    y = min(max(float(y), 0.0), n_rows - 1.0)
+    col, row = min(int(x), n_cols - 2), min(int(y), n_rows - 2)
+    fx, fy = x - col, y - row
+    top = (1 - fx) * field[row, col] + fx * field[row, col + 1]
+    bottom = (1 - fx) * field[row + 1, col] + fx * field[row + 1, col + 1]
+    return (1 - fy) * top + fy * bottom
+
+
+@dataclass
+class TeleportState:
+    psi_center: np.ndarray
+    target_center: np.ndarray
+    psi: np.ndarray
+    tau: np.ndarray
+    chi: np.ndarray
+    grad_mag: np.ndarray
+    grad_x: np.ndarray
+    grad_y: np.ndarray
+    psi_box: Tuple[slice, slice]
+    teleport_start: int = 30
+    step_size: float = 0.4
+    radius: float = 10.0
+    thickness: float = 2.0
+    teleport_complete: Optional[int] = None
+
+
+def init_state(size=100, start=(30.0, 50.0), target=(70.0, 50.0), teleport_start=30,
+               step_size=0.4, dtype=np.float64, radius=10.0, thickness=2.0):
+    """Create a ring packet at ``start`` and a target well at ``target``."""
+    psi_center = np.array(start, dtype=float)
+    tau = np.zeros((size, size), dtype=dtype)
+    psi = np.zeros_like(tau)
+    rows, cols, values = ring_patch(psi_center, tau.shape, radius, thickness, dtype)
+    psi[rows, cols] = values
+    return TeleportState(
+        psi_center=psi_center,
+        target_center=np.array(target, dtype=float),
+        psi=psi,
+        tau=tau,
+        chi=np.zeros_like(tau),
+        grad_mag=np.zeros_like(tau),
+        grad_x=np.zeros_like(tau),
+        grad_y=np.zeros_like(tau),
+        psi_box=(rows, cols),
+        teleport_start=teleport_start,
+        step_size=step_size,
+        radius=radius,
+        thickness=thickness,
+    )
+
+
+def _update_gradient(state, rows, cols):
+    """Recompute the cached tau gradient around a changed box of tau."""
+    if rows.stop <= rows.start or cols.stop <= cols.start:
+        return
+    n_rows, n_cols = state.tau.shape
+    r0, r1 = max(rows.start - 1, 0), min(rows.stop + 1, n_rows)
+    c0, c1 = max(cols.start - 1, 0), min(cols.stop + 1, n_cols)
+    # one more cell of context so the central differences match the full grid
+    w0, w1 = max(r0 - 1, 0), min(r1 + 1, n_rows)
+    v0, v1 = max(c0 - 1, 0), min(c1 + 1, n_cols)
+    gy, gx = np.gradient(state.tau[w0:w1, v0:v1])
+    inner = (slice(r0 - w0, r1 - w0), slice(c0 - v0, c1 - v0))
+    box = (slice(r0, r1), slice(c0, c1))
+    state.grad_x[box] = gx[inner]
+    state.grad_y[box] = gy[inner]
+    state.grad_mag[box] = np.sqrt(gx[inner] ** 2 + gy[inner] ** 2)
+
+
+def step(state, frame):
+    """Advance the ring packet by one frame."""
+    dtype = state.tau.dtype
+    if frame == state.teleport_start:
+        rows, cols, well = ring_patch(state.target_center, state.tau.shape, state.radius,
+                                      state.thickness, dtype)
+        state.tau[rows, cols] -= well
+        _update_gradient(state, rows, cols)
+
+    psi_center = state.psi_center
+    x, y = psi_center
+    g = np.array([bilinear(state.grad_x, x, y), bilinear(state.grad_y, x, y)])
+    psi_center -= state.step_size * g
+
+    state.psi[state.psi_box] = 0
+    state.chi[state.psi_box] = 0
+    rows, cols, ring = ring_patch(psi_center, state.psi.shape, state.radius, state.thickness, dtype)
+    state.psi[rows, cols] = ring
+    state.chi[rows, cols] = np.sin(frame / 5.0) * ring
+    state.psi_box = (rows, cols)
+
+    if state.teleport_complete is None:
+        dist = np.linalg.norm(psi_center - state.target_center)
+        if dist < 1.0:
+            state.teleport_complete = frame
+            for field in (state.tau, state.grad_x, state.grad_y, state.grad_mag):
+                field.fill(0)
+
+
+def _save_checkpoint(checkpoint, state, frame, chi_history):
+    rows, cols = state.psi_box
+    checkpoint.save(
+        frame + 1,
+        {"psi_center": state.psi_center, "psi": state.psi, "tau": state.tau, "chi": state.chi,
+         "grad_mag": state.grad_mag, "grad_x": state.grad_x, "grad_y": state.grad_y,
+         "chi_history": np.asarray(chi_history, dtype=np.float64)},
+        {"teleport_complete": state.teleport_complete,
+         "psi_box": [rows.start, rows.stop, cols.start, cols.stop]},
+    )
+
+
+def _restore_checkpoint(state, saved):
+    """Load a checkpoint into ``state``; returns the next frame and the chi history."""
+    arrays, meta = saved
+    state.psi_center, state.psi = arrays["psi_center"], arrays["psi"]
+    state.tau, state.chi, state.grad_mag = arrays["tau"], arrays["chi"], arrays["grad_mag"]
+    state.grad_x, state.grad_y = arrays["grad_x"], arrays["grad_y"]
+    r0, r1, c0, c1 = meta["psi_box"]
+    state.psi_box = (slice(r0, r1), slice(c0, c1))
+    state.teleport_complete = meta["teleport_complete"]
+    chi_history = arrays["chi_history"].tolist() if "chi_history" in arrays else []
+    return meta["step"], chi_history
 
-    start_center = np.array([30.0, 50.0])
-    psi_center = start_center.copy()
-    psi = ring_field(psi_center, size=size)
 
-    tau = np.zeros((size, size))
-    chi = np.zeros((size, size))
+def run(steps=150, size=100, dtype=np.float64, checkpoint=None, resume=False, **params):
+    """Step the transport without plotting.
 
-    target_center = np.array([70.0, 50.0])
-    teleport_start = 30
-    teleport_complete = None
+    ``checkpoint`` is a ``checkpoint.Checkpointer``; with ``resume`` the run
+    continues from its last checkpoint, if there is one. Returns the
+    completion frame, the per-frame float64 mean of chi as ``chi_history``
+    and the final fields.
+    """
+    state = init_state(size, dtype=dtype, **params)
+    start = 0
+    chi_history = []
+    if checkpoint is not None and resume:
+        saved = checkpoint.load()
+        if saved is not None:
+            start, chi_history = _restore_checkpoint(state, saved)
+    try:
+        for frame in range(start, steps):
+            step(state, frame)
+            chi_history.append(float(np.mean(state.chi, dtype=np.float64)))
+            if checkpoint is not None and checkpoint.due(frame):
+                _save_checkpoint(checkpoint, state, frame, chi_history)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    return {
+        "teleport_complete": state.teleport_complete,
+        "chi_history": chi_history,
+        "fields": {"tau": state.tau, "grad_mag": state.grad_mag, "psi": state.psi, "chi": state.chi},
+    }
+
+
+@dataclass
+class PacketBatch:
+    """Many ring packets sharing one tau field.
+
+    ``centers`` and ``targets`` are ``(N, 2)`` arrays of ``(x, y)``
+    positions. At ``teleport_start`` the wells of every target are
+    superposed into tau. A packet that comes within 1 of its target records
+    the frame in ``teleport_complete`` (-1 until then), stops moving and has
+    its well removed from tau.
+    """
+
+    centers: np.ndarray
+    targets: np.ndarray
+    step_sizes: np.ndarray
+    tau: np.ndarray
+    grad_mag: np.ndarray
+    grad_x: np.ndarray
+    grad_y: np.ndarray
+    teleport_complete: np.ndarray
+    teleport_start: int = 30
+    radius: float = 10.0
+    thickness: float = 2.0
+
+
+def init_batch(starts, targets, size=100, step_sizes=0.4, teleport_start=30, dtype=np.float64,
+               radius=10.0, thickness=2.0):
+    """Create a :class:`PacketBatch` from ``(N, 2)`` start and target positions."""
+    centers = np.array(starts, dtype=float).reshape(-1, 2)
+    tau = np.zeros((size, size), dtype=dtype)
+    return PacketBatch(
+        centers=centers,
+        targets=np.array(targets, dtype=float).reshape(-1, 2),
+        step_sizes=np.broadcast_to(np.asarray(step_sizes, dtype=float), (len(centers),)).copy(),
+        tau=tau,
+        grad_mag=np.zeros_like(tau),
+        grad_x=np.zeros_like(tau),
+        grad_y=np.zeros_like(tau),
+        teleport_complete=np.full(len(centers), -1, dtype=np.int64),
+        teleport_start=teleport_start,
+        radius=radius,
+        thickness=thickness,
+    )
+
+
+def _refresh_gradient(batch):
+    gy, gx = np.gradient(batch.tau)
+    batch.grad_x[:], batch.grad_y[:] = gx, gy
+    np.sqrt(gx**2 + gy**2, out=batch.grad_mag)
+
+
+def step_batch(batch, frame):
+    """Advance every moving packet of ``batch`` by one frame."""
+    if frame == batch.teleport_start:
+        waiting = batch.teleport_complete < 0
+        splat_rings(batch.tau, batch.targets[waiting], -1.0, batch.radius, batch.thickness)
+        _refresh_gradient(batch)
+
+    moving = np.flatnonzero(batch.teleport_complete < 0)
+    x, y = batch.centers[moving, 0], batch.centers[moving, 1]
+    g = np.stack([bilinear_many(batch.grad_x, x, y), bilinear_many(batch.grad_y, x, y)], axis=1)
+    batch.centers[moving] -= batch.step_sizes[moving, None] * g
+
+    dist = np.linalg.norm(batch.centers[moving] - batch.targets[moving], axis=1)
+    done = moving[dist < 1.0]
+    if done.size:
+        batch.teleport_complete[done] = frame
+        if frame >= batch.teleport_start:
+            splat_rings(batch.tau, batch.targets[done], 1.0, batch.radius, batch.thickness)
+            for target in batch.targets[done]:
+                rows, cols, _ = ring_patch(target, batch.tau.shape, batch.radius, batch.thickness)
+                _update_gradient(batch, rows, cols)
+
+
+def batch_psi(batch):
+    """Superpose the rings of every packet into one field, for display."""
+    psi = np.zeros_like(batch.tau)
+    return splat_rings(psi, batch.centers, 1.0, batch.radius, batch.thickness)
+
+
+def run_batch(starts, targets, steps=150, size=100, step_sizes=0.4, teleport_start=30,
+              dtype=np.float64, radius=10.0, thickness=2.0):
+    """Move ``N`` packets at once; returns per-packet completion frames and final centers."""
+    batch = init_batch(starts, targets, size, step_sizes, teleport_start, dtype, radius, thickness)
+    for frame in range(steps):
+        step_batch(batch, frame)
+        if np.all(batch.teleport_complete >= 0):
+            break
+    return {"teleport_complete": batch.teleport_complete, "centers": batch.centers}
+
+
+def create_animation(dtype=np.float64, drop_frames=False, max_pixels=512):
+    """Build the live figure; ``drop_frames`` and ``max_pixels`` configure ``viewer.Viewer``."""
+    import matplotlib.pyplot as plt
+
+    from echofoam_falsifiability.viewer import Viewer
+
+    size = 100
+    steps = 150
+    state = init_state(size, dtype=dtype)
 
     fig, axes = plt.subplots(2, 2, figsize=(8, 8))
-    im_tau = axes[0, 0].imshow(tau, cmap="plasma", vmin=-1, vmax=1, animated=True)
+    viewer = Viewer(fig, max_pixels=max_pixels, drop_frames=drop_frames)
+    tau_panel = viewer.image(axes[0, 0], state.tau, cmap="plasma", vmin=-1, vmax=1)
     axes[0, 0].set_title("tau")
 
-    grad_x, grad_y = np.gradient(tau)
-    grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-    im_grad = axes[0, 1].imshow(grad_mag, cmap="cividis", animated=True)
+    grad_panel = viewer.image(axes[0, 1], state.grad_mag, cmap="cividis")
     axes[0, 1].set_title("∇tau")
 
-    im_psi = axes[1, 0].imshow(psi, cmap="viridis", animated=True)
+    psi_panel = viewer.image(axes[1, 0], state.psi, cmap="viridis")
     axes[1, 0].set_title("psi")
 
-    im_chi = axes[1, 1].imshow(chi, cmap="inferno", animated=True)
+    chi_panel = viewer.image(axes[1, 1], state.chi, cmap="inferno")
     axes[1, 1].set_title("chi")
 
     for row in axes:
@@ -44,46 +378,22 @@ def create_animation():
             ax.set_xticks([])
             ax.set_yticks([])
 
-    step_size = 0.4
-
-    def update(frame):
-        nonlocal psi_center, psi, tau, chi, grad_x, grad_y, grad_mag, teleport_complete
-
-        if frame == teleport_start:
-            tau -= ring_field(target_center, size=size)
+    def draw(frame):
+        tau_panel.set_data(state.tau)
+        grad_panel.set_data(state.grad_mag)
+        psi_panel.set_data(state.psi)
+        chi_panel.set_data(state.chi)
+        return viewer.artists
 
-        grad_x, grad_y = np.gradient(tau)
-        grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-
-        g = np.array([
-            grad_x[int(psi_center[1]) % size, int(psi_center[0]) % size],
-            grad_y[int(psi_center[1]) % size, int(psi_center[0]) % size],
-        ])
-        psi_center -= step_size * g
-        psi = ring_field(psi_center, size=size)
-
-        chi[:] = np.sin(frame / 5.0) * psi
-
-        if teleport_complete is None:
-            dist = np.linalg.norm(psi_center - target_center)
-            if dist < 1.0:
-                teleport_complete = frame
-                tau[:] = 0
-
-        im_tau.set_data(tau)
-        im_grad.set_data(grad_mag)
-        im_psi.set_data(psi)
-        im_chi.set_data(chi)
-
-        return im_tau, im_grad, im_psi, im_chi
-
-    anim = FuncAnimation(fig, update, frames=steps, interval=50, blit=True, repeat=False)
+    anim = viewer.animate(lambda frame: step(state, frame), draw, steps)
     plt.tight_layout()
     return fig, anim
 
 
 def main():
-    fig, _ = create_animation()
+    import matplotlib.pyplot as plt
+
+    fig, _ = create_animation(drop_frames=True)
     plt.show()
 
 
@@ -0,0 +1,197 @@
+"""Headless tension field driven by interface events.
+
+:class:`TensionField` holds the tau grid of ``adaptive_gui`` without any
+Tk state. Events come in as arrays and are scattered into the grid with
+``np.add.at``; the decay of each tick is kept as a global scale factor, so
+it costs nothing per cell, and the gradient magnitude is recomputed only
+around the cells that changed since the last tick. Recorded sessions can
+be replayed offline much faster than real time to tune ``threshold`` and
+the grid size::
+
+    field = TensionField(grid=20, threshold=1.0)
+    result = field.replay(*events_to_arrays(read_events("memory.jsonl")))
+    print(result["spikes"].max(), result["shown"])
+"""
+
+import numpy as np
+
+# renormalize the stored grid once the decay scale drops below this
+_MIN_SCALE = 1e-100
+
+
+def events_to_arrays(events):
+    """Split logged events into ``(t, is_click, x, y)`` arrays, see ``events.read_events``."""
+    t = np.array([e["t"] for e in events], dtype=np.float64)
+    is_click = np.array([e["type"] == "click" for e in events], dtype=bool)
+    x = np.array([e["x"] for e in events], dtype=np.float64)
+    y = np.array([e["y"] for e in events], dtype=np.float64)
+    return t, is_click, x, y
+
+
+def _stencil(grid):
+    """Per-cell neighbor tables for ``np.gradient`` on a ``grid`` x ``grid`` field.
+
+    Returns the flat indices of the cell and its four neighbors, and the
+    up, down, left and right samples with the matching inverse spacings
+    (one-sided at the edges, as ``np.gradient`` does).
+    """
+    rows, cols = np.divmod(np.arange(grid * grid), grid)
+    up, down = np.maximum(rows - 1, 0), np.minimum(rows + 1, grid - 1)
+    left, right = np.maximum(cols - 1, 0), np.minimum(cols + 1, grid - 1)
+    neighbors = np.stack([rows * grid + cols, up * grid + cols, down * grid + cols,
+                          rows * grid + left, rows * grid + right], axis=1)
+    return (neighbors, up * grid + cols, down * grid + cols, 1.0 / (down - up),
+            rows * grid + left, rows * grid + right, 1.0 / (right - left))
+
+
+class TensionField:
+    """Tension grid fed by pointer events.
+
+    Parameters
+    ----------
+    grid : int, optional
+        Cells per side.
+    width, height : int, optional
+        Size of the pointer area in pixels.
+    threshold : float, optional
+        Gradient magnitude above which a tick reports a spike.
+    decay : float, optional
+        Factor applied to tau on every :meth:`tick`.
+
+    The field is not thread-safe: feed it events from the thread that
+    ticks it.
+    """
+
+    def __init__(self, grid=20, width=400, height=300, threshold=1.0, decay=0.95):
+        self.grid = grid
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.decay = decay
+        self.last_move_time = None
+        # tau is _scale * _tau and its gradient magnitude _scale * _grad
+        self._tau = np.zeros((grid, grid), dtype=float)
+        self._grad = np.zeros_like(self._tau)
+        self._scale = 1.0
+        self._max = 0.0
+        self._argmax = 0
+        self._changed = []
+        (self._neighbors, self._up, self._down, self._inv_dy,
+         self._left, self._right, self._inv_dx) = _stencil(grid)
+
+    @property
+    def tau(self):
+        return self._scale * self._tau
+
+    def cells(self, x, y):
+        """Grid ``(rows, cols)`` of pixel positions, clamped to the grid."""
+        rows = (np.asarray(y, dtype=float) / self.height * self.grid).astype(np.intp)
+        cols = (np.asarray(x, dtype=float) / self.width * self.grid).astype(np.intp)
+        return np.clip(rows, 0, self.grid - 1), np.clip(cols, 0, self.grid - 1)
+
+    def add(self, x, y, amount):
+        """Add ``amount`` to the cells under each position."""
+        rows, cols = self.cells(x, y)
+        index = rows * self.grid + cols
+        np.add.at(self._tau.reshape(-1), index, np.asarray(amount, dtype=float) / self._scale)
+        self._changed.append(np.atleast_1d(index))
+
+    def motion(self, t, x, y):
+        """Pointer moves at times ``t``: each adds the time since the previous move."""
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        self.ingest(t, np.zeros(t.shape, dtype=bool), x, y)
+
+    def click(self, x, y):
+        """Clicks halve the tension of their cells."""
+        rows, cols = self.cells(x, y)
+        index = np.atleast_1d(rows * self.grid + cols)
+        np.multiply.at(self._tau.reshape(-1), index, 0.5)
+        self._changed.append(index)
+
+    def _prepare(self, t, is_click, x, y):
+        """Flat cell index and added tension of every event of a time-ordered batch."""
+        t, is_click = np.atleast_1d(np.asarray(t, dtype=float)), np.atleast_1d(is_click)
+        rows, cols = self.cells(np.atleast_1d(x), np.atleast_1d(y))
+        amount = np.zeros(len(t))
+        moves = np.flatnonzero(~is_click)
+        if moves.size:
+            move_t = t[moves]
+            previous = move_t[0] if self.last_move_time is None else self.last_move_time
+            amount[moves] = np.diff(move_t, prepend=previous)
+            self.last_move_time = move_t[-1]
+        return rows * self.grid + cols, amount, is_click
+
+    def _apply(self, index, amount, is_click):
+        flat = self._tau.reshape(-1)
+        start = 0
+        for i in np.flatnonzero(is_click):
+            np.add.at(flat, index[start:i], amount[start:i] / self._scale)
+            flat[index[i]] *= 0.5
+            start = i + 1
+        np.add.at(flat, index[start:], amount[start:] / self._scale)
+        self._changed.append(index)
+
+    def ingest(self, t, is_click, x, y):
+        """Apply a time-ordered batch of moves and clicks."""
+        self._apply(*self._prepare(t, is_click, x, y))
+
+    def _refresh(self):
+        """Recompute the gradient around the changed cells."""
+        if not self._changed:
+            return
+        # take the pending list in one step, so cells added meanwhile stay pending
+        pending, self._changed = self._changed, []
+        changed = pending[0] if len(pending) == 1 else np.concatenate(pending)
+        # repeated cells are recomputed more than once, which is cheaper than deduplicating
+        index = self._neighbors[changed].ravel()
+        tau = self._tau.reshape(-1)
+        grad_y = (tau[self._down[index]] - tau[self._up[index]]) * self._inv_dy[index]
+        grad_x = (tau[self._right[index]] - tau[self._left[index]]) * self._inv_dx[index]
+        values = np.sqrt(grad_x**2 + grad_y**2)
+        self._grad.reshape(-1)[index] = values
+
+        best = int(np.argmax(values))
+        if values[best] >= self._max:
+            self._max, self._argmax = float(values[best]), int(index[best])
+        elif np.any(index == self._argmax):
+            # the old maximum went down; fall back to a full scan
+            self._argmax = int(np.argmax(self._grad))
+            self._max = float(self._grad.reshape(-1)[self._argmax])
+
+    def spike(self):
+        """Largest gradient magnitude of tau."""
+        self._refresh()
+        return self._scale * self._max
+
+    def tick(self):
+        """Decay tau by one step; returns the gradient spike afterwards."""
+        self._scale *= self.decay
+        if self._scale < _MIN_SCALE:
+            self._tau *= self._scale
+            self._grad *= self._scale
+            self._max *= self._scale
+            self._scale = 1.0
+        return self.spike()
+
+    def replay(self, t, is_click, x, y, interval=0.1):
+        """Replay recorded events with a tick every ``interval`` seconds.
+
+        Returns a dict with the ``spikes`` after every tick, whether the
+        help would be ``visible`` after it, and how often it was ``shown``.
+        """
+        t = np.asarray(t, dtype=float)
+        if not t.size:
+            return {"spikes": np.zeros(0), "visible": np.zeros(0, dtype=bool), "shown": 0}
+        edges = t[0] + interval * np.arange(1, int((t[-1] - t[0]) / interval) + 2)
+        bounds = np.searchsorted(t, edges, side="left")
+        index, amount, is_click = self._prepare(t, is_click, x, y)
+        spikes = np.empty(len(edges))
+        start = 0
+        for k, stop in enumerate(bounds):
+            if stop > start:
+                self._apply(index[start:stop], amount[start:stop], is_click[start:stop])
+                start = stop
+            spikes[k] = self.tick()
+        visible = spikes > self.threshold
+        shown = int(visible[0]) + int(np.count_nonzero(visible[1:] & ~visible[:-1]))
+        return {"spikes": spikes, "visible": visible, "shown": shown}
@@ -0,0 +1,189 @@
+"""Vectorized game state for the tension prototype.
+
+:class:`World` keeps every player and enemy as rows of NumPy arrays and
+advances them all in one pass per fixed timestep, without pygame. The
+``tension_game.py`` window draws from it, and the headless mode uses it
+directly to simulate hours of play in seconds for balancing::
+
+    world = World.random(enemies=2000, seed=0)
+    stats = world.run(seconds=3600)
+    print(stats["mean_tension"], stats["high_tension_fraction"])
+
+Positions are the sprite centers in pixels and are kept in floating
+point.
+"""
+
+import numpy as np
+
+from echofoam_falsifiability.spatial_hash import SpatialHash
+
+WIDTH, HEIGHT = 800, 600
+PLAYER_SPEED = 200  # pixels per second
+BASE_ENEMY_SPEED = 50
+TENSION_DECAY = 0.1  # per second
+TENSION_RADIUS = 200  # distance for maximum tension
+PLAYER_SIZE = 20
+ENEMY_SIZE = 30
+FIXED_DT = 1.0 / 60.0
+# automatic spatial hashing needs this many player-enemy pairs and grid cells
+HASH_MIN_PAIRS = 50_000
+HASH_MIN_CELLS = 36
+
+
+def wander(rng, turn_every=1.0):
+    """Controller that walks each player in a random 8-way direction, changed every ``turn_every`` seconds."""
+    state = {"moves": None, "left": 0.0}
+
+    def control(world, dt):
+        if state["moves"] is None or state["left"] <= 0:
+            state["moves"] = rng.integers(-1, 2, size=world.players.shape).astype(float)
+            state["left"] = turn_every
+        state["left"] -= dt
+        return state["moves"]
+    return control
+
+
+class World:
+    """Players, enemies and the tension of each player.
+
+    Parameters
+    ----------
+    players : array_like
+        ``(M, 2)`` player centers.
+    enemies : array_like
+        ``(N, 2)`` enemy centers.
+    velocities : array_like, optional
+        ``(N, 2)`` enemy directions; defaults to the prototype's 45 degrees.
+    radius, decay, player_speed, enemy_speed : float, optional
+        Tuning constants, see the module constants of the same name.
+    spatial_hash : bool, optional
+        Find the nearest enemies through a :class:`SpatialHash` with cells
+        of side ``radius`` instead of checking every pair. By default it is
+        used for scenes with many players over an area many radii across,
+        where it pays for its upkeep.
+    """
+
+    def __init__(self, players=((WIDTH // 2, HEIGHT // 2),), enemies=((WIDTH // 4, HEIGHT // 4),),
+                 velocities=None, width=WIDTH, height=HEIGHT, radius=TENSION_RADIUS,
+                 decay=TENSION_DECAY, player_speed=PLAYER_SPEED, enemy_speed=BASE_ENEMY_SPEED,
+                 spatial_hash=None):
+        self.players = np.array(players, dtype=float).reshape(-1, 2)
+        # enemies are stored as (2, N) so each coordinate is contiguous
+        self._pos = np.array(enemies, dtype=float).reshape(-1, 2).T.copy()
+        if velocities is None:
+            velocities = np.tile([np.sqrt(0.5), np.sqrt(0.5)], (self._pos.shape[1], 1))
+        self._vel = np.array(velocities, dtype=float).reshape(-1, 2).T.copy()
+        self.width, self.height = width, height
+        self.radius = radius
+        self.decay = decay
+        self.player_speed = player_speed
+        self.enemy_speed = enemy_speed
+        self.tension = np.zeros(len(self.players))
+        self.time = 0.0
+        self._player_lo = np.full(2, PLAYER_SIZE / 2)
+        self._player_hi = np.array([width, height]) - PLAYER_SIZE / 2
+        self._enemy_lo = ENEMY_SIZE / 2
+        self._enemy_hi = (width - ENEMY_SIZE / 2, height - ENEMY_SIZE / 2)
+        n = self._pos.shape[1]
+        self._dist2 = np.empty(n)
+        self._tmp = np.empty(n)
+        self._out = np.empty(n, dtype=bool)
+        self._hit = np.empty(n, dtype=bool)
+        grid = SpatialHash(radius, width, height)
+        if spatial_hash is None:
+            spatial_hash = (len(self.players) * n >= HASH_MIN_PAIRS
+                            and grid.rows * grid.cols >= HASH_MIN_CELLS)
+        self.grid = grid if spatial_hash else None
+
+    @property
+    def enemies(self):
+        """``(N, 2)`` view of the enemy centers."""
+        return self._pos.T
+
+    @property
+    def velocities(self):
+        """``(N, 2)`` view of the enemy directions."""
+        return self._vel.T
+
+    @classmethod
+    def random(cls, enemies, players=1, seed=None, **kwargs):
+        """World with ``enemies`` at uniform positions and directions."""
+        rng = np.random.default_rng(seed)
+        width, height = kwargs.get("width", WIDTH), kwargs.get("height", HEIGHT)
+        size = np.array([width, height])
+        angle = rng.uniform(0, 2 * np.pi, enemies)
+        return cls(
+            players=rng.uniform(0.25, 0.75, (players, 2)) * size,
+            enemies=rng.uniform(0, 1, (enemies, 2)) * (size - ENEMY_SIZE) + ENEMY_SIZE / 2,
+            velocities=np.stack([np.cos(angle), np.sin(angle)], axis=1),
+            **kwargs,
+        )
+
+    def _nearest2(self, player):
+        """Squared distance from ``player`` to the nearest enemy."""
+        d2, tmp = self._dist2, self._tmp
+        np.subtract(self._pos[0], player[0], out=d2)
+        np.multiply(d2, d2, out=d2)
+        np.subtract(self._pos[1], player[1], out=tmp)
+        np.multiply(tmp, tmp, out=tmp)
+        d2 += tmp
+        return d2.min()
+
+    def proximity(self):
+        """Per player, ``1 - distance / radius`` to the nearest enemy, clamped to [0, 1]."""
+        if not self._pos.shape[1]:
+            return np.zeros(len(self.players))
+        if self.grid is not None:
+            self.grid.update(self.enemies)
+            nearest = np.sqrt(self.grid.nearest2(self.players))
+        else:
+            nearest = np.sqrt([self._nearest2(player) for player in self.players])
+        return np.maximum(1.0 - nearest / self.radius, 0.0)
+
+    def step(self, dt=FIXED_DT, moves=None):
+        """Advance by ``dt`` seconds; ``moves`` are ``(M, 2)`` directions in [-1, 1]."""
+        if moves is not None:
+            self.players += np.asarray(moves, dtype=float) * (self.player_speed * dt)
+            np.maximum(self.players, self._player_lo, out=self.players)
+            np.minimum(self.players, self._player_hi, out=self.players)
+
+        self.tension += (self.proximity() - self.decay) * dt
+        np.maximum(self.tension, 0.0, out=self.tension)
+        np.minimum(self.tension, 1.0, out=self.tension)
+
+        # enemies speed up with the highest tension in the scene and turn
+        # around when they leave the screen
+        speed = self.enemy_speed * (1.0 + self.tension.max(initial=0.0)) * dt
+        pos, vel, out, hit = self._pos, self._vel, self._out, self._hit
+        pos += vel * speed
+        out.fill(False)
+        for axis in (0, 1):
+            np.less(pos[axis], self._enemy_lo, out=hit)
+            out |= hit
+            np.greater(pos[axis], self._enemy_hi[axis], out=hit)
+            out |= hit
+        if out.any():
+            vel[:, out] *= -1
+            for axis in (0, 1):
+                np.clip(pos[axis], self._enemy_lo, self._enemy_hi[axis], out=pos[axis])
+        self.time += dt
+
+    def run(self, seconds, dt=FIXED_DT, controller=None):
+        """Step for ``seconds`` of game time at the fixed timestep ``dt``.
+
+        ``controller(world, dt)`` returns the player moves of each step.
+        Returns the ``steps``, the mean tension after each step as
+        ``tension``, its overall mean and the fraction of steps above 0.7.
+        """
+        steps = int(round(seconds / dt))
+        history = np.empty(steps)
+        players = len(self.players)
+        for i in range(steps):
+            self.step(dt, None if controller is None else controller(self, dt))
+            history[i] = self.tension.sum() / players
+        return {
+            "steps": steps,
+            "tension": history,
+            "mean_tension": float(history.mean()) if steps else 0.0,
+            "high_tension_fraction": float(np.mean(history > 0.7)) if steps else 0.0,
+        }
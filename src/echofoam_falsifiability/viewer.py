@@ -0,0 +1,208 @@
+"""Blitted live display shared by the ``create_animation`` functions.
+
+Fields are reduced to at most ``max_pixels`` per side before they reach
+``imshow``, color limits are fitted once and only widened when the data
+leaves them, and scalar histories live in a preallocated
+:class:`RingBuffer`. Every artist is animated, so a frame redraws the
+panels only::
+
+    viewer = Viewer(fig, drop_frames=True)
+    tau_panel = viewer.image(ax, state.tau, cmap="plasma")
+
+    def advance(frame):
+        step(state, frame)
+
+    def draw(frame):
+        tau_panel.set_data(state.tau)
+        return viewer.artists
+
+    anim = viewer.animate(advance, draw, steps)
+
+With ``drop_frames`` the solver keeps stepping for a whole display frame
+before the latest state is drawn, so a fast solver skips frames instead of
+waiting for the GUI. Leave it off when every step must be rendered, as
+when saving a movie.
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+def downsample(field, max_pixels=512, method="mean"):
+    """Reduce ``field`` to at most ``max_pixels`` per side.
+
+    ``method`` is ``"mean"`` (block average, trailing partial blocks are
+    dropped) or ``"stride"`` (every k-th sample). A field that already fits
+    is returned as is.
+    """
+    rows, cols = field.shape
+    k = math.ceil(max(rows, cols) / max_pixels)
+    if k <= 1:
+        return field
+    if method == "stride":
+        return field[::k, ::k]
+    if method != "mean":
+        raise ValueError(f"unknown downsampling method {method!r}")
+    h, w = rows // k, cols // k
+    return field[:h * k, :w * k].reshape(h, k, w, k).mean(axis=(1, 3))
+
+
+class RingBuffer:
+    """Fixed-capacity history of scalars without per-append allocation.
+
+    Every value is written twice, ``capacity`` apart, so the last
+    ``len(self)`` values are always one contiguous slice.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = capacity
+        self._values = np.zeros(2 * capacity, dtype=dtype)
+        self._steps = np.zeros(2 * capacity, dtype=np.int64)
+        self.count = 0
+
+    def append(self, value):
+        i = self.count % self.capacity
+        self._values[i] = self._values[i + self.capacity] = value
+        self._steps[i] = self._steps[i + self.capacity] = self.count
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _window(self):
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        return slice(start, start + len(self))
+
+    def values(self):
+        """View of the kept values, oldest first."""
+        return self._values[self._window()]
+
+    def steps(self):
+        """Index of each kept value in the full history."""
+        return self._steps[self._window()]
+
+
+class FieldPanel:
+    """An ``imshow`` of a downsampled field with cached color limits."""
+
+    def __init__(self, ax, field, max_pixels=512, method="mean", vmin=None, vmax=None,
+                 **imshow_kwargs):
+        self.max_pixels = max_pixels
+        self.method = method
+        self._fixed = vmin is not None and vmax is not None
+        rows, cols = field.shape
+        if imshow_kwargs.get("origin") == "lower":
+            extent = (-0.5, cols - 0.5, -0.5, rows - 0.5)
+        else:
+            extent = (-0.5, cols - 0.5, rows - 0.5, -0.5)
+        image = downsample(field, max_pixels, method)
+        self.vmin, self.vmax = vmin, vmax
+        self._fit(image)
+        self.image = ax.imshow(image, vmin=self.vmin, vmax=self.vmax, extent=extent,
+                               animated=True, **imshow_kwargs)
+
+    def _fit(self, image):
+        """Widen the color limits to cover ``image``; True if they changed."""
+        if self._fixed:
+            return False
+        lo, hi = float(np.min(image)), float(np.max(image))
+        vmin = lo if self.vmin is None else min(self.vmin, lo)
+        vmax = hi if self.vmax is None else max(self.vmax, hi)
+        if vmin == vmax:
+            return False
+        changed = (vmin, vmax) != (self.vmin, self.vmax)
+        self.vmin, self.vmax = vmin, vmax
+        return changed
+
+    def set_data(self, field):
+        image = downsample(field, self.max_pixels, self.method)
+        if self._fit(image):
+            self.image.set_clim(self.vmin, self.vmax)
+        self.image.set_data(image)
+        return self.image
+
+
+class TracePanel:
+    """A line plot of the last ``capacity`` scalars, thinned to ``max_points``."""
+
+    def __init__(self, ax, capacity, max_points=1024, **plot_kwargs):
+        self.history = RingBuffer(capacity)
+        self.max_points = max_points
+        self.line, = ax.plot([], [], animated=True, **plot_kwargs)
+
+    def append(self, value):
+        self.history.append(value)
+
+    def draw(self):
+        stride = max(1, math.ceil(len(self.history) / self.max_points))
+        self.line.set_data(self.history.steps()[::stride], self.history.values()[::stride])
+        return self.line
+
+
+class Viewer:
+    """Panels of one figure, redrawn together by blitting.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+    max_pixels : int, optional
+        Display resolution per side of every image panel.
+    method : {"mean", "stride"}, optional
+        How fields are downsampled, see :func:`downsample`.
+    fps : float, optional
+        Target display rate.
+    drop_frames : bool, optional
+        Advance the solver for a whole display frame between draws.
+    """
+
+    def __init__(self, fig, max_pixels=512, method="mean", fps=20, drop_frames=False):
+        self.fig = fig
+        self.max_pixels = max_pixels
+        self.method = method
+        self.fps = fps
+        self.drop_frames = drop_frames
+        self.artists = ()
+
+    def image(self, ax, field, **kwargs):
+        kwargs.setdefault("max_pixels", self.max_pixels)
+        kwargs.setdefault("method", self.method)
+        panel = FieldPanel(ax, field, **kwargs)
+        self.artists += (panel.image,)
+        return panel
+
+    def trace(self, ax, capacity, **kwargs):
+        panel = TracePanel(ax, capacity, **kwargs)
+        self.artists += (panel.line,)
+        return panel
+
+    def frames(self, advance, steps, stop=None):
+        """Yield the frames to draw, calling ``advance(frame)`` for every step.
+
+        ``stop()`` returning True ends the run after the current step.
+        """
+        frame_time = 1.0 / self.fps
+        frame = 0
+        while frame < steps and not (stop and stop()):
+            deadline = time.perf_counter() + frame_time
+            while True:
+                advance(frame)
+                frame += 1
+                if (not self.drop_frames or frame >= steps or (stop and stop())
+                        or time.perf_counter() >= deadline):
+                    break
+            yield frame - 1
+
+    def animate(self, advance, draw, steps, stop=None):
+        """Return a blitted ``FuncAnimation`` stepping with ``advance`` and drawing with ``draw``.
+
+        ``draw(frame)`` updates the panels and returns the artists to blit;
+        it is also called once with ``None`` to draw the initial state.
+        """
+        from matplotlib.animation import FuncAnimation
+
+        interval = 1 if self.drop_frames else 1000.0 / self.fps
+        return FuncAnimation(self.fig, draw, frames=lambda: self.frames(advance, steps, stop),
+                             init_func=lambda: draw(None), interval=interval, blit=True,
+                             repeat=False, save_count=steps)
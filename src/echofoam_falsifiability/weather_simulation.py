@@ -1,29 +1,209 @@
+from dataclasses import dataclass, field
+from typing import List
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 
+from echofoam_falsifiability.rng import fill_normal, make_rng
+
+
+@dataclass
+class WeatherState:
+    tau: np.ndarray
+    psi: np.ndarray
+    chi: np.ndarray
+    grad_mag: np.ndarray
+    noise: np.ndarray
+    rng: np.random.Generator
+    chi_history: List[float] = field(default_factory=list)
+
+
+def init_state(size=50, seed=0, dtype=np.float64, noise_dtype=None):
+    """Create the fields of a weather run; noise is drawn at ``noise_dtype``."""
+    rng = make_rng(seed)
+    noise = np.empty((size, size), dtype=noise_dtype or dtype)
+    tau = fill_normal(rng, noise, 0.5).astype(dtype)
+    psi = np.zeros((size, size), dtype=dtype)
+    chi = np.zeros((size, size), dtype=dtype)
+    grad_x, grad_y = np.gradient(tau)
+    grad_mag = np.sqrt(grad_x**2 + grad_y**2)
+    return WeatherState(tau, psi, chi, grad_mag, noise, rng)
+
+
+def step(state, i):
+    """Advance ``state`` by step ``i`` in place."""
+    size = state.tau.shape[0]
+    state.tau += fill_normal(state.rng, state.noise, 0.05)
+    state.tau *= 0.99
+
+    if i == 50:
+        cx = cy = size // 2
+        state.tau[cx-2:cx+3, cy-2:cy+3] += 5.0
+
+    grad_x, grad_y = np.gradient(state.tau)
+    state.grad_mag = np.sqrt(grad_x**2 + grad_y**2)
+
+    _relax(state.psi, state.chi, state.grad_mag)
+    state.chi_history.append(float(np.mean(state.chi, dtype=np.float64)))
+
+
+def _relax(psi, chi, grad_mag):
+    """Update psi and chi in place from the tau gradient magnitude."""
+    psi += 0.1 * (1.0 / (1.0 + grad_mag) - psi)
+    np.clip(psi, 0.0, 1.0, out=psi)
+
+    stability = (psi > 0.6).astype(chi.dtype)
+    chi += 0.05 * stability
+    chi -= 0.05 * (grad_mag > 1.5)
+    np.clip(chi, 0.0, 1.0, out=chi)
+
+
+def _run_refined(state, steps, threshold, ratio, block, regrid_every):
+    """Step ``state`` on two levels, see ``amr.Hierarchy``; returns the refined fraction per step.
+
+    Blocks where the tau gradient exceeds ``threshold`` are refined every
+    ``regrid_every`` steps, and the blocks around the step-50 pulse just
+    before it is applied. Coarse noise has the spread of a mean of
+    ``ratio**2`` fine draws. The composite fields are stored back into
+    ``state`` at the end.
+    """
+    from echofoam_falsifiability.amr import Hierarchy, gradient_magnitude
+
+    names = ("tau", "psi", "chi", "grad_mag")
+    grid = Hierarchy({name: getattr(state, name) for name in names}, ratio, block)
+    coarse = grid.coarse
+    noise = np.empty(grid.coarse_shape, dtype=state.noise.dtype)
+    fine_noise = None
+    refined = []
+    n = grid.n // ratio
+    indicator = state.grad_mag.reshape(n, ratio, n, ratio).max(axis=(1, 3))
+    fine = {name: getattr(state, name) for name in names}
+    flags = grid.flag(indicator, threshold)
+    size = grid.n
+    cx = cy = size // 2
+    for i in range(steps):
+        if i == 50:
+            # refine around the pulse before it lands on the coarse cells
+            pulse = np.zeros(grid.coarse_shape)
+            pulse[(cx - 2) // ratio:(cx + 2) // ratio + 1, (cy - 2) // ratio:(cy + 2) // ratio + 1] = np.inf
+            flags = (grid.flags if fine is None else flags) | grid.flag(pulse, threshold)
+        elif fine is None and i % regrid_every == 0:
+            flags = grid.flag(coarse["grad_mag"], threshold, grid.interior("grad_mag"))
+        if grid.regrid(flags, fine) or fine_noise is None:
+            fine_noise = np.empty((grid.count, grid.size, grid.size), dtype=state.noise.dtype)
+        fine = None
+        refined.append(grid.refined_fraction)
+
+        coarse["tau"] += fill_normal(state.rng, noise, 0.05 / ratio)
+        coarse["tau"] *= 0.99
+        tau = grid.interior("tau")
+        tau += fill_normal(state.rng, fine_noise, 0.05)
+        tau *= 0.99
+        if i == 50:
+            grid.add("tau", slice(cx - 2, cx + 3), slice(cy - 2, cy + 3), 5.0)
+
+        grad_x, grad_y = np.gradient(coarse["tau"], float(ratio))
+        coarse["grad_mag"] = np.sqrt(grad_x**2 + grad_y**2)
+        grid.fill_halo("tau", "extrapolate")
+        grad_mag = grid.interior("grad_mag")
+        grad_mag[...] = gradient_magnitude(grid.patches["tau"])
+
+        _relax(coarse["psi"], coarse["chi"], coarse["grad_mag"])
+        _relax(grid.interior("psi"), grid.interior("chi"), grad_mag)
+        grid.restrict("tau", "psi", "chi")
+        state.chi_history.append(grid.mean("chi"))
+
+    grid.restrict("grad_mag")
+    for name in names:
+        setattr(state, name, grid.composite(name))
+    return refined
+
+
+def _save_checkpoint(checkpoint, state, i):
+    checkpoint.save(
+        i + 1,
+        {"tau": state.tau, "psi": state.psi, "chi": state.chi, "grad_mag": state.grad_mag,
+         "chi_history": np.asarray(state.chi_history, dtype=np.float64)},
+        {"rng": state.rng.bit_generator.state},
+    )
+
+
+def _restore_checkpoint(state, saved):
+    """Load a checkpoint into ``state``; returns the next step."""
+    arrays, meta = saved
+    state.tau, state.psi, state.chi = arrays["tau"], arrays["psi"], arrays["chi"]
+    state.grad_mag = arrays["grad_mag"]
+    state.chi_history = arrays["chi_history"].tolist()
+    state.rng.bit_generator.state = meta["rng"]
+    return meta["step"]
+
+
+def run(steps=200, size=50, seed=0, dtype=np.float64, noise_dtype=None, checkpoint=None,
+        resume=False, refine_threshold=None, refine_ratio=2, refine_block=5, regrid_every=5):
+    """Step the weather model without plotting; returns the chi history and fields.
+
+    ``checkpoint`` is a ``checkpoint.Checkpointer``; with ``resume`` the run
+    continues from its last checkpoint, if there is one.
+
+    ``refine_threshold`` switches to two-level mesh refinement: the grid is
+    stepped at ``refine_ratio`` times the spacing, with fine patches of
+    ``refine_block`` coarse cells per side where the tau gradient exceeds
+    the threshold, regridded every ``regrid_every`` steps (see
+    ``amr.Hierarchy``). ``size`` must then be a multiple of
+    ``refine_ratio * refine_block``, checkpoints are not supported, and the
+    result also holds the mean ``refined_fraction``.
+    """
+    state = init_state(size, seed, dtype, noise_dtype)
+    if refine_threshold is not None:
+        if checkpoint is not None:
+            raise ValueError("checkpoint is not supported with refine_threshold")
+        refined = _run_refined(state, steps, refine_threshold, refine_ratio, refine_block,
+                               regrid_every)
+        return {
+            "chi_history": list(state.chi_history),
+            "fields": {"tau": state.tau, "grad_mag": state.grad_mag, "psi": state.psi, "chi": state.chi},
+            "refined_fraction": float(np.mean(refined)) if refined else 0.0,
+        }
+    start = 0
+    if checkpoint is not None and resume:
+        saved = checkpoint.load()
+        if saved is not None:
+            start = _restore_checkpoint(state, saved)
+    try:
+        for i in range(start, steps):
+            step(state, i)
+            if checkpoint is not None and checkpoint.due(i):
+                _save_checkpoint(checkpoint, state, i)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    return {
+        "chi_history": list(state.chi_history),
+        "fields": {"tau": state.tau, "grad_mag": state.grad_mag, "psi": state.psi, "chi": state.chi},
+    }
+
+
+def create_animation(seed=0, dtype=np.float64, drop_frames=False, max_pixels=512):
+    """Build the live figure; ``drop_frames`` and ``max_pixels`` configure ``viewer.Viewer``."""
+    import matplotlib.pyplot as plt
+
+    from echofoam_falsifiability.viewer import Viewer
 
-def create_animation():
     size = 50
     steps = 200
-    np.random.seed(0)
-    tau = np.random.randn(size, size) * 0.5
-    psi = np.zeros((size, size))
-    chi = np.zeros((size, size))
+    state = init_state(size, seed, dtype)
 
     fig, axes = plt.subplots(2, 2, figsize=(8, 8))
-    im_tau = axes[0, 0].imshow(tau, cmap='coolwarm', vmin=-2, vmax=2)
+    viewer = Viewer(fig, max_pixels=max_pixels, drop_frames=drop_frames)
+    tau_panel = viewer.image(axes[0, 0], state.tau, cmap='coolwarm', vmin=-2, vmax=2)
     axes[0, 0].set_title('tau')
 
-    grad_x, grad_y = np.gradient(tau)
-    grad_mag = np.sqrt(grad_x**2 + grad_y**2)
-    im_grad = axes[0, 1].imshow(grad_mag, cmap='viridis')
+    grad_panel = viewer.image(axes[0, 1], state.grad_mag, cmap='viridis')
     axes[0, 1].set_title('∇tau')
 
-    im_psi = axes[1, 0].imshow(psi, cmap='plasma', vmin=0, vmax=1)
+    psi_panel = viewer.image(axes[1, 0], state.psi, cmap='plasma', vmin=0, vmax=1)
     axes[1, 0].set_title('psi')
 
-    im_chi = axes[1, 1].imshow(chi, cmap='inferno', vmin=0, vmax=1)
+    chi_panel = viewer.image(axes[1, 1], state.chi, cmap='inferno', vmin=0, vmax=1)
     axes[1, 1].set_title('chi')
 
     for ax_row in axes:
@@ -31,41 +211,22 @@ def create_animation():
             ax.set_xticks([])
             ax.set_yticks([])
 
-    def update(step):
-        nonlocal tau, psi, chi, grad_x, grad_y, grad_mag
-        tau += 0.05 * np.random.randn(size, size)
-        tau *= 0.99
-
-        if step == 50:
-            pulse = np.zeros_like(tau)
-            cx = cy = size // 2
-            pulse[cx-2:cx+3, cy-2:cy+3] = 5.0
-            tau += pulse
-
-        grad_x, grad_y = np.gradient(tau)
-        grad_mag = np.sqrt(grad_x**2 + grad_y**2)
+    def draw(i):
+        tau_panel.set_data(state.tau)
+        grad_panel.set_data(state.grad_mag)
+        psi_panel.set_data(state.psi)
+        chi_panel.set_data(state.chi)
+        return viewer.artists
 
-        psi += 0.1 * (1.0 / (1.0 + grad_mag) - psi)
-        psi = np.clip(psi, 0.0, 1.0)
-
-        stability = (psi > 0.6).astype(float)
-        chi += 0.05 * stability
-        chi -= 0.05 * (grad_mag > 1.5)
-        chi = np.clip(chi, 0.0, 1.0)
-
-        im_tau.set_data(tau)
-        im_grad.set_data(grad_mag)
-        im_psi.set_data(psi)
-        im_chi.set_data(chi)
-        return im_tau, im_grad, im_psi, im_chi
-
-    anim = FuncAnimation(fig, update, frames=steps, interval=50, blit=False)
+    anim = viewer.animate(lambda i: step(state, i), draw, steps)
     plt.tight_layout()
     return fig, anim
 
 
 def main():
-    fig, _ = create_animation()
+    import matplotlib.pyplot as plt
+
+    fig, _ = create_animation(drop_frames=True)
     plt.show()
 
 
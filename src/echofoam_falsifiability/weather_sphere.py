@@ -1,6 +1,313 @@
+import multiprocessing as mp
+import os
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
+
+from echofoam_falsifiability.profiling import NULL_PROFILER
+from echofoam_falsifiability.rng import fill_normal, spawn_rngs
+from echofoam_falsifiability.spherical_stencil import BACKENDS, ShellGrid, ShellStencil
+
+
+class ShellView:
+    """Persistent 3D view of one radial layer of the tau field.
+
+    The Cartesian geometry of the layer is computed once and drawn as a
+    single ``Poly3DCollection``; :meth:`update` only recolors its faces.
+    """
+
+    def __init__(self, grid, layer, ax=None):
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d import Axes3D  # noqa: F401
+
+        theta, phi = grid.theta, grid.phi
+        R = grid.radius_field()[layer]
+        if grid.periodic:
+            # repeat the first column so the surface closes at phi = 2*pi
+            phi = np.append(phi, 2 * np.pi)
+            R = np.concatenate([R, R[:, :1]], axis=1)
+        Theta, Phi = np.meshgrid(theta, phi, indexing="ij")
+        X = R * np.sin(Theta) * np.cos(Phi)
+        Y = R * np.sin(Theta) * np.sin(Phi)
+        Z = R * np.cos(Theta)
+
+        self.cmap = plt.cm.coolwarm
+        self.layer = layer
+        self.periodic = grid.periodic
+        if ax is None:
+            fig = plt.figure()
+            ax = fig.add_subplot(111, projection="3d")
+        self.ax = ax
+        self.fig = ax.figure
+        self.surface = ax.plot_surface(
+            X,
+            Y,
+            Z,
+            color="white",
+            rstride=1,
+            cstride=1,
+            linewidth=0,
+            antialiased=False,
+            shade=False,
+        )
+
+    def update(self, tau, title=None):
+        """Color the faces from ``tau[layer]`` and redraw."""
+        layer_tau = tau[self.layer]
+        norm = (layer_tau - layer_tau.min()) / (np.ptp(layer_tau) + 1e-6)
+        # each face takes the color of its first corner, as plot_surface does
+        faces = norm if self.periodic else norm[:, :-1]
+        colors = self.cmap(faces[:-1].ravel())
+        self.surface.set_facecolor(colors)
+        if title is not None:
+            self.ax.set_title(title)
+        self.fig.canvas.draw_idle()
+
+
+class SnapshotStore:
+    """On-disk ``.npy`` store of field snapshots taken every few steps.
+
+    Each field is written to ``<path>/<name>.npy`` with shape
+    ``(count, *grid_shape)`` and ``steps.npy`` records the step of each
+    snapshot. Read the store back with :func:`load_snapshots`. With
+    ``resume`` an existing store is reopened and its first ``resume``
+    snapshots are kept.
+    """
+
+    def __init__(self, path, shape, count, fields=("tau",), dtype=np.float32, resume=0):
+        os.makedirs(path, exist_ok=True)
+        steps_path = os.path.join(path, "steps.npy")
+        reopen = bool(resume) and os.path.exists(steps_path)
+        mode = "r+" if reopen else "w+"
+        self.path = path
+        self.count = count
+        self.arrays = {
+            name: np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"), mode=mode, dtype=dtype, shape=(count,) + tuple(shape)
+            )
+            for name in fields
+        }
+        self.steps = np.lib.format.open_memmap(steps_path, mode=mode, dtype=np.int64, shape=(count,))
+        self.written = resume if reopen else 0
+        self.steps[self.written:] = -1
+
+    def write(self, step, **fields):
+        for name, array in self.arrays.items():
+            array[self.written] = fields[name]
+        self.steps[self.written] = step
+        self.written += 1
+
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.steps.flush()
+
+
+def load_snapshots(path):
+    """Return ``{name: array}`` for every field in a snapshot store."""
+    steps = np.load(os.path.join(path, "steps.npy"), mmap_mode="r")
+    written = int(np.count_nonzero(steps >= 0))
+    out = {"steps": steps[:written]}
+    for name in os.listdir(path):
+        if name.endswith(".npy") and name != "steps.npy":
+            out[name[:-4]] = np.load(os.path.join(path, name), mmap_mode="r")[:written]
+    return out
+
+
+def _step(stencil, tau_ext, psi, chi, grad_mag, work, prof=NULL_PROFILER):
+    """Advance psi and chi from the freshly forced tau (halos filled)."""
+    with prof.phase("gradient"):
+        stencil.gradient_magnitude(tau_ext, out=grad_mag)
+
+    with prof.phase("update"):
+        # psi += 0.05 * (1 / (1 + |grad tau|) - psi)
+        np.add(grad_mag, 1.0, out=work)
+        np.reciprocal(work, out=work)
+        work -= psi
+        work *= 0.05
+        psi += work
+        np.clip(psi, 0.0, 1.0, out=psi)
+
+        # chi += 0.05 * (psi - chi) - 0.02 * |grad tau|
+        np.subtract(psi, chi, out=work)
+        work *= 0.05
+        chi += work
+        np.multiply(grad_mag, 0.02, out=work)
+        chi -= work
+        np.clip(chi, 0.0, 1.0, out=chi)
+
+
+class _ColumnNoise:
+    """Independent normal streams per phi column.
+
+    Each column draws from its own child of ``SeedSequence(seed)``, so the
+    forcing of a column does not depend on how the columns are split
+    between workers.
+    """
+
+    def __init__(self, seed, grid_phi, columns):
+        rngs = spawn_rngs(seed, grid_phi)
+        self.rngs = [rngs[k] for k in columns]
+
+    def fill(self, out, column, scale=1.0):
+        for k, rng in enumerate(self.rngs):
+            out[..., k] = fill_normal(rng, column, scale)
+
+
+def _slab_bounds(n, workers):
+    bounds = np.linspace(0, n, workers + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _slab_worker(grid_args, lo, hi, names, barrier, steps, seed, snapshot_every, snapshot_dir,
+                 snapshot_fields, dtype, noise_dtype):
+    """Process entry point stepping the phi columns ``lo:hi``."""
+    grid = ShellGrid(*grid_args)
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    fields = [np.ndarray(grid.shape, dtype=dtype, buffer=shm.buf) for shm in blocks]
+    try:
+        _step_slab(grid, lo, hi, fields, barrier, steps, seed, snapshot_every, snapshot_dir,
+                   snapshot_fields, noise_dtype)
+    except BaseException:
+        # release the other slabs waiting at the barrier
+        barrier.abort()
+        raise
+    del fields
+    for shm in blocks:
+        shm.close()
+
+
+def _step_slab(grid, lo, hi, fields, barrier, steps, seed, snapshot_every, snapshot_dir,
+               snapshot_fields, noise_dtype):
+    n = grid.shape[2]
+    tau_g = fields[0]
+    dtype = tau_g.dtype
+    tau, psi, chi = (field[..., lo:hi] for field in fields)
+    stencil = ShellStencil(grid, phi_slice=slice(lo, hi), dtype=dtype)
+    ext = stencil.new_field()
+    noise = np.empty(stencil.shape, dtype=noise_dtype)
+    grad_mag = np.empty(stencil.shape, dtype=dtype)
+    work = np.empty(stencil.shape, dtype=dtype)
+    column = np.empty(grid.shape[:2], dtype=noise_dtype)
+    forcing = _ColumnNoise(seed, n, range(lo, hi))
+
+    store = None
+    if snapshot_every:
+        store = {
+            name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r+")
+            for name in snapshot_fields
+        }
+
+    forcing.fill(tau, column, 0.1)
+    for i in range(steps):
+        forcing.fill(noise, column, 0.05)
+        tau += noise
+        tau *= 0.99
+
+        # halo exchange: the neighbours' edge columns are final once every
+        # slab passes the first barrier, and no slab forces tau again until
+        # every slab has read its halos at the second
+        barrier.wait()
+        ext[..., 1:-1] = tau
+        if grid.periodic or lo > 0:
+            ext[..., 0] = tau_g[..., (lo - 1) % n]
+        if grid.periodic or hi < n:
+            ext[..., -1] = tau_g[..., hi % n]
+        barrier.wait()
+        if not grid.periodic and lo == 0:
+            np.subtract(2 * ext[..., 1], ext[..., 2], out=ext[..., 0])
+        if not grid.periodic and hi == n:
+            np.subtract(2 * ext[..., -2], ext[..., -3], out=ext[..., -1])
+
+        _step(stencil, ext, psi, chi, grad_mag, work)
+
+        if store is not None and i % snapshot_every == 0:
+            current = {"tau": tau, "psi": psi, "chi": chi}
+            for name, array in store.items():
+                array[i // snapshot_every, ..., lo:hi] = current[name]
+    if store is not None:
+        for array in store.values():
+            array.flush()
+
+
+def _final_view(grid, tau, save_path, view=None, show=False):
+    if save_path is None and not show:
+        return
+    import matplotlib.pyplot as plt
+
+    if view is None:
+        view = ShellView(grid, grid.shape[0] // 2)
+    view.update(tau, "Tau field shell slice")
+    view.fig.tight_layout()
+    if save_path is not None:
+        view.fig.savefig(save_path)
+    if show:
+        plt.show(block=False)
+        plt.pause(0.1)
+    plt.close(view.fig)
+
+
+def _join_slabs(procs, barrier):
+    """Wait for the slab processes, stopping them all once one fails.
+
+    A worker killed outside Python never reaches its own ``barrier.abort``,
+    so the others would wait at the barrier forever.
+    """
+    running = {proc.sentinel: proc for proc in procs}
+    while running:
+        for sentinel in wait(list(running)):
+            proc = running.pop(sentinel)
+            proc.join()
+            if proc.exitcode != 0:
+                barrier.abort()
+                for other in running.values():
+                    other.terminate()
+                    other.join()
+                return
+
+
+def _run_decomposed(grid_args, workers, steps, seed, snapshot_every, snapshot_dir,
+                    snapshot_fields, dtype, noise_dtype):
+    grid = ShellGrid(*grid_args)
+    shape = grid.shape
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    blocks = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(3)]
+    try:
+        # fresh shared memory is zero filled, which is the initial psi and chi
+        fields = [np.ndarray(shape, dtype=dtype, buffer=shm.buf) for shm in blocks]
+
+        slabs = _slab_bounds(shape[2], min(workers, shape[2]))
+        ctx = mp.get_context()
+        barrier = ctx.Barrier(len(slabs))
+        names = [shm.name for shm in blocks]
+        procs = [
+            ctx.Process(
+                target=_slab_worker,
+                args=(grid_args, lo, hi, names, barrier, steps, seed, snapshot_every,
+                      snapshot_dir, snapshot_fields, dtype.str, noise_dtype.str),
+            )
+            for lo, hi in slabs
+        ]
+        try:
+            for proc in procs:
+                proc.start()
+            _join_slabs(procs, barrier)
+        finally:
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join()
+        failed = [proc.exitcode for proc in procs if proc.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"{len(failed)} weather_sphere worker(s) failed")
+        result = tuple(np.array(field) for field in fields)
+        del fields
+        return result
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
 
 
 def run(
@@ -13,6 +320,22 @@ def run(
     grid_theta=32,
     grid_phi=64,
     show=False,
+    backend="numpy",
+    threads=None,
+    render_every=10,
+    snapshot_every=None,
+    snapshot_dir="weather_sphere_snapshots",
+    snapshot_fields=("tau",),
+    save_path="weather_sphere.png",
+    workers=None,
+    seed=None,
+    dtype=np.float64,
+    noise_dtype=None,
+    profiler=None,
+    chi_history=None,
+    checkpoint=None,
+    resume=False,
+    cached=False,
 ):
     """Run a simple 3D spherical weather simulation.
 
@@ -23,7 +346,7 @@ def run(
     theta_extent : float
         Polar angle extent in radians.
     phi_extent : float
-        Azimuthal angle extent in radians.
+        Azimuthal angle extent in radians. A full circle is periodic in phi.
     bump : float
         Amplitude of terrain bumpiness.
     steps : int
@@ -35,97 +358,154 @@ def run(
     grid_phi : int
         Number of azimuthal samples.
     show : bool, optional
-        If True, display a live matplotlib plot updating every ten steps.
+        If True, display a live matplotlib plot of the middle shell.
+    backend : {"numpy", "threads", "numba"}, optional
+        Gradient stencil implementation, see ``spherical_stencil.ShellStencil``.
+    threads : int, optional
+        Worker threads for the ``"threads"`` backend.
+    render_every : int, optional
+        Steps between redraws of the live plot when ``show`` is True.
+    snapshot_every : int, optional
+        If given, store ``snapshot_fields`` every this many steps in a
+        :class:`SnapshotStore` at ``snapshot_dir``. No figure is needed.
+    snapshot_dir : str, optional
+        Directory of the snapshot store.
+    snapshot_fields : tuple of str, optional
+        Fields to store, any of ``"tau"``, ``"psi"`` and ``"chi"``.
+    save_path : str or None, optional
+        Where to save the final shell image; ``None`` skips it.
+    workers : int, optional
+        Split the phi columns into this many slabs, each stepped by its own
+        process on fields held in shared memory. Not compatible with
+        ``show``.
+    seed : int or numpy.random.SeedSequence, optional
+        Seed of the per-column forcing streams. Runs with the same seed give
+        the same fields with or without ``workers``.
+    dtype : numpy dtype, optional
+        Precision of the fields, float64 or float32.
+    noise_dtype : numpy dtype, optional
+        Precision of the forcing draws, defaults to ``dtype``.
+    profiler : profiling.Profiler, optional
+        Times the noise, halo, gradient, update, snapshot and render phases
+        of each step. With ``workers`` the slab loop is timed as a single
+        ``"decomposed"`` phase.
+    chi_history : list, optional
+        Receives the float64 mean of chi after every step of this call. Not
+        compatible with ``workers``.
+    checkpoint : checkpoint.Checkpointer, optional
+        Saves the fields and forcing stream states periodically. Not
+        compatible with ``workers``.
+    resume : bool, optional
+        Continue from the last checkpoint of ``checkpoint``, if there is one.
+    cached : bool or result_cache.ResultCache, optional
+        Load a seeded run from the result cache if it has been run before,
+        skipping the snapshots and the final image.
+
+    Returns
+    -------
+    tau, psi, chi : ndarray
+        Final fields on the ``(r, theta, phi)`` grid.
     """
-    r = np.linspace(0.05, 0.2, grid_r)
-    theta = np.linspace(0.0, theta_extent, grid_theta)
-    phi = np.linspace(0.0, phi_extent, grid_phi)
+    if cached:
+        from echofoam_falsifiability.result_cache import cached_call
+
+        return cached_call("weather_sphere", run, locals(), cached)
+    prof = profiler or NULL_PROFILER
+    grid_args = (radius, theta_extent, phi_extent, bump, grid_r, grid_theta, grid_phi)
+    grid = ShellGrid(*grid_args)
+    shape = grid.shape
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    dtype = np.dtype(dtype)
+    noise_dtype = np.dtype(noise_dtype or dtype)
+
+    if workers and checkpoint is not None:
+        raise ValueError("checkpoint is not supported with workers")
+    if workers and chi_history is not None:
+        raise ValueError("chi_history is not supported with workers")
+    saved = checkpoint.load() if checkpoint is not None and resume else None
+    start = saved[1]["step"] if saved is not None else 0
 
-    R, Theta, Phi = np.meshgrid(r, theta, phi, indexing="ij")
-    terrain = radius + bump * np.sin(4 * Theta) * np.sin(4 * Phi)
-    Rabs = terrain + R
+    store = None
+    if snapshot_every:
+        count = (steps + snapshot_every - 1) // snapshot_every
+        store = SnapshotStore(snapshot_dir, shape, count, snapshot_fields,
+                              resume=(start + snapshot_every - 1) // snapshot_every)
 
-    shape = R.shape
-    tau = np.random.randn(*shape) * 0.1
-    psi = np.zeros(shape)
-    chi = np.zeros(shape)
+    if workers:
+        if show:
+            raise ValueError("show is not supported with workers; use snapshot_every")
+        if store is not None:
+            store.steps[:] = np.arange(0, steps, snapshot_every)
+            store.written = count
+            store.close()
+            store = None
+        with prof.phase("decomposed"):
+            tau, psi, chi = _run_decomposed(grid_args, workers, steps, seed, snapshot_every,
+                                            snapshot_dir, snapshot_fields, dtype, noise_dtype)
+        with prof.phase("render"):
+            _final_view(grid, tau, save_path)
+        return tau, psi, chi
 
-    fig = None
-    ax = None
+    stencil = ShellStencil(grid, backend=backend, threads=threads, dtype=dtype)
+    tau_ext = stencil.new_field()
+    tau = tau_ext[..., 1:-1]
+    psi = np.zeros(shape, dtype=dtype)
+    chi = np.zeros(shape, dtype=dtype)
+    grad_mag = np.empty(shape, dtype=dtype)
+    work = np.empty(shape, dtype=dtype)
+    noise = np.empty(shape, dtype=noise_dtype)
+    column = np.empty(shape[:2], dtype=noise_dtype)
+    forcing = _ColumnNoise(seed, shape[2], range(shape[2]))
+    forcing.fill(tau, column, 0.1)
+    if saved is not None:
+        arrays, meta = saved
+        tau[...], psi[...], chi[...] = arrays["tau"], arrays["psi"], arrays["chi"]
+        for rng, state in zip(forcing.rngs, meta["rng"]):
+            rng.bit_generator.state = state
+
+    view = None
     if show:
+        import matplotlib.pyplot as plt
+
         plt.ion()
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection="3d")
+        view = ShellView(grid, shape[0] // 2)
 
-    for i in range(steps):
-        tau += 0.05 * np.random.randn(*shape)
-        tau *= 0.99
+    try:
+        for i in range(start, steps):
+            with prof.phase("noise"):
+                forcing.fill(noise, column, 0.05)
+                tau += noise
+                tau *= 0.99
 
-        grad_r, grad_t, grad_p = np.gradient(tau)
-        grad_mag = np.sqrt(grad_r ** 2 + grad_t ** 2 + grad_p ** 2)
-
-        psi += 0.05 * (1.0 / (1.0 + grad_mag) - psi)
-        psi = np.clip(psi, 0.0, 1.0)
-
-        chi += 0.05 * (psi - chi) - 0.02 * grad_mag
-        chi = np.clip(chi, 0.0, 1.0)
-
-        if show and i % 10 == 0:
-            mid = shape[0] // 2
-            layer_tau = tau[mid]
-            layer_R = Rabs[mid]
-
-            X = layer_R * np.sin(Theta[mid]) * np.cos(Phi[mid])
-            Y = layer_R * np.sin(Theta[mid]) * np.sin(Phi[mid])
-            Z = layer_R * np.cos(Theta[mid])
-
-            ax.clear()
-            norm = (layer_tau - layer_tau.min()) / (layer_tau.ptp() + 1e-6)
-            ax.plot_surface(
-                X,
-                Y,
-                Z,
-                facecolors=plt.cm.coolwarm(norm),
-                rstride=1,
-                cstride=1,
-                linewidth=0,
-                antialiased=False,
-                shade=False,
-            )
-            ax.set_title(f"Tau field shell slice step {i}")
-            plt.draw()
-            plt.pause(0.001)
-
-    mid = shape[0] // 2
-    layer_tau = tau[mid]
-    layer_R = Rabs[mid]
-
-    X = layer_R * np.sin(Theta[mid]) * np.cos(Phi[mid])
-    Y = layer_R * np.sin(Theta[mid]) * np.sin(Phi[mid])
-    Z = layer_R * np.cos(Theta[mid])
-
-    if fig is None:
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection="3d")
-    norm = (layer_tau - layer_tau.min()) / (layer_tau.ptp() + 1e-6)
-    ax.plot_surface(
-        X,
-        Y,
-        Z,
-        facecolors=plt.cm.coolwarm(norm),
-        rstride=1,
-        cstride=1,
-        linewidth=0,
-        antialiased=False,
-        shade=False,
-    )
-    ax.set_title("Tau field shell slice")
-    plt.tight_layout()
-    plt.savefig("weather_sphere.png")
-    if show:
-        plt.show(block=False)
-        plt.pause(0.1)
-    plt.close(fig)
+            with prof.phase("halo"):
+                stencil.fill_halo(tau_ext)
+            _step(stencil, tau_ext, psi, chi, grad_mag, work, prof)
+            if chi_history is not None:
+                chi_history.append(float(np.mean(chi, dtype=np.float64)))
+
+            if store is not None and i % snapshot_every == 0:
+                with prof.phase("snapshot"):
+                    store.write(i, tau=tau, psi=psi, chi=chi)
+            if view is not None and i % render_every == 0:
+                with prof.phase("render"):
+                    view.update(tau, f"Tau field shell slice step {i}")
+                    plt.pause(0.001)
+            if checkpoint is not None and checkpoint.due(i):
+                if store is not None:
+                    store.close()
+                checkpoint.save(i + 1, {"tau": tau, "psi": psi, "chi": chi},
+                                {"rng": [rng.bit_generator.state for rng in forcing.rngs]})
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if store is not None:
+        store.close()
+
+    with prof.phase("render"):
+        _final_view(grid, tau, save_path, view, show)
+    return tau.copy(), psi, chi
 
 
 if __name__ == "__main__":
@@ -149,11 +529,49 @@ if __name__ == "__main__":
         "--bump", type=float, default=0.05, help="Terrain bump amplitude"
     )
     parser.add_argument("--steps", type=int, default=100, help="Simulation steps")
+    parser.add_argument("--grid-r", type=int, default=10, help="Radial grid points")
+    parser.add_argument("--grid-theta", type=int, default=32, help="Polar grid points")
+    parser.add_argument("--grid-phi", type=int, default=64, help="Azimuthal grid points")
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default="numpy", help="Gradient stencil backend"
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="Threads for the threads backend"
+    )
     parser.add_argument(
         "--show",
         action="store_true",
         help="Display real-time visualization",
     )
+    parser.add_argument(
+        "--render-every", type=int, default=10, help="Steps between live redraws"
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=None,
+        help="Store the fields every N steps without plotting",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default="weather_sphere_snapshots",
+        help="Directory of the snapshot store",
+    )
+    parser.add_argument(
+        "--no-image", action="store_true", help="Skip the final weather_sphere.png"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, each stepping a slab of phi columns",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed of the forcing streams"
+    )
+    parser.add_argument(
+        "--dtype", choices=("float64", "float32"), default="float64", help="Field precision"
+    )
     args = parser.parse_args()
 
     run(
@@ -162,5 +580,17 @@ if __name__ == "__main__":
         phi_extent=args.phi,
         bump=args.bump,
         steps=args.steps,
+        grid_r=args.grid_r,
+        grid_theta=args.grid_theta,
+        grid_phi=args.grid_phi,
         show=args.show,
+        backend=args.backend,
+        threads=args.threads,
+        render_every=args.render_every,
+        snapshot_every=args.snapshot_every,
+        snapshot_dir=args.snapshot_dir,
+        save_path=None if args.no_image else "weather_sphere.png",
+        workers=args.workers,
+        seed=args.seed,
+        dtype=args.dtype,
     )
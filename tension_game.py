@@ -5,90 +5,174 @@ This script implements a minimal game loop in Pygame where the player's
 the enemy and darkens the screen. This is a small prototype demonstrating
 how game logic can react to a tension metric.
 
+The game state lives in ``echofoam_falsifiability.tension_world.World``
+and advances at a fixed timestep. ``--headless`` runs it without a window
+(SDL dummy driver, no drawing) as fast as possible, e.g. to balance the
+tension constants over hours of simulated play::
+
+    python tension_game.py --headless --enemies 2000 --seconds 3600
+
 Controls:
 - Arrow keys/WASD: Move the player
 - ESC or close the window: Quit
 """
 
-import math
+import argparse
+import os
 import sys
+import time
+
+import numpy as np
 import pygame
 from pygame.locals import QUIT, KEYDOWN, K_ESCAPE
 
-WIDTH, HEIGHT = 800, 600
-PLAYER_SPEED = 200  # pixels per second
-BASE_ENEMY_SPEED = 50
-TENSION_DECAY = 0.1  # per second
-TENSION_RADIUS = 200  # distance for maximum tension
+# the tuning constants (PLAYER_SPEED, BASE_ENEMY_SPEED, TENSION_DECAY,
+# TENSION_RADIUS) live with the game state
+from echofoam_falsifiability.tension_world import (  # noqa: F401
+    BASE_ENEMY_SPEED, ENEMY_SIZE, FIXED_DT, HEIGHT, PLAYER_SIZE, PLAYER_SPEED, TENSION_DECAY,
+    TENSION_RADIUS, WIDTH, World, wander,
+)
 
+# longest frame time fed to the fixed-timestep accumulator
+MAX_FRAME_TIME = 0.25
+BACKGROUND = (30, 30, 30)
+# tension at which the background is fully dark, and the number of cached
+# darkness levels between
+DARK_TENSION = 0.3
+DARK_LEVELS = 16
 
-def clamp(value, lo, hi):
-    return max(lo, min(value, hi))
 
+def _pixel(pos):
+    return int(round(pos[0])), int(round(pos[1]))
 
-class Player(pygame.sprite.Sprite):
-    def __init__(self, pos):
+
+class Block(pygame.sprite.DirtySprite):
+    """Filled square that is redrawn only after it moved."""
+
+    def __init__(self, pos, size, color):
         super().__init__()
-        self.image = pygame.Surface((20, 20))
-        self.image.fill((0, 255, 0))
+        self.image = pygame.Surface((size, size))
+        self.image.fill(color)
         self.rect = self.image.get_rect(center=pos)
 
-    def update(self, dt, keys):
-        dx = (keys[pygame.K_d] - keys[pygame.K_a]) * PLAYER_SPEED * dt
-        dy = (keys[pygame.K_s] - keys[pygame.K_w]) * PLAYER_SPEED * dt
-        self.rect.x += int(dx)
-        self.rect.y += int(dy)
-        self.rect.clamp_ip(pygame.Rect(0, 0, WIDTH, HEIGHT))
+    def move_to(self, pos):
+        if self.rect.center != pos:
+            self.rect.center = pos
+            self.dirty = 1
+
+
+class Player(Block):
+    def __init__(self, pos):
+        super().__init__(pos, PLAYER_SIZE, (0, 255, 0))
 
 
-class Enemy(pygame.sprite.Sprite):
+class Enemy(Block):
     def __init__(self, pos):
+        super().__init__(pos, ENEMY_SIZE, (255, 0, 0))
+
+
+class Label(pygame.sprite.DirtySprite):
+    """Text that is re-rendered only when it changes."""
+
+    def __init__(self, font, topleft, text=""):
         super().__init__()
-        self.image = pygame.Surface((30, 30))
-        self.image.fill((255, 0, 0))
-        self.rect = self.image.get_rect(center=pos)
-        self.velocity = pygame.math.Vector2(1, 0).rotate(45)
+        self.font = font
+        self.topleft = topleft
+        self.text = None
+        self.set_text(text)
 
-    def update(self, dt, speed_multiplier):
-        move = self.velocity * BASE_ENEMY_SPEED * speed_multiplier * dt
-        self.rect.move_ip(int(move.x), int(move.y))
-        if not pygame.Rect(0, 0, WIDTH, HEIGHT).contains(self.rect):
-            self.velocity = -self.velocity
-            self.rect.clamp_ip(pygame.Rect(0, 0, WIDTH, HEIGHT))
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.image = self.font.render(text, True, (255, 255, 255))
+            self.rect = self.image.get_rect(topleft=self.topleft)
+            self.dirty = 1
 
 
 class Game:
-    def __init__(self):
+    """Window and input around a :class:`World`.
+
+    Frames are drawn through a ``LayeredDirty`` group, so only the regions
+    of sprites that moved or changed are pushed with
+    ``pygame.display.update(rects)``. The darkened background of each
+    tension level is cached; the whole screen is repainted only when the
+    level changes.
+
+    With ``headless`` pygame uses the SDL dummy video driver and nothing is
+    drawn; use :meth:`simulate` to run the world faster than real time.
+    """
+
+    def __init__(self, enemies=1, headless=False, seed=None):
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
         pygame.init()
+        if enemies == 1:
+            self.world = World()
+        else:
+            self.world = World.random(enemies, seed=seed)
+        self.accumulator = 0.0
+        if headless:
+            return
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Tension Prototype")
         self.clock = pygame.time.Clock()
-        self.player = Player((WIDTH // 2, HEIGHT // 2))
-        self.enemy = Enemy((WIDTH // 4, HEIGHT // 4))
-        self.sprites = pygame.sprite.Group(self.player, self.enemy)
-        self.tension = 0.0
+        self.player = Player(_pixel(self.world.players[0]))
+        self.enemies = [Enemy(_pixel(pos)) for pos in self.world.enemies]
         self.font = pygame.font.SysFont(None, 24)
+        self.label = Label(self.font, (10, 10))
+        self.sprites = pygame.sprite.LayeredDirty(self.player, *self.enemies, self.label)
+        self._overlay = pygame.Surface((WIDTH, HEIGHT))
+        self._overlay.fill((0, 0, 0))
+        self._backgrounds = {}
+        self.dark_level = None
+
+    @property
+    def tension(self):
+        return float(self.world.tension[0])
 
     def compute_tension(self):
-        dist = self.player.rect.centerx - self.enemy.rect.centerx
-        dist_y = self.player.rect.centery - self.enemy.rect.centery
-        distance = math.hypot(dist, dist_y)
-        proximity = clamp(1.0 - distance / TENSION_RADIUS, 0.0, 1.0)
-        return proximity
+        return float(self.world.proximity()[0])
+
+    def advance(self, frame_time, moves=None):
+        """Feed ``frame_time`` seconds to the fixed-timestep accumulator."""
+        self.accumulator += min(frame_time, MAX_FRAME_TIME)
+        while self.accumulator >= FIXED_DT:
+            self.world.step(FIXED_DT, moves)
+            self.accumulator -= FIXED_DT
+
+    def simulate(self, seconds, controller=None):
+        """Run ``seconds`` of game time without waiting for a clock."""
+        return self.world.run(seconds, FIXED_DT, controller)
+
+    def background(self, level):
+        """Background darkened to ``level`` out of ``DARK_LEVELS - 1``, cached."""
+        surface = self._backgrounds.get(level)
+        if surface is None:
+            surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+            surface.fill(BACKGROUND)
+            self._overlay.set_alpha(round(255 * level / (DARK_LEVELS - 1)))
+            surface.blit(self._overlay, (0, 0))
+            self._backgrounds[level] = surface
+        return surface
 
     def draw(self):
-        darken = int(100 * self.tension)
-        bg_color = (30 - darken, 30 - darken, 30 - darken)
-        self.screen.fill(bg_color)
-        self.sprites.draw(self.screen)
-        text = self.font.render(f"Tension: {self.tension:.2f}", True, (255, 255, 255))
-        self.screen.blit(text, (10, 10))
-        pygame.display.flip()
+        self.player.move_to(_pixel(self.world.players[0]))
+        for enemy, pos in zip(self.enemies, self.world.enemies):
+            enemy.move_to(_pixel(pos))
+        self.label.set_text(f"Tension: {self.tension:.2f}")
+
+        level = round(min(self.tension / DARK_TENSION, 1.0) * (DARK_LEVELS - 1))
+        if level != self.dark_level:
+            self.dark_level = level
+            self.sprites.clear(self.screen, self.background(level))
+            self.sprites.repaint_rect(self.screen.get_rect())
+        pygame.display.update(self.sprites.draw(self.screen))
 
     def run(self):
         running = True
         while running:
-            dt = self.clock.tick(60) / 1000.0
+            frame_time = self.clock.tick(60) / 1000.0
             for event in pygame.event.get():
                 if event.type == QUIT or (
                     event.type == KEYDOWN and event.key == K_ESCAPE
@@ -96,20 +180,36 @@ class Game:
                     running = False
 
             keys = pygame.key.get_pressed()
-            self.player.update(dt, keys)
-            # tension logic
-            self.tension = clamp(
-                self.tension + self.compute_tension() * dt - TENSION_DECAY * dt,
-                0.0,
-                1.0,
-            )
-            enemy_speed_factor = 1.0 + self.tension
-            self.enemy.update(dt, enemy_speed_factor)
+            moves = [[keys[pygame.K_d] - keys[pygame.K_a], keys[pygame.K_s] - keys[pygame.K_w]]]
+            self.advance(frame_time, moves)
             self.draw()
 
         pygame.quit()
 
 
-if __name__ == "__main__":
-    Game().run()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tension game prototype.")
+    parser.add_argument("--headless", action="store_true",
+                        help="simulate without a window and print tension statistics")
+    parser.add_argument("--enemies", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=600.0,
+                        help="game time to simulate with --headless")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    game = Game(args.enemies, headless=args.headless, seed=args.seed)
+    if not args.headless:
+        game.run()
+        return 0
+    start = time.perf_counter()
+    stats = game.simulate(args.seconds, wander(np.random.default_rng(args.seed)))
+    elapsed = time.perf_counter() - start
+    pygame.quit()
+    print(f"{stats['steps']} steps ({args.seconds:.0f} s of play) in {elapsed:.2f} s")
+    print(f"mean tension {stats['mean_tension']:.3f}, "
+          f"above 0.7 for {stats['high_tension_fraction']:.1%} of the time")
+    return 0
 
+
+if __name__ == "__main__":
+    sys.exit(main())
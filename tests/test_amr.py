@@ -0,0 +1,87 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability import simulation, weather_simulation
+from echofoam_falsifiability.amr import Hierarchy, gradient_magnitude, laplacian, prolong, restrict
+from echofoam_falsifiability.checkpoint import Checkpointer
+
+
+class AmrTest(unittest.TestCase):
+    def setUp(self):
+        self.field = np.random.default_rng(0).random((40, 40))
+        self.grid = Hierarchy({"f": self.field}, ratio=2, block=4)
+        self.flags = np.zeros((5, 5), dtype=bool)
+        self.flags[1, 1] = self.flags[1, 2] = self.flags[4, 4] = True
+
+    def test_transfer_conserves_means(self):
+        coarse = np.random.default_rng(1).random((12, 12))
+        for ratio in (2, 3):
+            np.testing.assert_allclose(restrict(prolong(coarse, ratio), ratio), coarse, atol=1e-14)
+        np.testing.assert_allclose(restrict(self.field, 2), self.field.reshape(20, 2, 20, 2).mean(axis=(1, 3)))
+
+    def test_regrid_and_composite(self):
+        grid = self.grid
+        grid.regrid(self.flags, fine={"f": self.field})
+        composite = grid.composite("f")
+        blocks = composite.reshape(5, 8, 5, 8)[grid.rows, :, grid.cols, :]
+        np.testing.assert_array_equal(blocks, self.field.reshape(5, 8, 5, 8)[grid.rows, :, grid.cols, :])
+        self.assertAlmostEqual(grid.mean("f"), self.field.mean())
+
+        flags = self.flags.copy()
+        flags[0, 0], flags[4, 4] = True, False
+        kept = grid.interior("f")[0].copy()
+        self.assertTrue(grid.regrid(flags))
+        self.assertFalse(grid.regrid(flags))
+        np.testing.assert_array_equal(grid.interior("f")[1], kept)
+        # the new patch is prolonged from the coarse cells without changing their means
+        np.testing.assert_allclose(restrict(grid.interior("f")[0], 2), grid.coarse["f"][:4, :4])
+
+    def test_halos(self):
+        grid = self.grid
+        grid.regrid(self.flags, fine={"f": self.field})
+        patches = grid.fill_halo("f")
+        composite = grid.composite("f")
+        # from the neighboring patch, from the coarse level, and wrapped around the domain
+        np.testing.assert_array_equal(patches[0, 1:-1, -1], composite[8:16, 16])
+        np.testing.assert_array_equal(patches[2, 0, 1:-1], composite[31, 32:40])
+        np.testing.assert_array_equal(patches[2, 1:-1, -1], composite[32:40, 0])
+        patches = grid.fill_halo("f", "extrapolate")
+        expected = np.hypot(*np.gradient(composite))
+        np.testing.assert_allclose(gradient_magnitude(patches[2]), expected[32:40, 32:40])
+        flat = np.zeros((12, 12))
+        flat[5, 5] = 1.0
+        self.assertEqual(laplacian(flat)[4, 4], -4.0)
+
+    def test_add_and_fraction(self):
+        grid = self.grid
+        grid.regrid(self.flags, fine={"f": self.field})
+        grid.add("f", slice(5, 11), slice(5, 11), 5.0)
+        grid.restrict()
+        self.assertAlmostEqual(grid.mean("f") - self.field.mean(), 36 * 5.0 / 1600)
+        self.assertAlmostEqual(grid.fraction_above("f", 0.5), np.mean(grid.composite("f") > 0.5))
+
+    def test_weather_pulse_is_refined(self):
+        result = weather_simulation.run(51, size=40, seed=1, refine_threshold=100.0, refine_block=4)
+        tau = result["fields"]["tau"]
+        self.assertEqual(tau.shape, (40, 40))
+        self.assertGreater(result["refined_fraction"], 0)
+        # the 5 x 5 pulse keeps its sharp edge on the fine patch
+        self.assertTrue(np.all(tau[18:23, 18:23] > 3.5))
+        self.assertTrue(np.all(np.abs(tau[18:23, 23]) < 1.5))
+        self.assertEqual(len(result["chi_history"]), 51)
+
+    def test_simulation_runs_refined(self):
+        result = simulation.run(30, seed=2, n=40, refine_threshold=0.3, refine_block=4)
+        self.assertEqual(result["fields"]["chi"].shape, (40, 40))
+        self.assertEqual(len(result["chi_history"]), 30)
+        self.assertTrue(0 < result["refined_fraction"] <= 1)
+        self.assertIsNotNone(result["verdict"])
+        with self.assertRaises(ValueError):
+            simulation.run(5, seed=2, n=40, refine_threshold=0.3, refine_block=4,
+                           checkpoint=Checkpointer(os.devnull))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+from echofoam_falsifiability import bench
+
+
+class BenchTest(unittest.TestCase):
+    def test_quick_cases_in_process(self):
+        report = bench.run_benchmarks(isolate=False, grid_sizes=(16,), shell_sizes=((3, 6, 8),),
+                                      chain_sizes=(50,), sieve_limits=(1000,),
+                                      replay_sizes=(1000,))
+        names = [r["name"] for r in report["results"]]
+        self.assertIn("simulation[16]", names)
+        self.assertIn("weather_sphere[3x6x8]", names)
+        self.assertIn("blockchain_memory[50]", names)
+        self.assertIn("tension_replay[1000]", names)
+        for result in report["results"]:
+            self.assertGreater(result["seconds"], 0)
+
+    def test_compare_flags_slowdowns(self):
+        baseline = {"results": [{"name": "a", "steps_per_sec": 100.0},
+                                {"name": "b", "steps_per_sec": 100.0}]}
+        current = {"results": [{"name": "a", "steps_per_sec": 50.0},
+                               {"name": "b", "steps_per_sec": 95.0}]}
+        self.assertEqual(bench.compare(baseline, current), [("a", "steps_per_sec", 100.0, 50.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability import laser_filamentation, simulation, teleportation, weather_simulation, weather_sphere
+from echofoam_falsifiability.checkpoint import Checkpointer, load_checkpoint
+
+
+class CheckpointTest(unittest.TestCase):
+    def _check_resume(self, run, total, cut, **params):
+        """A run stopped at ``cut`` and resumed must match an uninterrupted one."""
+        full = run(total, **params)
+        with tempfile.TemporaryDirectory() as tmp:
+            ckpt = Checkpointer(os.path.join(tmp, "ckpt.npz"), every=cut)
+            run(cut, checkpoint=ckpt, **params)
+            self.assertEqual(load_checkpoint(ckpt.path)[1]["step"], cut)
+            resumed = run(total, checkpoint=ckpt, resume=True, **params)
+        for name, field in full["fields"].items():
+            np.testing.assert_array_equal(resumed["fields"][name], field)
+        return full, resumed
+
+    def test_simulation(self):
+        full, resumed = self._check_resume(lambda steps, **kw: simulation.run(steps, **kw),
+                                           12, 5, seed=4, n=16)
+        self.assertEqual(resumed["chi_history"], full["chi_history"])
+        self.assertEqual(resumed["verdict"], full["verdict"])
+
+    def test_weather_simulation(self):
+        full, resumed = self._check_resume(lambda steps, **kw: weather_simulation.run(steps, **kw),
+                                           60, 55, size=16, seed=1)
+        self.assertEqual(resumed["chi_history"], full["chi_history"])
+
+    def test_laser(self):
+        full, resumed = self._check_resume(
+            lambda steps, **kw: laser_filamentation.run(timesteps=steps, **kw),
+            40, 17, grid_size=32, seed=2, collapse_threshold=1.05)
+        self.assertEqual(resumed["chi_history"], full["chi_history"])
+        self.assertIn(0.0, full["chi_history"])
+
+    def test_teleportation(self):
+        full, resumed = self._check_resume(lambda steps, **kw: teleportation.run(steps, **kw),
+                                           40, 33, size=40, start=(10.0, 20.0), target=(25.0, 20.0),
+                                           teleport_start=5)
+        self.assertEqual(resumed["teleport_complete"], full["teleport_complete"])
+        self.assertEqual(resumed["chi_history"], full["chi_history"])
+
+    def test_weather_sphere(self):
+        def run(steps, **kw):
+            tau, psi, chi = weather_sphere.run(steps=steps, grid_r=3, grid_theta=6, grid_phi=8,
+                                               save_path=None, seed=3, **kw)
+            return {"fields": {"tau": tau, "psi": psi, "chi": chi}}
+        self._check_resume(run, 9, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
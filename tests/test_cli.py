@@ -0,0 +1,66 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability import cli
+from echofoam_falsifiability.results_table import EXTENSIONS, default_format, read_results
+
+
+class CliTest(unittest.TestCase):
+    def test_run_then_render(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "run")
+            code = cli.main(["run", "simulation", "--steps", "5", "--n", "16", "--seed", "3",
+                             "--dtype", "float32", "--out-dir", out])
+            self.assertEqual(code, 0)
+            with open(os.path.join(out, "results.json")) as f:
+                summary = json.load(f)
+            self.assertEqual(summary["params"], {"steps": 5, "n": 16, "seed": 3, "dtype": "float32"})
+            self.assertEqual(len(summary["chi_history"]), 5)
+            with np.load(os.path.join(out, "fields.npz")) as data:
+                self.assertEqual(data["tau"].dtype, np.float32)
+            self.assertTrue(os.path.exists(os.path.join(out, "epcd_results.txt")))
+            self.assertEqual(cli.main(["render", out]), 0)
+            self.assertTrue(os.path.exists(os.path.join(out, "fields.png")))
+
+    def test_sweep_grid(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            summaries = cli.sweep_model("weather_simulation", {"seed": [0, 1], "size": [8, 12]},
+                                        base={"steps": 3}, out_dir=tmp)
+            self.assertEqual([s["params"] for s in summaries][1], {"steps": 3, "seed": 0, "size": 12})
+            with open(os.path.join(tmp, "sweep.jsonl")) as f:
+                self.assertEqual(len(f.readlines()), 4)
+            with np.load(os.path.join(tmp, "0003", "fields.npz")) as data:
+                self.assertEqual(data["chi"].shape, (12, 12))
+            table = read_results(os.path.join(tmp, "sweep" + EXTENSIONS[default_format()]), filters=[("size", "==", 12)])
+            self.assertEqual(table["seed"].tolist(), [0, 1])
+            self.assertEqual(len(table["chi_history"][1]), 3)
+
+    def test_tiled_run_keeps_fields_in_tiles(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "run")
+            code = cli.main(["run", "laser_filamentation", "--grid-size", "1200", "--timesteps", "2",
+                             "--seed", "0", "--tile-rows", "300", "--out-dir", out, "--render"])
+            self.assertEqual(code, 0)
+            self.assertFalse(os.path.exists(os.path.join(out, "fields.npz")))
+            with open(os.path.join(out, "results.json")) as f:
+                files = json.load(f)["field_files"]
+            self.assertEqual(files, {"psi": os.path.join("tiles", "psi.npy"),
+                                     "tau": os.path.join("tiles", "tau.npy")})
+            self.assertEqual(np.load(os.path.join(out, files["tau"]), mmap_mode="r").shape, (1200, 1200))
+            os.remove(os.path.join(out, "fields.png"))
+            self.assertEqual(cli.main(["render", out]), 0)
+            self.assertTrue(os.path.exists(os.path.join(out, "fields.png")))
+
+    def test_model_options_follow_signatures(self):
+        params = cli.model_params("teleportation")
+        self.assertEqual(params["target"], (70.0, 50.0))
+        self.assertNotIn("profiler", cli.model_params("laser_filamentation"))
+        self.assertEqual(cli.parse_value("start", (30.0, 50.0), "10,20"), (10.0, 20.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
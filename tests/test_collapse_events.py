@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability import collapse_events, laser_filamentation
+from echofoam_falsifiability.checkpoint import Checkpointer
+from echofoam_falsifiability.collapse_events import EventRecorder, detect, load_events
+
+
+def flood_labels(mask):
+    """Reference 4-connected labelling by flood fill in raster order."""
+    labels = np.zeros(mask.shape, dtype=int)
+    count = 0
+    for start in zip(*np.nonzero(mask)):
+        if labels[start]:
+            continue
+        count += 1
+        labels[start] = count
+        stack = [start]
+        while stack:
+            r, c = stack.pop()
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if (0 <= nr < mask.shape[0] and 0 <= nc < mask.shape[1]
+                        and mask[nr, nc] and not labels[nr, nc]):
+                    labels[nr, nc] = count
+                    stack.append((nr, nc))
+    return labels, count
+
+
+class CollapseEventsTest(unittest.TestCase):
+    def test_numpy_labels_match_flood_fill(self):
+        rng = np.random.default_rng(0)
+        for density in (0.3, 0.55, 0.8):
+            mask = rng.random((40, 57)) < density
+            labels, count = collapse_events._label_numpy(mask)
+            expected, expected_count = flood_labels(mask)
+            self.assertEqual(count, expected_count)
+            np.testing.assert_array_equal(labels, expected)
+
+    def test_detect(self):
+        field = np.zeros((10, 12))
+        field[2, 3] = field[2, 4] = 3.0
+        field[2, 5] = 6.0
+        field[7:9, 9] = 2.5
+        events = detect(field, 2.0, step=7)
+        self.assertEqual(events["area"].tolist(), [3, 2])
+        self.assertEqual(events["magnitude"].tolist(), [6.0, 2.5])
+        np.testing.assert_allclose(events["x"], [(3 * 3 + 3 * 4 + 6 * 5) / 12, 9])
+        np.testing.assert_allclose(events["y"], [2, 7.5])
+        self.assertTrue(np.all(events["step"] == 7))
+        peak = detect(field, 2.0, step=7, mode="argmax")
+        self.assertEqual((peak["x"][0], peak["y"][0], peak["area"][0]), (5, 2, 5))
+        self.assertEqual(len(detect(field, 10.0, step=7)), 0)
+
+    def test_laser_events_survive_resume(self):
+        params = dict(grid_size=32, seed=2, alpha=1.0, collapse_threshold=1.05)
+        with tempfile.TemporaryDirectory() as tmp:
+            with EventRecorder(os.path.join(tmp, "full.bin"), buffer_size=4) as events:
+                full = laser_filamentation.run(timesteps=40, events=events, **params)
+            expected = load_events(events.path, mmap=False)
+
+            path = os.path.join(tmp, "resumed.bin")
+            ckpt = Checkpointer(os.path.join(tmp, "ckpt.npz"), every=17)
+            with EventRecorder(path, buffer_size=4) as events:
+                laser_filamentation.run(timesteps=25, checkpoint=ckpt, events=events, **params)
+            with EventRecorder(path, buffer_size=4) as events:
+                resumed = laser_filamentation.run(timesteps=40, checkpoint=ckpt, resume=True,
+                                                  events=events, **params)
+            got = load_events(path, mmap=False)
+        self.assertGreater(full["collapses"], 1)
+        self.assertEqual(resumed["collapses"], full["collapses"])
+        self.assertGreaterEqual(len(expected), full["collapses"])
+        np.testing.assert_array_equal(got, expected)
+
+    def test_resume_without_checkpoint_rerecords_events(self):
+        params = dict(grid_size=32, seed=2, alpha=1.0, collapse_threshold=1.05, timesteps=30)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "events.bin")
+            with EventRecorder(path) as events:
+                laser_filamentation.run(events=events, **params)
+            expected = load_events(path, mmap=False)
+            # the first run saved no checkpoint, so resuming starts over at step 0
+            ckpt = Checkpointer(os.path.join(tmp, "missing.npz"), every=1000)
+            with EventRecorder(path) as events:
+                laser_filamentation.run(checkpoint=ckpt, resume=True, events=events, **params)
+            got = load_events(path, mmap=False)
+        self.assertGreater(len(expected), 0)
+        np.testing.assert_array_equal(got, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
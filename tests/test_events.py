@@ -0,0 +1,39 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+from echofoam_falsifiability.events import EventSink, read_events
+
+
+class EventSinkTest(unittest.TestCase):
+    def test_events_are_appended_in_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "events.jsonl")
+            with EventSink(path, flush_every=7, flush_interval=0.01) as sink:
+                for i in range(100):
+                    sink.log("move", i, 2 * i)
+                sink.log("click", 99, 198)
+            with EventSink(path) as sink:
+                sink.log("move", 0, 0)
+            events = read_events(path)
+        self.assertEqual(len(events), 102)
+        self.assertEqual([e["x"] for e in events[:100]], list(range(100)))
+        self.assertEqual(events[100], {**events[100], "type": "click", "x": 99, "y": 198})
+        self.assertEqual(sink.dropped, 0)
+
+    def test_buffer_is_bounded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sink = EventSink(os.path.join(tmp, "events.jsonl"), flush_every=10**9,
+                             flush_interval=60, capacity=16)
+            for i in range(40):
+                sink.log("move", i, i)
+            self.assertLessEqual(len(sink._buffer), 16)
+            sink.close()
+            events = read_events(sink.path)
+        self.assertEqual(len(events) + sink.dropped, 40)
+        self.assertEqual(events[-1]["x"], 39)
+
+
+if __name__ == "__main__":
+    unittest.main()
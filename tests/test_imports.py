@@ -0,0 +1,41 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import subprocess
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY = ("matplotlib", "tkinter", "PIL", "moviepy", "numba")
+
+MODULES = (
+    "simulation",
+    "weather_simulation",
+    "laser_filamentation",
+    "teleportation",
+    "weather_sphere",
+    "spherical_stencil",
+    "blockchain_memory",
+    "mashup_maker",
+    "mashup_batch",
+    "adaptive_gui",
+    "precision",
+    "bench",
+)
+
+
+class ImportTest(unittest.TestCase):
+    def test_numeric_modules_skip_plotting_and_gui(self):
+        imports = "; ".join(f"import echofoam_falsifiability.{m}" for m in MODULES)
+        code = (
+            f"import sys; {imports}; "
+            f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(out.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability import laser_filamentation
+from echofoam_falsifiability.collapse_events import EventRecorder, detect, detect_tiled, load_events
+
+
+class LaserTiledTest(unittest.TestCase):
+    def test_matches_in_memory_run(self):
+        params = dict(grid_size=48, timesteps=60, seed=2, alpha=1.0, collapse_threshold=1.05)
+        with tempfile.TemporaryDirectory() as tmp:
+            with EventRecorder(os.path.join(tmp, "full.bin")) as events:
+                full = laser_filamentation.run(events=events, **params)
+            with EventRecorder(os.path.join(tmp, "tiled.bin")) as events:
+                tiled = laser_filamentation.run(events=events, tile_rows=7, threads=3,
+                                                tile_dir=os.path.join(tmp, "tiles"), **params)
+            expected = load_events(os.path.join(tmp, "full.bin"), mmap=False)
+            got = load_events(os.path.join(tmp, "tiled.bin"), mmap=False)
+            self.assertIsInstance(tiled["fields"]["psi"], np.memmap)
+            for name, field in full["fields"].items():
+                np.testing.assert_allclose(tiled["fields"][name], field, rtol=1e-12, atol=1e-15)
+        self.assertGreater(full["collapses"], 1)
+        self.assertEqual(tiled["collapses"], full["collapses"])
+        np.testing.assert_allclose(tiled["chi_history"], full["chi_history"], atol=1e-12)
+        self.assertEqual(got["step"].tolist(), expected["step"].tolist())
+        np.testing.assert_allclose(got["x"], expected["x"], rtol=1e-6)
+
+    def test_detect_tiled_joins_bands(self):
+        rng = np.random.default_rng(1)
+        field = rng.random((37, 23))
+        for mode in ("components", "argmax"):
+            expected = detect(field, 0.45, 3, mode)
+            for tile_rows in (1, 4, 37):
+                got = detect_tiled(field, 0.45, 3, mode, tile_rows)
+                self.assertEqual(len(got), len(expected))
+                for name in expected.dtype.names:
+                    np.testing.assert_allclose(got[name], expected[name], rtol=1e-6)
+
+    def test_rejects_frames(self):
+        with tempfile.TemporaryDirectory() as tmp, self.assertRaises(ValueError):
+            laser_filamentation.run(grid_size=16, timesteps=2, save_interval=1, tile_rows=4,
+                                    tile_dir=tmp)
+
+
+if __name__ == "__main__":
+    unittest.main()
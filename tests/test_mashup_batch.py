@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from PIL import Image
+from echofoam_falsifiability.mashup_batch import read_manifest, run_batch
+
+
+class MashupBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        d = self.tmp.name
+        self.prompt = os.path.join(d, 'prompt.txt')
+        self.primes = os.path.join(d, 'primes.txt')
+        with open(self.prompt, 'w') as f:
+            f.write('hello')
+        with open(self.primes, 'w') as f:
+            f.write('2\n3\n5\n')
+        lines = []
+        for run in ('a', 'b'):
+            frames = os.path.join(d, run, 'frames')
+            os.makedirs(frames)
+            Image.fromarray(np.zeros((40, 40, 3), dtype=np.uint8)).save(os.path.join(frames, 'f0.png'))
+            results = os.path.join(d, run, 'epcd_results.txt')
+            events = os.path.join(d, run, 'collapse_events.txt')
+            with open(results, 'w') as f:
+                f.write('Hypothesis failed\n')
+            with open(events, 'w') as f:
+                f.write('10 20\n')
+            lines.append(f'{frames} {results} {events}')
+        lines.append(f'{os.path.join(d, "missing.mp4")} {results} {events}')
+        self.manifest = os.path.join(d, 'manifest.txt')
+        with open(self.manifest, 'w') as f:
+            f.write('# sweep\n' + '\n'.join(lines) + '\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_one_record_per_job(self):
+        out_dir = os.path.join(self.tmp.name, 'out')
+        jobs = read_manifest(self.manifest)
+        self.assertEqual(len(jobs), 3)
+        records = run_batch(jobs, self.prompt, self.primes, out_dir=out_dir, workers=2)
+        self.assertEqual([r['status'] for r in records], ['ok', 'ok', 'error'])
+        self.assertEqual(records[0]['resonance_score'], 10.0)
+        self.assertTrue(os.path.exists(records[1]['output']))
+        with open(os.path.join(out_dir, 'mashup_log.jsonl')) as f:
+            logged = [json.loads(line) for line in f]
+        self.assertEqual(sorted(r['job'] for r in logged), [0, 1, 2])
+
+        # a rerun into the same directory replaces the log instead of adding to it
+        run_batch(jobs, self.prompt, self.primes, out_dir=out_dir, workers=2)
+        with open(os.path.join(out_dir, 'mashup_log.jsonl')) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
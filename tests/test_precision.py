@@ -0,0 +1,30 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability import simulation
+from echofoam_falsifiability.precision import compare_precision
+
+
+class PrecisionTest(unittest.TestCase):
+    def test_float32_fields(self):
+        result = simulation.run(steps=5, seed=1, dtype=np.float32, n=16)
+        self.assertEqual(simulation._tau.dtype, np.float32)
+        self.assertEqual(simulation._chi.dtype, np.float32)
+        self.assertEqual(len(result["chi_history"]), 5)
+
+    def test_reduced_precision_matches(self):
+        for model, params in [("simulation", {"steps": 40, "n": 24}),
+                              ("weather_simulation", {"steps": 60, "size": 24}),
+                              ("laser_filamentation", {"grid_size": 32, "timesteps": 50}),
+                              ("weather_sphere", {"steps": 20, "grid_r": 4, "grid_theta": 8,
+                                                  "grid_phi": 16}),
+                              ("teleportation", {"steps": 120})]:
+            report = compare_precision(model, seed=3, **params)
+            self.assertTrue(report["passed"], report)
+            self.assertGreater(report["chi_steps"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
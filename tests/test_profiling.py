@@ -0,0 +1,60 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import tempfile
+import unittest
+from echofoam_falsifiability import simulation
+from echofoam_falsifiability.blockchain_memory import BlockchainMemory
+from echofoam_falsifiability.profiling import NULL_PROFILER, Profiler
+
+
+class ProfilingTest(unittest.TestCase):
+    def test_phases_reported_and_traced(self):
+        prof = Profiler()
+        simulation.run(steps=5, seed=0, n=16, profiler=prof)
+        report = prof.report()
+        for name in ("noise", "gradient", "psi", "laplacian", "reduction"):
+            self.assertEqual(report[name]["calls"], 5)
+        self.assertAlmostEqual(sum(s["fraction"] for s in report.values()), 1.0)
+        events = prof.chrome_trace()["traceEvents"]
+        self.assertEqual(len(events), 25)
+        self.assertEqual(events[0]["ph"], "X")
+
+    def test_memory_and_chain_phases(self):
+        prof = Profiler(memory=True, timeline=False)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                mem = BlockchainMemory(os.path.join(tmp, "chain.json"), profiler=prof)
+                mem.add_memory("hello")
+                BlockchainMemory(mem.path, profiler=prof)
+                path = os.path.join(tmp, "report.json")
+                prof.write_report(path)
+                with open(path) as f:
+                    report = json.load(f)
+        finally:
+            prof.close()
+        self.assertEqual(set(report), {"serialize", "write", "read", "decode"})
+        self.assertGreater(report["serialize"]["peak_bytes"], 0)
+        self.assertEqual(prof.events, [])
+
+    def test_memory_is_the_peak_of_a_phase(self):
+        prof = Profiler(memory=True, timeline=False)
+        try:
+            for _ in range(20):
+                with prof.phase("temp"):
+                    bytearray(2**20)
+        finally:
+            prof.close()
+        peak = prof.report()["temp"]["peak_bytes"]
+        self.assertGreaterEqual(peak, 2**20)
+        self.assertLess(peak, 2 * 2**20)
+
+    def test_null_profiler_records_nothing(self):
+        self.assertFalse(NULL_PROFILER.enabled)
+        with NULL_PROFILER.phase("x") as phase:
+            self.assertIs(phase, NULL_PROFILER.phase("y"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability import laser_filamentation, simulation, weather_sphere
+from echofoam_falsifiability.checkpoint import Checkpointer
+from echofoam_falsifiability.result_cache import ResultCache, cache_key
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache = ResultCache(os.path.join(self._tmp.name, "cache"))
+
+    def test_simulation_hit(self):
+        first = simulation.run(12, seed=4, n=16, cached=self.cache)
+        second = simulation.run(12, seed=4, n=16, cached=self.cache)
+        self.assertEqual((self.cache.hits, self.cache.misses, len(self.cache.entries())), (1, 1, 1))
+        self.assertEqual(second["chi_history"], first["chi_history"])
+        self.assertEqual(second["verdict"], first["verdict"])
+        for name, field in first["fields"].items():
+            np.testing.assert_array_equal(second["fields"][name], field)
+        simulation.run(12, seed=5, n=16, cached=self.cache)
+        self.assertEqual(len(self.cache.entries()), 2)
+
+    def test_unseeded_runs_are_not_stored(self):
+        simulation.run(5, n=16, cached=self.cache)
+        self.assertEqual(len(self.cache.entries()), 0)
+
+    def test_key(self):
+        key = cache_key("simulation", {"seed": 1, "dtype": np.float32})
+        self.assertEqual(key, cache_key("simulation", {"dtype": "float32", "seed": 1}))
+        self.assertEqual(key, cache_key("simulation", {"seed": 1, "dtype": np.float32, "profiler": object()}))
+        self.assertNotEqual(key, cache_key("simulation", {"seed": 2, "dtype": np.float32}))
+        self.assertNotEqual(key, cache_key("weather_simulation", {"seed": 1, "dtype": np.float32}))
+
+    def test_laser_and_weather_sphere(self):
+        chi = laser_filamentation.run_simulation(32, 20, save_interval=None, seed=2, cached=self.cache)
+        self.assertEqual(laser_filamentation.run_simulation(32, 20, save_interval=None, seed=2,
+                                                            cached=self.cache), chi)
+        kw = dict(steps=4, grid_r=3, grid_theta=6, grid_phi=8, save_path=None, seed=3)
+        fields = weather_sphere.run(**kw, cached=self.cache)
+        again = weather_sphere.run(**kw, cached=self.cache)
+        self.assertIsInstance(again, tuple)
+        for a, b in zip(fields, again):
+            np.testing.assert_array_equal(a, b)
+        self.assertEqual(self.cache.hits, 2)
+        with self.assertRaises(ValueError):
+            laser_filamentation.run(32, 20, seed=2, cached=self.cache,
+                                    checkpoint=Checkpointer(os.path.join(self._tmp.name, "c.npz")))
+
+    def test_lru_eviction(self):
+        self.cache.put("a", {"x": np.zeros(1000)})
+        entry = self.cache.size()
+        self.cache.max_bytes = 2 * entry
+        self.cache.put("b", {"x": np.zeros(1000)})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.cache.put("c", {"x": np.zeros(1000)})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+    def test_without_fields(self):
+        cache = ResultCache(self.cache.path, store_fields=False)
+        first = simulation.run(6, seed=1, n=16, cached=cache)
+        second = simulation.run(6, seed=1, n=16, cached=cache)
+        self.assertNotIn("fields", second)
+        self.assertEqual(second["chi_history"], first["chi_history"])
+
+    def test_large_and_tiled_fields_are_dropped(self):
+        self.cache.max_bytes = 10_000
+        self.cache.put("small", {"chi_history": [0.5], "fields": {"tau": np.zeros(100)}})
+        self.cache.put("large", {"chi_history": [0.5], "fields": {"tau": np.zeros(10_000)}})
+        self.cache.put("huge", (np.zeros(10_000),))
+        self.assertIn("fields", self.cache.get("small"))
+        self.assertEqual(self.cache.get("large"), {"chi_history": [0.5]})
+        self.assertIsNone(self.cache.get("huge"))
+
+        params = dict(grid_size=16, timesteps=3, seed=0, tile_rows=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            first = laser_filamentation.run(**params, tile_dir=tmp, cached=self.cache)
+            second = laser_filamentation.run(**params, tile_dir=tmp, cached=self.cache)
+        self.assertIn("fields", first)
+        self.assertNotIn("fields", second)
+        self.assertEqual(second["chi_history"], first["chi_history"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import unittest
+import numpy as np
+from echofoam_falsifiability.results_table import (PYARROW_AVAILABLE, ListColumn, read_results,
+                                                   write_results)
+
+
+def summaries(n):
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "model": "simulation",
+            "params": {"steps": 10 + i % 3, "seed": i, "dtype": "float32"},
+            "seconds": float(rng.random()),
+            "verdict": "Hypothesis supported" if i % 4 == 0 else "Hypothesis failed",
+            "verdict_step": None if i % 5 == 0 else i,
+            "stop_reason": None,
+            "chi_history": rng.random(i % 7).tolist(),
+            "fields": {"tau": np.zeros(3)},
+        }
+        for i in range(n)
+    ]
+
+
+class ResultsTableTest(unittest.TestCase):
+    def _roundtrip(self, ext):
+        runs = summaries(50)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "runs" + ext)
+            write_results(runs, path)
+            table = read_results(path)
+            picked = read_results(path, columns=["seed", "chi_history"],
+                                  filters=[("verdict", "==", "Hypothesis supported"), ("steps", ">", 10)])
+        self.assertNotIn("fields", table)
+        self.assertEqual(table["seed"].tolist(), list(range(50)))
+        self.assertEqual(table["verdict"][4], "Hypothesis supported")
+        self.assertTrue(np.isnan(table["verdict_step"][5]))
+        self.assertEqual(table["verdict_step"][6], 6)
+        for run, chi in zip(runs, (table["chi_history"][i] for i in range(50))):
+            np.testing.assert_array_equal(chi, run["chi_history"])
+
+        expected = [r for r in runs if r["verdict"] == "Hypothesis supported" and r["params"]["steps"] > 10]
+        self.assertEqual(sorted(picked), ["chi_history", "seed"])
+        self.assertEqual(picked["seed"].tolist(), [r["params"]["seed"] for r in expected])
+        self.assertEqual(len(picked["chi_history"]), len(expected))
+        for i, run in enumerate(expected):
+            np.testing.assert_array_equal(picked["chi_history"][i], run["chi_history"])
+
+    def test_npz(self):
+        self._roundtrip(".npz")
+
+    @unittest.skipUnless(PYARROW_AVAILABLE, "pyarrow not installed")
+    def test_parquet(self):
+        self._roundtrip(".parquet")
+
+    def test_list_column_take(self):
+        column = ListColumn(np.arange(6.0), [0, 2, 2, 6])
+        taken = column.take([2, 0])
+        self.assertEqual(taken.offsets.tolist(), [0, 4, 6])
+        self.assertEqual(taken.values.tolist(), [2.0, 3.0, 4.0, 5.0, 0.0, 1.0])
+        self.assertEqual(len(column.take([1])[0]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
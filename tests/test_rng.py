@@ -0,0 +1,40 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability.rng import fill_normal, make_rng, spawn_rngs
+
+
+class RngTest(unittest.TestCase):
+    def test_seeded_streams_repeat(self):
+        a = make_rng(5).standard_normal(4)
+        b = make_rng(5).standard_normal(4)
+        np.testing.assert_array_equal(a, b)
+        rng = make_rng(5)
+        self.assertIs(make_rng(rng), rng)
+
+    def test_spawned_streams_differ(self):
+        first, second = spawn_rngs(3, 2)
+        self.assertFalse(np.array_equal(first.random(4), second.random(4)))
+        again = spawn_rngs(3, 2, bit_generator="philox")
+        self.assertEqual(len(again), 2)
+
+    def test_spawning_leaves_seed_sequence_alone(self):
+        seed = np.random.SeedSequence(5)
+        first = [rng.random(3) for rng in spawn_rngs(seed, 2)]
+        again = [rng.random(3) for rng in spawn_rngs(seed, 2)]
+        self.assertEqual(seed.n_children_spawned, 0)
+        np.testing.assert_array_equal(first, again)
+        np.testing.assert_array_equal(first, [rng.random(3) for rng in spawn_rngs(5, 2)])
+
+    def test_fill_in_place(self):
+        out = np.empty(1000, dtype=np.float32)
+        result = fill_normal(make_rng(0), out, 0.5)
+        self.assertIs(result, out)
+        self.assertEqual(out.dtype, np.float32)
+        self.assertLess(abs(out.std() - 0.5), 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
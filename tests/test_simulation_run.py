@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+from unittest import mock
+import numpy as np
+from echofoam_falsifiability import simulation
+from echofoam_falsifiability.checkpoint import Checkpointer
+
+
+class SimulationRunTest(unittest.TestCase):
+    def test_stops_once_stationary(self):
+        full = simulation.run(400, seed=0, n=32)
+        early = simulation.run(400, seed=0, n=32, stationary_tol=1e-2, stationary_window=20)
+        self.assertEqual(early["stop_reason"], "stationary")
+        self.assertLess(early["steps_run"], 400)
+        self.assertEqual(len(early["chi_history"]), early["steps_run"])
+        self.assertEqual(early["chi_history"], full["chi_history"][:early["steps_run"]])
+
+    def test_stationary_stop_survives_resume(self):
+        params = dict(seed=0, n=32, stationary_tol=1e-2, stationary_window=20)
+        early = simulation.run(400, **params)
+        with tempfile.TemporaryDirectory() as tmp:
+            ckpt = Checkpointer(os.path.join(tmp, "ckpt.npz"), every=5)
+            simulation.run(early["steps_run"] - 3, checkpoint=ckpt, **params)
+            resumed = simulation.run(400, checkpoint=ckpt, resume=True, **params)
+        self.assertEqual(resumed["stop_reason"], "stationary")
+        self.assertEqual(resumed["steps_run"], early["steps_run"])
+
+    def test_stops_on_verdict(self):
+        step = simulation.step
+
+        def decided_at_7(frame):
+            step(frame)
+            if frame == 7:
+                simulation._verdict, simulation._verdict_step = "Hypothesis sustained", frame
+
+        with mock.patch.object(simulation, "step", decided_at_7):
+            result = simulation.run(100, seed=1, n=16, stop_on_verdict=True)
+        self.assertEqual((result["verdict"], result["verdict_step"]), ("Hypothesis sustained", 7))
+        self.assertEqual((result["steps_run"], result["stop_reason"]), (8, "verdict"))
+
+    def test_cfl_substeps_keep_chi_bounded(self):
+        fixed = simulation.run(50, seed=2, n=16)
+        checked = simulation.run(50, seed=2, n=16, cfl=1.0)
+        np.testing.assert_allclose(checked["fields"]["chi"], fixed["fields"]["chi"])
+
+        simulation._init_fields(seed=0, n=16, cfl=0.9)
+        simulation._psi[:] = 10.0  # ten times past the single-step CFL limit
+        simulation._chi[:] = simulation._chi_prev[:] = 1e-3 * simulation._rng.standard_normal((16, 16))
+        for _ in range(50):
+            simulation._advance_chi()
+        self.assertLess(np.abs(simulation._chi).max(), 1e-2)
+
+
+if __name__ == "__main__":
+    unittest.main()
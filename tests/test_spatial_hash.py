@@ -0,0 +1,51 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability.spatial_hash import SpatialHash
+from echofoam_falsifiability.tension_world import World
+
+
+def brute_nearest2(queries, points, radius):
+    d2 = ((queries[:, None, :] - points[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+    return np.where(d2 <= radius**2, d2, np.inf)
+
+
+class SpatialHashTest(unittest.TestCase):
+    def test_incremental_update_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 1000, (800, 2))
+        queries = rng.uniform(-50, 1050, (60, 2))
+        grid = SpatialHash(50, 1000, 1000)
+        for _ in range(5):
+            grid.update(points)
+            d2 = grid.nearest2(queries)
+            expected = brute_nearest2(queries, points, 50)
+            near = np.isfinite(expected)
+            np.testing.assert_allclose(d2[near], expected[near])
+            self.assertTrue(np.all(d2[~near] > 50**2))
+            fresh = SpatialHash(50, 1000, 1000)
+            fresh.update(points)
+            np.testing.assert_array_equal(fresh.starts, grid.starts)
+            np.testing.assert_array_equal(grid.cell[grid.order], np.sort(grid.cell))
+            points += rng.normal(0, 10, points.shape)
+
+        owner, index = grid.candidates(queries[:3])
+        self.assertTrue(np.all(np.diff(owner) >= 0))
+        within = ((queries[owner] - points[index]) ** 2).sum(axis=1) <= 50**2
+        all_pairs = ((queries[:3, None] - points[None]) ** 2).sum(axis=2) <= 50**2
+        self.assertEqual(within.sum(), all_pairs.sum())
+
+    def test_world_with_hash_matches_pairwise(self):
+        kwargs = dict(players=40, seed=3, width=4000, height=3000)
+        hashed = World.random(300, spatial_hash=True, **kwargs)
+        pairwise = World.random(300, spatial_hash=False, **kwargs)
+        hashed.run(5)
+        pairwise.run(5)
+        np.testing.assert_allclose(hashed.tension, pairwise.tension)
+        np.testing.assert_allclose(hashed.enemies, pairwise.enemies)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability import teleportation
+
+
+def full_grid_run(steps, size, start, target, teleport_start, step_size):
+    """Reference transport that evaluates every field over the whole grid."""
+    center = np.array(start, dtype=float)
+    tau = np.zeros((size, size))
+    complete = None
+    for frame in range(steps):
+        if frame == teleport_start:
+            tau -= teleportation.ring_field(target, size=size)
+        grad_y, grad_x = np.gradient(tau)
+        center -= step_size * np.array([teleportation.bilinear(grad_x, *center),
+                                        teleportation.bilinear(grad_y, *center)])
+        if complete is None and np.linalg.norm(center - target) < 1.0:
+            complete = frame
+            tau[:] = 0
+    return center, tau, teleportation.ring_field(center, size=size), complete
+
+
+class TeleportationTest(unittest.TestCase):
+    def test_ring_patch_matches_full_field(self):
+        full = teleportation.ring_field((17.3, 5.6), size=48)
+        rows, cols, patch = teleportation.ring_patch((17.3, 5.6), full.shape)
+        np.testing.assert_allclose(patch, full[rows, cols], atol=1e-12)
+        outside = full.copy()
+        outside[rows, cols] = 0
+        self.assertLess(outside.max(), np.exp(-teleportation.CUTOFF**2))
+
+    def test_local_step_matches_full_grid(self):
+        for start in [(62.0, 47.5), (70.3, 50.4)]:
+            state = teleportation.init_state(100, start=start, teleport_start=3, step_size=2.0)
+            for frame in range(40):
+                teleportation.step(state, frame)
+            center, tau, psi, complete = full_grid_run(40, 100, start, (70.0, 50.0), 3, 2.0)
+            np.testing.assert_allclose(state.psi_center, center, atol=1e-6)
+            np.testing.assert_allclose(state.psi, psi, atol=1e-6)
+            np.testing.assert_allclose(state.tau, tau, atol=1e-6)
+            self.assertEqual(state.teleport_complete, complete)
+            grad_y, grad_x = np.gradient(state.tau)
+            np.testing.assert_allclose(state.grad_mag, np.hypot(grad_x, grad_y), atol=1e-12)
+
+    def test_splat_rings_matches_ring_field_sum(self):
+        centers = np.array([(3.2, 4.7), (20.0, 31.5), (47.9, 12.1), (20.5, 30.0)])
+        field = np.zeros((48, 48))
+        teleportation.splat_rings(field, centers, [1.0, -2.0, 0.5, 1.0], chunk=3)
+        expected = sum(w * teleportation.ring_field(c, size=48)
+                       for c, w in zip(centers, [1.0, -2.0, 0.5, 1.0]))
+        np.testing.assert_allclose(field, expected, atol=1e-8)
+
+    def test_batch_matches_independent_packets(self):
+        starts = [(62.0, 47.5), (155.4, 57.0), (60.0, 143.0), (150.3, 150.4)]
+        targets = [(70.0, 50.0), (150.0, 50.0), (70.0, 150.0), (150.0, 150.0)]
+        step_sizes = [2.0, 1.0, 3.0, 2.0]
+        result = teleportation.run_batch(starts, targets, steps=40, size=200,
+                                         step_sizes=step_sizes, teleport_start=3)
+        for k in range(len(starts)):
+            state = teleportation.init_state(200, start=starts[k], target=targets[k],
+                                             teleport_start=3, step_size=step_sizes[k])
+            for frame in range(40):
+                if state.teleport_complete is not None:
+                    break
+                teleportation.step(state, frame)
+            np.testing.assert_allclose(result["centers"][k], state.psi_center, atol=1e-6)
+            expected = -1 if state.teleport_complete is None else state.teleport_complete
+            self.assertEqual(result["teleport_complete"][k], expected)
+        self.assertEqual(result["teleport_complete"][3], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+import numpy as np
+from echofoam_falsifiability.tension_field import TensionField, events_to_arrays
+
+
+def reference_replay(t, is_click, x, y, grid=20, width=400, height=300, interval=0.1):
+    """Event-by-event replay of the original adaptive_gui globals."""
+    tau = np.zeros((grid, grid))
+    last = None
+    spikes = []
+    next_tick = t[0] + interval
+    for ti, click, xi, yi in zip(t, is_click, x, y):
+        while ti >= next_tick:
+            tau *= 0.95
+            gy, gx = np.gradient(tau)
+            spikes.append(np.sqrt(gx**2 + gy**2).max())
+            next_tick += interval
+        row = max(0, min(grid - 1, int(yi / height * grid)))
+        col = max(0, min(grid - 1, int(xi / width * grid)))
+        if click:
+            tau[row, col] *= 0.5
+        else:
+            tau[row, col] += 0 if last is None else ti - last
+            last = ti
+    tau *= 0.95
+    gy, gx = np.gradient(tau)
+    spikes.append(np.sqrt(gx**2 + gy**2).max())
+    return np.array(spikes)
+
+
+class TensionFieldTest(unittest.TestCase):
+    def test_replay_matches_full_grid_reference(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        t = np.cumsum(rng.exponential(0.02, n))
+        is_click = rng.random(n) < 0.05
+        x = rng.uniform(-10, 410, n)
+        y = rng.normal(150, 40, n)
+        result = TensionField().replay(t, is_click, x, y)
+        expected = reference_replay(t, is_click, x, y)
+        np.testing.assert_allclose(result["spikes"], expected, rtol=1e-9, atol=1e-12)
+        self.assertEqual(result["visible"].tolist(), (expected > 1.0).tolist())
+
+    def test_live_events_and_log_format(self):
+        events = [{"t": 0.0, "type": "move", "x": 10, "y": 10},
+                  {"t": 2.0, "type": "move", "x": 10, "y": 10},
+                  {"t": 2.5, "type": "click", "x": 10, "y": 10},
+                  {"t": 3.0, "type": "move", "x": 390, "y": 290}]
+        field = TensionField()
+        field.ingest(*events_to_arrays(events))
+        self.assertAlmostEqual(field.tau[0, 0], 1.0)
+        self.assertAlmostEqual(field.tau[19, 19], 1.0)
+        self.assertAlmostEqual(field.tick(), 0.95 * np.sqrt(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import importlib.util
+import math
+import unittest
+import numpy as np
+from echofoam_falsifiability import tension_world
+from echofoam_falsifiability.tension_world import World
+
+HAVE_PYGAME = importlib.util.find_spec("pygame") is not None
+
+
+def reference_run(steps, dt, player, enemy, velocity):
+    """Scalar version of the original one-enemy game loop, without pixel rounding."""
+    tension = 0.0
+    px, py = player
+    ex, ey = enemy
+    vx, vy = velocity
+    lo = tension_world.ENEMY_SIZE / 2
+    for _ in range(steps):
+        proximity = min(max(1.0 - math.hypot(px - ex, py - ey) / tension_world.TENSION_RADIUS,
+                            0.0), 1.0)
+        tension = min(max(tension + proximity * dt - tension_world.TENSION_DECAY * dt, 0.0), 1.0)
+        speed = tension_world.BASE_ENEMY_SPEED * (1.0 + tension) * dt
+        ex, ey = ex + vx * speed, ey + vy * speed
+        if not (lo <= ex <= tension_world.WIDTH - lo and lo <= ey <= tension_world.HEIGHT - lo):
+            vx, vy = -vx, -vy
+            ex = min(max(ex, lo), tension_world.WIDTH - lo)
+            ey = min(max(ey, lo), tension_world.HEIGHT - lo)
+    return tension, (ex, ey)
+
+
+class TensionWorldTest(unittest.TestCase):
+    def test_single_enemy_matches_scalar_loop(self):
+        world = World()
+        stats = world.run(seconds=60)
+        tension, enemy = reference_run(stats["steps"], tension_world.FIXED_DT,
+                                       (400, 300), (200, 150), (math.sqrt(0.5), math.sqrt(0.5)))
+        self.assertAlmostEqual(world.tension[0], tension, places=9)
+        np.testing.assert_allclose(world.enemies[0], enemy, atol=1e-6)
+
+    def test_many_enemies(self):
+        world = World.random(500, players=3, seed=1)
+        delta = world.players[:, None, :] - world.enemies[None, :, :]
+        nearest = np.sqrt((delta**2).sum(axis=2)).min(axis=1)
+        np.testing.assert_allclose(world.proximity(),
+                                   np.clip(1 - nearest / world.radius, 0, 1))
+        stats = world.run(seconds=30, controller=tension_world.wander(np.random.default_rng(0)))
+        self.assertEqual(stats["tension"].shape, (1800,))
+        lo = tension_world.ENEMY_SIZE / 2
+        self.assertTrue(np.all(world.enemies >= lo))
+        self.assertTrue(np.all(world.enemies <= np.array([world.width, world.height]) - lo))
+        self.assertTrue(np.all((world.tension >= 0) & (world.tension <= 1)))
+
+    @unittest.skipUnless(HAVE_PYGAME, "pygame is not installed")
+    def test_headless_game(self):
+        import tension_game
+
+        game = tension_game.Game(enemies=50, headless=True, seed=0)
+        game.advance(1.0)
+        self.assertAlmostEqual(game.world.time, 0.25, places=6)
+        stats = game.simulate(10)
+        self.assertEqual(stats["steps"], 600)
+
+    @unittest.skipUnless(HAVE_PYGAME, "pygame is not installed")
+    def test_dirty_rect_drawing(self):
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        import tension_game
+
+        game = tension_game.Game(enemies=20, seed=0)
+        game.draw()
+        label = game.label.image
+        game.draw()
+        self.assertIs(game.label.image, label)
+        self.assertEqual(game.dark_level, 0)
+        game.world.tension[:] = 1.0
+        game.draw()
+        self.assertEqual(game.dark_level, tension_game.DARK_LEVELS - 1)
+        self.assertEqual(len(game._backgrounds), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
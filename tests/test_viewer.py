@@ -0,0 +1,47 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import unittest
+from unittest import mock
+import numpy as np
+from echofoam_falsifiability import viewer
+
+
+class ViewerTest(unittest.TestCase):
+    def test_downsample(self):
+        field = np.arange(100 * 60, dtype=float).reshape(100, 60)
+        self.assertIs(viewer.downsample(field, max_pixels=100), field)
+        mean = viewer.downsample(field, max_pixels=40, method="mean")
+        self.assertEqual(mean.shape, (33, 20))
+        self.assertAlmostEqual(mean[0, 0], field[:3, :3].mean())
+        stride = viewer.downsample(field, max_pixels=40, method="stride")
+        np.testing.assert_array_equal(stride, field[::3, ::3])
+
+    def test_ring_buffer_keeps_last_values_in_order(self):
+        ring = viewer.RingBuffer(4)
+        for value in range(3):
+            ring.append(value)
+        np.testing.assert_array_equal(ring.values(), [0, 1, 2])
+        for value in range(3, 10):
+            ring.append(value)
+        np.testing.assert_array_equal(ring.values(), [6, 7, 8, 9])
+        np.testing.assert_array_equal(ring.steps(), [6, 7, 8, 9])
+
+    def test_frames_drop_while_solver_is_ahead(self):
+        fig = mock.Mock()
+        stepped = []
+        clock = iter(np.arange(0.0, 100.0, 0.02))
+        with mock.patch("time.perf_counter", lambda: next(clock)):
+            drawn = list(viewer.Viewer(fig, fps=10, drop_frames=True).frames(stepped.append, 20))
+        self.assertEqual(stepped, list(range(20)))
+        self.assertEqual(drawn, [4, 9, 14, 19])
+        self.assertEqual(list(viewer.Viewer(fig).frames(lambda f: None, 5)), [0, 1, 2, 3, 4])
+
+    def test_frames_stop(self):
+        stepped = []
+        frames = viewer.Viewer(mock.Mock()).frames(stepped.append, 20, stop=lambda: len(stepped) == 3)
+        self.assertEqual(list(frames), [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import multiprocessing as mp
+import unittest
+from unittest import mock
+import numpy as np
+from echofoam_falsifiability import weather_sphere
+from echofoam_falsifiability.weather_sphere import load_snapshots, run
+
+
+class WeatherSphereTest(unittest.TestCase):
+    def test_headless_snapshots(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'snaps')
+            tau, psi, chi = run(steps=12, grid_r=4, grid_theta=8, grid_phi=16,
+                                snapshot_every=5, snapshot_dir=path,
+                                snapshot_fields=('tau', 'chi'), save_path=None)
+            snaps = load_snapshots(path)
+            self.assertEqual(list(snaps['steps']), [0, 5, 10])
+            self.assertEqual(snaps['tau'].shape, (3, 4, 8, 16))
+            self.assertEqual(snaps['chi'].dtype, np.float32)
+            self.assertTrue(np.all((psi >= 0) & (psi <= 1)))
+
+    def test_workers_reproducible(self):
+        kwargs = dict(steps=6, grid_r=3, grid_theta=6, grid_phi=12, seed=7, save_path=None)
+        serial = run(**kwargs)
+        one = run(workers=1, **kwargs)
+        three = run(workers=3, **kwargs)
+        for a, b, c in zip(serial, one, three):
+            np.testing.assert_array_equal(a, b)
+            np.testing.assert_array_equal(b, c)
+
+    def test_workers_open_phi(self):
+        kwargs = dict(steps=4, grid_r=3, grid_theta=6, grid_phi=10, phi_extent=np.pi,
+                      seed=1, save_path=None)
+        np.testing.assert_array_equal(run(workers=1, **kwargs)[1], run(workers=4, **kwargs)[1])
+
+    @unittest.skipUnless(mp.get_start_method() == "fork", "workers must inherit the patch")
+    def test_killed_worker_stops_the_others(self):
+        step_slab = weather_sphere._step_slab
+
+        def die_in_first_slab(grid, lo, *args):
+            if lo == 0:
+                os._exit(1)  # like a SIGKILL, skips the worker's barrier.abort
+            step_slab(grid, lo, *args)
+
+        kwargs = dict(steps=4, grid_r=3, grid_theta=6, grid_phi=12, seed=0, save_path=None)
+        with mock.patch.object(weather_sphere, "_step_slab", die_in_first_slab):
+            with self.assertRaisesRegex(RuntimeError, "worker"):
+                run(workers=3, **kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()